@@ -1,21 +1,53 @@
-﻿from fastapi import APIRouter, Response
+﻿from fastapi import APIRouter, Response, Query
+from typing import Optional
 import sqlite3, os, json, traceback
-import fts_util
+import fts_util, db_pool, write_queue, task_tags, task_stats, sql_profiler, index_advisor
+from fast_json import FastJSONResponse
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "todo.db")
-router = APIRouter()
+router = APIRouter(default_response_class=FastJSONResponse)
+
+# Yeniden kurma işleri diğer yazmalar gibi yazma kuyruğundan geçer: yazma hattını kuyruğun
+# dışından tutup bekleyen partileri PoolTimeout'a düşürmezler, sırayla tek iş olarak çalışırlar.
+# İş süresince kuyruktaki diğer yazmalar bekler. Tablolar/tetikleyiciler migrate()'te kurulur;
+# burada DDL ve commit yapılmaz.
 
 @router.post("/admin/fts/reindex")
 def fts_reindex():
     try:
-        conn = sqlite3.connect(DB_PATH)
-        try:
-            if not fts_util.has_fts5(conn):
-                return {"ok": False, "reason": "fts5_unavailable"}
-            ok = fts_util.reindex(conn)
-            return {"ok": bool(ok)}
-        finally:
-            conn.close()
+        ok = write_queue.run(fts_util.rebuild)
+        return {"ok": True} if ok else {"ok": False, "reason": "fts5_unavailable"}
     except Exception as e:
         return Response(content=json.dumps({"ok": False, "error": str(e)}),
                         media_type="application/json; charset=utf-8", status_code=200)
+
+@router.post("/admin/tags/rebuild")
+def tags_rebuild():
+    return {"ok": True, "tasks": write_queue.run(task_tags.rebuild)}
+
+@router.post("/admin/stats/rebuild")
+def stats_rebuild():
+    return {"ok": True, **write_queue.run(task_stats.rebuild)}
+
+@router.get("/admin/indexes/advice")
+def indexes_advice():
+    # kanonik liste/export/metrics sorgularının planı; tabloyu tümden tarayanlar "flagged"
+    with db_pool.reader() as conn:
+        return index_advisor.advise(conn)
+
+@router.get("/admin/sql/slow")
+def sql_slow():
+    return {"settings": dict(sql_profiler.settings), "queries": sql_profiler.slow_queries()}
+
+@router.delete("/admin/sql/slow")
+def sql_slow_clear():
+    sql_profiler.clear()
+    return {"ok": True}
+
+@router.post("/admin/sql/profile")
+def sql_profile(enabled: Optional[bool] = None,
+                threshold_ms: Optional[float] = Query(None, ge=0),
+                debug_header: Optional[bool] = None):
+    # çalışırken aç/kapa; başlangıç değerleri TODO_API_SQL_PROFILE / _SLOW_QUERY_MS / _DEBUG
+    for k, v in (("enabled", enabled), ("threshold_ms", threshold_ms), ("debug_header", debug_header)):
+        if v is not None: sql_profiler.settings[k] = v
+    return {"ok": True, "settings": dict(sql_profiler.settings)}
@@ -407,11 +407,3 @@ except Exception as _e:
     # silently ignore (startup should not crash)
     pass
 # --- end include fields_router ---
-
-# --- route fix: remove conflicting routes & include latest routers ---
-try:
-    import route_fix
-    route_fix.apply(app)
-except Exception as _e:
-    pass
-# --- end route fix ---
@@ -0,0 +1,50 @@
+﻿import sqlite3
+from typing import Dict, Iterable, List, Tuple
+import task_tags, task_cache
+
+# PATCH /tasks/bulk ve PATCH /bulk'un ortak yazma motoru. Girdi, router'ların kendi kurallarıyla
+# normalize ettiği (id, {kolon: değer}) çiftleridir; motor bunları tek transaction'da
+# dokunulan kolon kümesine göre gruplayıp her grubu tek executemany ile uygular.
+
+COLUMNS = ("title", "done", "notes", "description", "tags", "due")
+_CHUNK = 900
+
+def _existing(conn: sqlite3.Connection, ids: List[int]) -> set:
+    out = set()
+    for i in range(0, len(ids), _CHUNK):
+        part = ids[i:i + _CHUNK]
+        out.update(r[0] for r in conn.execute(f"SELECT id FROM tasks WHERE id IN ({','.join('?' * len(part))})", part))
+    return out
+
+def apply(conn: sqlite3.Connection, items: Iterable[Tuple[int, Dict[str, object]]]) -> dict:
+    """Her öğe için durum döner: updated | unchanged (değişecek alan yok) | not_found.
+    Aynı id birden çok kez geçerse sıra korunur: n. tekrarı n. dalgada uygulanır."""
+    items = list(items)
+    present = _existing(conn, list({tid for tid, _ in items}))
+    waves: List[Dict[Tuple[str, ...], list]] = []
+    seen: Dict[int, int] = {}
+    tags: Dict[int, object] = {}
+    status = []
+    for tid, fields in items:
+        if tid not in present:
+            status.append("not_found"); continue
+        cols = tuple(c for c in COLUMNS if c in fields)
+        if not cols:
+            status.append("unchanged"); continue
+        n = seen.get(tid, 0); seen[tid] = n + 1
+        if n == len(waves): waves.append({})
+        waves[n].setdefault(cols, []).append([fields[c] for c in cols] + [tid])
+        if "tags" in fields: tags[tid] = fields["tags"]
+        status.append("updated")
+    for wave in waves:
+        for cols, params in wave.items():
+            sets = ", ".join(f"{c}=?" for c in cols)
+            conn.executemany(f"UPDATE tasks SET {sets}, updated_at=CURRENT_TIMESTAMP WHERE id=?", params)
+    task_tags.sync_rows(conn, tags.items())
+    task_cache.invalidate_on_commit(seen)
+    return {
+        "ok": True,
+        "updated": status.count("updated"),
+        "not_found": status.count("not_found"),
+        "items": [{"id": tid, "status": s} for (tid, _), s in zip(items, status)],
+    }
@@ -0,0 +1,91 @@
+﻿import os, time, asyncio, contextvars, functools
+from concurrent.futures import ThreadPoolExecutor
+import db_pool, write_queue
+
+# async handler'lar için veri erişim katmanı. SQLite çağrıları bloklayıcıdır; event loop'ta
+# çalışmamaları için okuma havuzu boyutunda ayrı bir executor'a gönderilir (anyio'nun 40'lık
+# genel threadpool'u yerine: bağlantı sayısından fazla thread yalnız kuyrukta bekler).
+# Yazmalar write_queue üzerinden gider. İşler çağıranın contextvars bağlamında çalışır.
+# Akışlar (/export) kendi executor'ında ve db_pool'un akış şeridinde ilerler: yavaş bir istemci
+# okuma bağlantısı ya da DB executor thread'i tutmaz.
+
+THREADS = int(os.getenv("TODO_API_DB_THREADS", str(db_pool.READERS)))
+_executor = ThreadPoolExecutor(max_workers=THREADS, thread_name_prefix="todo-db")
+STREAM_THREADS = int(os.getenv("TODO_API_DB_STREAM_THREADS", str(db_pool.STREAMS)))
+_streams = ThreadPoolExecutor(max_workers=STREAM_THREADS, thread_name_prefix="todo-stream")
+_STREAM_POLL = 0.02
+
+async def _run_on(executor, fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(executor, functools.partial(ctx.run, fn, *args, **kwargs))
+
+async def run(fn, *args, **kwargs):
+    """Bloklayan herhangi bir fn(*args) çağrısını DB executor'ında çalıştırır."""
+    return await _run_on(_executor, fn, *args, **kwargs)
+
+def _with_reader(fn, args, kwargs):
+    with db_pool.reader() as conn:
+        return fn(conn, *args, **kwargs)
+
+async def read(fn, *args, **kwargs):
+    """fn(conn, *args) okuma bağlantısıyla executor'da çalışır."""
+    return await run(_with_reader, fn, args, kwargs)
+
+async def fetchone(sql: str, params=()):
+    return await read(lambda conn: conn.execute(sql, params).fetchone())
+
+async def fetchall(sql: str, params=()):
+    return await read(lambda conn: conn.execute(sql, params).fetchall())
+
+async def write(fn, *args, **kwargs):
+    """fn(conn, *args) yazma kuyruğunda (group commit) çalışır."""
+    return await write_queue.run_async(fn, *args, **kwargs)
+
+_END = object()
+
+async def _steps(it, done=None, started=False):
+    try:
+        if started: yield _END
+        while True:
+            item = await _run_on(_streams, next, it, _END)
+            if item is _END: break
+            yield item
+    finally:
+        close = getattr(it, "close", None)
+        if close is not None:
+            await _run_on(_streams, close)
+        if done is not None:
+            await _run_on(_streams, done)
+
+def iterate(it):
+    """Bloklayan bir iteratörü (örn. kodlayıcı) akış executor'ında adım adım tüketir.
+    Tüketici erken bırakırsa (istemci koptu) üreteç de executor'da kapatılır."""
+    return _steps(it)
+
+async def stream(fn, *args):
+    """fn(conn, *args) üretecini akış şeridinden alınan bir bağlantıyla adım adım tüketen async iteratör.
+    Bağlantı yanıt başlamadan alınır: şerit doluysa olay döngüsünde (thread tutmadan) en çok
+    ACQUIRE_TIMEOUT beklenir, sonra PoolTimeout. Akış bitince ya da bırakılınca bağlantı şeride döner."""
+    deadline = time.monotonic() + db_pool.ACQUIRE_TIMEOUT
+    while True:
+        left = deadline - time.monotonic()
+        # son deneme kısa bir bloklayan bekleme: zaman aşımı şerit istatistiğine sayılır
+        use = db_pool.streamer(timeout=0 if left > _STREAM_POLL else max(left, 0.001))
+        try:
+            conn = await _run_on(_streams, use.__enter__)
+            break
+        except db_pool.PoolTimeout:
+            if left <= _STREAM_POLL: raise
+        await asyncio.sleep(_STREAM_POLL)
+    release = functools.partial(use.__exit__, None, None, None)
+    try:
+        it = fn(conn, *args)
+    except BaseException:
+        await _run_on(_streams, release)
+        raise
+    # hiç başlamamış async üretecin finally'si çalışmaz (istemci ilk parçadan önce koparsa bağlantı
+    # GC'ye kalırdı); üreteç burada başlatılır, bırakılırsa aclose/asyncio kapanışı bağlantıyı döndürür
+    body = _steps(it, release, started=True)
+    await body.__anext__()
+    return body
@@ -0,0 +1,256 @@
+﻿import sqlite3, os, time, threading, queue, contextvars
+from contextlib import contextmanager
+
+DB_PATH = os.getenv("TODO_API_DB_PATH") or os.path.join(os.path.dirname(__file__), "todo.db")
+
+READERS        = int(os.getenv("TODO_API_DB_READERS", "4"))
+# uzun akışlar (/export) için ayrı şerit: okuma havuzundan yer ve DB executor'ından thread tutmazlar
+STREAMS        = int(os.getenv("TODO_API_DB_STREAMS", "2"))
+BUSY_TIMEOUT   = int(os.getenv("TODO_API_DB_BUSY_MS", "5000"))
+CACHE_KB       = int(os.getenv("TODO_API_DB_CACHE_KB", "16384"))
+MMAP_BYTES     = int(os.getenv("TODO_API_DB_MMAP_BYTES", str(128 * 1024 * 1024)))
+ACQUIRE_TIMEOUT = float(os.getenv("TODO_API_DB_ACQUIRE_S", "30"))
+
+class PoolTimeout(Exception):
+    pass
+
+# İstek başına SQLite'ta geçen süre: http_metrics her istek için bir sayaç kutusu ([saniye]) koyar;
+# threadpool'a kopyalanan bağlam aynı listeyi gördüğünden yerinde toplama geri yansır.
+db_time: contextvars.ContextVar = contextvars.ContextVar("todo_db_time", default=None)
+
+# sql_profiler açıkken isteğe ait Profile nesnesi (deyim metni, süre, satır, plan); bkz. sql_profiler
+sql_profile: contextvars.ContextVar = contextvars.ContextVar("todo_sql_profile", default=None)
+
+class TimedCursor(sqlite3.Cursor):
+    """execute ve fetch çağrılarının süresini (varsa) db_time kutusuna ekler; profil açıksa ona devreder."""
+
+    def _timed(self, fn, *a, stmt=False):
+        box, prof = db_time.get(), sql_profile.get()
+        if prof is not None: return prof.call(self, fn, a, stmt, box)
+        if box is None: return fn(*a)
+        t0 = time.perf_counter()
+        try: return fn(*a)
+        finally: box[0] += time.perf_counter() - t0
+
+    def execute(self, *a): return self._timed(super().execute, *a, stmt=True)
+    def executemany(self, *a): return self._timed(super().executemany, *a, stmt=True)
+    def executescript(self, *a): return self._timed(super().executescript, *a, stmt=True)
+    def fetchone(self): return self._timed(super().fetchone)
+    def fetchmany(self, *a): return self._timed(super().fetchmany, *a)
+    def fetchall(self): return self._timed(super().fetchall)
+    def __next__(self): return self._timed(super().__next__)
+
+class PooledConnection(sqlite3.Connection):
+    fn_gen = 0
+    path = ""
+
+    # sqlite3.Connection.execute* alt sınıftaki cursor()'u çağırmaz; kısayollar burada yönlendirilir
+    def cursor(self, factory=TimedCursor): return super().cursor(factory)
+    def execute(self, *a): return self.cursor().execute(*a)
+    def executemany(self, *a): return self.cursor().executemany(*a)
+    def executescript(self, *a): return self.cursor().executescript(*a)
+
+    def commit(self):
+        box = db_time.get()
+        if box is None: return super().commit()
+        t0 = time.perf_counter()
+        try: return super().commit()
+        finally: box[0] += time.perf_counter() - t0
+
+# Havuzdaki her bağlantıya kurulan SQL fonksiyonları (UDF); bkz. register_function
+_functions: dict = {}
+_fn_gen = 0
+
+def _pragmas():
+    return (
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA busy_timeout={BUSY_TIMEOUT}",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA cache_size=-{CACHE_KB}",
+        f"PRAGMA mmap_size={MMAP_BYTES}",
+        "PRAGMA temp_store=MEMORY",
+        # INSERT OR REPLACE ile silinen satırlarda da DELETE tetikleyicileri (FTS vb.) çalışsın
+        "PRAGMA recursive_triggers=ON",
+    )
+
+class _Lane:
+    """Sabit boyutlu bağlantı kuyruğu; LIFO sayesinde en son kullanılan (sıcak) bağlantı tekrar verilir."""
+
+    def __init__(self, name: str, size: int, opener):
+        self.name = name
+        self.size = max(1, int(size))
+        self._open = opener
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.in_use = 0
+        self.acquired = 0
+        self.waited = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+
+    def acquire(self, timeout: float | None = None) -> sqlite3.Connection:
+        """timeout None ise ACQUIRE_TIMEOUT; 0 ise hiç beklenmez (zaman aşımı sayılmaz)."""
+        t0 = time.perf_counter()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                grow = self.opened < self.size
+                if grow: self.opened += 1
+            if grow:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._lock: self.opened -= 1
+                    raise
+            else:
+                wait = ACQUIRE_TIMEOUT if timeout is None else timeout
+                try:
+                    conn = self._idle.get(timeout=wait) if wait > 0 else self._idle.get_nowait()
+                except queue.Empty:
+                    if wait > 0:
+                        with self._lock: self.timeouts += 1
+                    raise PoolTimeout(f"no {self.name} connection available after {wait}s")
+                with self._lock: self.waited += 1
+        dt = time.perf_counter() - t0
+        with self._lock:
+            self.in_use += 1
+            self.acquired += 1
+            self.wait_total += dt
+            if dt > self.wait_max: self.wait_max = dt
+        return conn
+
+    def release(self, conn: sqlite3.Connection, broken: bool = False):
+        with self._lock:
+            self.in_use -= 1
+            if broken: self.opened -= 1
+        if broken:
+            try: conn.close()
+            except Exception: pass
+        else:
+            self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try: conn = self._idle.get_nowait()
+            except queue.Empty: break
+            with self._lock: self.opened -= 1
+            try: conn.close()
+            except Exception: pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": self.size, "open": self.opened, "in_use": self.in_use,
+                "idle": self.opened - self.in_use, "acquired": self.acquired,
+                "waited": self.waited, "wait_seconds_total": round(self.wait_total, 6),
+                "wait_seconds_max": round(self.wait_max, 6), "timeouts": self.timeouts,
+            }
+
+class Pool:
+    def __init__(self, path=None, readers: int = READERS, streams: int = STREAMS):
+        self.path = str(path or DB_PATH)
+        self.read = _Lane("read", readers, self._open)
+        self.stream = _Lane("stream", streams, self._open)
+        # SQLite tek yazıcıya izin verir; yazma şeridi 1 bağlantı ile süreç içi kilit yarışını keser
+        self.write = _Lane("write", 1, self._open)
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=BUSY_TIMEOUT / 1000,
+                               factory=PooledConnection)
+        conn.path = self.path
+        conn.row_factory = sqlite3.Row
+        for p in _pragmas():
+            conn.execute(p)
+        return conn
+
+    def warm(self, readers: int | None = None):
+        n = self.read.size if readers is None else min(readers, self.read.size)
+        conns = [self.read.acquire() for _ in range(n)]
+        for c in conns:
+            c.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+        for c in conns:
+            self.read.release(c)
+
+    @staticmethod
+    def _prepare(conn: PooledConnection):
+        gen = _fn_gen
+        if conn.fn_gen == gen: return
+        for (name, narg), (fn, det) in list(_functions.items()):
+            conn.create_function(name, narg, fn, deterministic=det)
+        conn.fn_gen = gen
+
+    @contextmanager
+    def _use(self, lane: _Lane, commit: bool, timeout: float | None = None):
+        conn = lane.acquire(timeout)
+        broken = False
+        try:
+            self._prepare(conn)
+            yield conn
+            if commit: conn.commit()
+        except BaseException:
+            try: conn.rollback()
+            except Exception: broken = True
+            raise
+        finally:
+            if not broken and conn.in_transaction:
+                try: conn.rollback()
+                except Exception: broken = True
+            lane.release(conn, broken)
+
+    def reader(self):
+        return self._use(self.read, commit=False)
+
+    def writer(self):
+        return self._use(self.write, commit=True)
+
+    def streamer(self, timeout: float | None = None):
+        return self._use(self.stream, commit=False, timeout=timeout)
+
+    def stats(self) -> dict:
+        return {"path": self.path, "read": self.read.stats(), "write": self.write.stats(),
+                "stream": self.stream.stats()}
+
+    def close(self):
+        self.read.close(); self.write.close(); self.stream.close()
+
+_pool: Pool | None = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> Pool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = Pool()
+    return _pool
+
+def configure(path=None, readers: int = READERS, streams: int = STREAMS) -> Pool:
+    """Havuzu (örn. testlerde başka bir DB ile) yeniden kurar; eski boştaki bağlantılar kapatılır."""
+    global _pool
+    with _pool_lock:
+        old, _pool = _pool, Pool(path, readers, streams)
+    if old is not None:
+        old.close()
+    return _pool
+
+def register_function(name: str, narg: int, fn, deterministic: bool = True):
+    """Havuzdaki tüm bağlantılara (açık olanlar dahil, bir sonraki kullanımda) SQL fonksiyonu ekler."""
+    global _fn_gen
+    with _pool_lock:
+        _functions[(name, narg)] = (fn, deterministic)
+        _fn_gen += 1
+
+def reader():
+    return get_pool().reader()
+
+def writer():
+    return get_pool().writer()
+
+def streamer(timeout: float | None = None):
+    return get_pool().streamer(timeout)
+
+def stats() -> dict:
+    return get_pool().stats()
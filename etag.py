@@ -0,0 +1,34 @@
+﻿import zlib
+from urllib.parse import urlencode
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Güçlü ETag'ler. Görev: id + satır içeriğinin (updated_at dahil) crc32'si; updated_at tek başına
+# yetmez (saniye çözünürlüklü; aynı saniyedeki iki güncelleme aynı etiketi vermesin) ve ham metni
+# başlığa yazılmaz (Latin-1 dışı ya da '"' içeren değerler geçersiz başlık üretir). Liste: task_stats
+# değişiklik sayacı + normalize sorgu; eşleşen If-None-Match liste sorgusu çalışmadan 304 alır.
+
+def task_etag(row) -> str:
+    # satır id + updated_at'i içerir (okuyanlar alan kümesinden bağımsız ikisini de seçer)
+    crc = zlib.crc32(repr(tuple(row)).encode("utf-8"))
+    return f'"t{row["id"]}-{crc:08x}"'
+
+def normalized_query(request: Request) -> str:
+    # parametre sırası ve boş değerler etiketi değiştirmez
+    items = sorted((k, v) for k, v in request.query_params.multi_items() if v != "")
+    return request.url.path + "?" + urlencode(items)
+
+def list_etag(version: int, request: Request) -> str:
+    crc = zlib.crc32(normalized_query(request).encode("utf-8"))
+    return f'"l{version}-{crc:08x}"'
+
+def matches(request: Request, etag: str) -> bool:
+    inm = request.headers.get("if-none-match")
+    if not inm: return False
+    if inm.strip() == "*": return True
+    # If-None-Match zayıf karşılaştırma kullanır (RFC 9110 13.1.2)
+    tags = {t.strip().removeprefix("W/") for t in inm.split(",")}
+    return etag in tags
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
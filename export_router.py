@@ -1,121 +1,107 @@
-﻿from fastapi import APIRouter, Response, Query
+﻿from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 import sqlite3, os, json, csv, io
 from typing import Optional, List
-import fts_util
+import db_pool, db_async, fts_util, fast_json, task_record, migrations
+from task_query import TaskQuery, CursorError, FilterError
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "todo.db")
 router = APIRouter()
 
-_MAP = str.maketrans({
-    "ı":"i","İ":"I","ğ":"g","Ğ":"G","ş":"s","Ş":"S","ö":"o","Ö":"O","ü":"u","Ü":"U","ç":"c","Ç":"C",
-    "â":"a","Â":"A","ä":"a","Ä":"A","à":"a","À":"A","á":"a","Á":"A","ã":"a","Ã":"A",
-    "é":"e","É":"E","è":"e","È":"E","ê":"e","Ê":"E","ë":"e","Ë":"E",
-    "í":"i","Í":"I","ì":"i","Ì":"I","î":"i","Î":"I","ï":"i","Ï":"I",
-    "ó":"o","Ó":"O","ò":"o","Ò":"O","ô":"o","Ô":"O","õ":"o","Õ":"O","ö":"o","Ö":"O",
-    "ú":"u","Ú":"U","ù":"u","Ù":"U","û":"u","Û":"U","ü":"u","Ü":"U",
-    "ñ":"n","Ñ":"N","ÿ":"y","Ý":"Y"
-})
-def _unaccent(s: str) -> str:
-    if s is None: return ""
-    return s.translate(_MAP)
+_CHUNK = 500
+_CSV_COLS = ["id","title","notes","description","done","due","created_at","updated_at","tags"]
+_MEDIA = {
+    "json":   "application/json; charset=utf-8",
+    "ndjson": "application/x-ndjson; charset=utf-8",
+    "csv":    "text/csv; charset=utf-8",
+}
 
-def _row_to_task(row: sqlite3.Row) -> dict:
-    d = dict(row); d["done"] = bool(d.get("done",0))
-    t = d.get("tags")
-    if t:
-        try: d["tags"] = json.loads(t) if isinstance(t, str) else t
-        except Exception: d["tags"] = {}
-    else:
-        d["tags"] = {}
-    return d
+_dump = fast_json.dumps
+
+def _stream_rows(conn, tq: TaskQuery, cols: str = "t.*", keys=None):
+    # Tek okuma transaction'ı: WAL anlık görüntüsü ilk satırdan son satıra kadar sabit kalır
+    conn.execute("BEGIN")
+    sql, params = tq.select(columns=cols, fts=fts_util.ready(conn))
+    cur = conn.execute(sql, params)
+    while True:
+        chunk = cur.fetchmany(_CHUNK)
+        if not chunk: break
+        yield task_record.records(chunk, "raw", keys)
+
+def _json_body(chunks):
+    yield b"["
+    sep = b""
+    for rows in chunks:
+        if not rows: continue
+        yield sep + b",".join(map(_dump, rows))
+        sep = b","
+    yield b"]"
+
+def _ndjson_body(chunks):
+    for rows in chunks:
+        yield b"".join(_dump(r) + b"\n" for r in rows)
+
+def _csv_body(chunks, keys=None):
+    cols = _CSV_COLS if keys is None else [c for c in _CSV_COLS if c in keys] + [k for k in keys if k not in _CSV_COLS]
+    buf = io.StringIO()
+    wr = csv.DictWriter(buf, fieldnames=cols, extrasaction="ignore")
+    wr.writeheader()
+    for rows in chunks:
+        for rec in rows:
+            r = rec.to_dict()
+            if "tags" in r: r["tags"] = _dump(r["tags"] or []).decode("utf-8")
+            wr.writerow(r)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0); buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+_BODIES = {"json": _json_body, "ndjson": _ndjson_body, "csv": _csv_body}
 
 @router.get("/export")
-def export(
-    format: str = Query("json", pattern="^(json|csv)$"),
+async def export(
+    format: str = Query("json", pattern="^(json|csv|ndjson)$"),
     done: Optional[bool] = None,
     q: Optional[str] = None,
     tag: Optional[List[str]] = Query(None),
     due_before: Optional[str] = None,
     due_after: Optional[str] = None,
     sort: Optional[str] = Query("id"),
-    order: Optional[str] = Query("desc")
+    order: Optional[str] = Query("desc"),
+    limit: Optional[int] = Query(None, ge=1, description="Sayfa boyutu; verilirse X-Next-Cursor döner"),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Virgülle ayrılmış kolonlar; SQL yalnız bunları okur"),
 ):
-    conn = sqlite3.connect(DB_PATH); conn.row_factory = sqlite3.Row
     try:
-        where, params = [], []
-        if done is not None:
-            where.append("t.done=?"); params.append(1 if done else 0)
-        if due_before:
-            where.append("(t.due IS NOT NULL AND t.due <> '' AND t.due <= ?)"); params.append(due_before)
-        if due_after:
-            where.append("(t.due IS NOT NULL AND t.due <> '' AND t.due >= ?)"); params.append(due_after)
+        tq = TaskQuery(done=done, q=q, tag=tag, due_before=due_before, due_after=due_after,
+                       sort=sort, order=order, cursor=cursor)
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FilterError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
-        allowed = {"id","title","due","created_at","updated_at"}
-        sort_col = sort if sort in allowed else "id"
-        order_dir = "ASC" if (str(order).lower() == "asc") else "DESC"
-
-        use_fts = False
-        if q:
-            try:
-                use_fts = bool(fts_util.ensure_fts(conn))
-            except Exception:
-                use_fts = False
-
-        if q and use_fts:
-            def _fts_match_string(qs: str) -> str:
-                if '"' in qs or "'" in qs: return qs
-                parts = [p for p in qs.strip().split() if p]
-                return " ".join(f"{p}*" for p in parts)
-            ms = _fts_match_string(q)
-            sql = "SELECT t.* FROM tasks t JOIN tasks_fts f ON f.rowid=t.id WHERE f.tasks_fts MATCH ?"
-            p2  = [ms]
-            if where: sql += " AND " + " AND ".join(where); p2 += params
-            if sort_col == "due":
-                sql += f" ORDER BY (t.due IS NULL OR t.due='') ASC, t.due {order_dir}"
-            else:
-                sql += f" ORDER BY t.{sort_col} {order_dir}"
-            rows = [ _row_to_task(r) for r in conn.execute(sql, p2).fetchall() ]
-        else:
-            if q:
-                conn.create_function("unaccent", 1, _unaccent)
-                like = f"%{q}%"
-                where.append("(unaccent(t.title) LIKE unaccent(?) OR unaccent(t.notes) LIKE unaccent(?) OR unaccent(t.description) LIKE unaccent(?))")
-                params.extend([like, like, like])
-            sql = "SELECT t.* FROM tasks t"
-            if where: sql += " WHERE " + " AND ".join(where)
-            if sort_col == "due":
-                sql += f" ORDER BY (t.due IS NULL OR t.due='') ASC, t.due {order_dir}"
-            else:
-                sql += f" ORDER BY t.{sort_col} {order_dir}"
-
-            rows = [ _row_to_task(r) for r in conn.execute(sql, params).fetchall() ]
-
-        if tag:
-            want = [t.strip() for t in tag if str(t).strip()]
-            def has_all_tags(task):
-                t = task.get("tags") or []
-                if isinstance(t, dict):
-                    vals = list(t.keys()) + list(map(str, t.values()))
-                else:
-                    vals = list(map(str, t))
-                return all(x in vals for x in want)
-            rows = [t for t in rows if has_all_tags(t)]
+    # akış başladıktan sonra 400 dönülemez: alanlar kolon kümesine karşı önceden doğrulanır
+    available = await db_async.read(migrations.columns)
+    try:
+        keys = task_record.parse_fields(fields, "raw", available)
+    except task_record.FieldsError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # sıralama/cursor kolonları her zaman okunur, yalnız istenenler yazılır
+    cols = task_record.projection("raw", keys, available, extra=tq.columns)
 
-        if format == "json":
-            body = json.dumps(rows, ensure_ascii=False, separators=(",",":"))
-            return Response(content=body, media_type="application/json; charset=utf-8",
-                            headers={"Content-Disposition":"attachment; filename=todos.json"})
-        else:
-            if rows:
-                for r in rows:
-                    t = r.get("tags") or []
-                    r["tags"] = json.dumps(t, ensure_ascii=False, separators=(",",":"))
-            buf = io.StringIO()
-            cols = ["id","title","notes","description","done","due","created_at","updated_at","tags"]
-            wr = csv.DictWriter(buf, fieldnames=cols, extrasaction="ignore")
-            wr.writeheader()
-            for r in rows: wr.writerow(r)
-            return Response(content=buf.getvalue(), media_type="text/csv; charset=utf-8",
-                            headers={"Content-Disposition":"attachment; filename=todos.csv"})
-    finally:
-        conn.close()
+    headers = {"Content-Disposition": f"attachment; filename=todos.{format}"}
+    encode = (lambda chunks: _csv_body(chunks, keys)) if format == "csv" else _BODIES[format]
+    if limit is None:
+        # tüm tablo: fetchmany ile parça parça akıt, bellek sabit kalır. Bağlantı akış şeridinden
+        # (okuma havuzu dışı) alınır; şerit doluysa akış başlamadan PoolTimeout -> 503
+        body = await db_async.stream(lambda conn: encode(_stream_rows(conn, tq, cols, keys)))
+    else:
+        # sayfa sınırlı; X-Next-Cursor başlığı için sayfa önceden okunur
+        def read(conn):
+            sql, params = tq.select(limit=limit, columns=cols, fts=fts_util.ready(conn))
+            return conn.execute(sql, params).fetchall()
+        raw = await db_async.read(read)
+        nxt = tq.next_cursor(raw, limit)
+        if nxt: headers["X-Next-Cursor"] = nxt
+        # kodlayıcılar saf CPU; adımlar akış executor'ında ilerler
+        body = db_async.iterate(encode(iter([task_record.records(raw, "raw", keys)])))
+    return StreamingResponse(body, media_type=_MEDIA[format], headers=headers)
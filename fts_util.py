@@ -21,6 +21,36 @@ def has_fts5(conn: sqlite3.Connection) -> bool:
     except Exception:
         return False
 
+# İndekse giden metin: unicode61 'remove_diacritics 2' Türkçe harflerin çoğunu zaten katlar,
+# yalnız noktasız ı ayrı bir harf sayıldığından i'ye çevrilir (task_query.norm ile aynı sonuç).
+# Tetikleyiciler sadece yerleşik SQL fonksiyonları kullanır; harici araçlarla yazmak da indeksi bozmaz.
+def _fold(col: str) -> str:
+    return f"replace(replace(COALESCE({col},''),'ı','i'),'İ','I')"
+
+_TRIGGERS = f"""
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts(rowid, title, notes, description)
+        VALUES (new.id, {_fold('new.title')}, {_fold('new.notes')}, {_fold('new.description')});
+    END;
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, notes, description)
+        VALUES('delete', old.id, {_fold('old.title')}, {_fold('old.notes')}, {_fold('old.description')});
+    END;
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF title, notes, description ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, notes, description)
+        VALUES('delete', old.id, {_fold('old.title')}, {_fold('old.notes')}, {_fold('old.description')});
+        INSERT INTO tasks_fts(rowid, title, notes, description)
+        VALUES (new.id, {_fold('new.title')}, {_fold('new.notes')}, {_fold('new.description')});
+    END;
+"""
+
+_ready: dict = {}
+
+def _installed(conn: sqlite3.Connection) -> bool:
+    names = {r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE name IN ('tasks_fts','tasks_fts_ai','tasks_fts_ad','tasks_fts_au')")}
+    return len(names) == 4
+
 def ensure_fts(conn: sqlite3.Connection) -> bool:
     if not has_fts5(conn):
         return False
@@ -31,33 +61,55 @@ def ensure_fts(conn: sqlite3.Connection) -> bool:
         USING fts5(title, notes, description, content='tasks', content_rowid='id',
                    tokenize='unicode61 remove_diacritics 2');
     """)
-    conn.executescript("""
-        CREATE TRIGGER IF NOT EXISTS tasks_ai AFTER INSERT ON tasks BEGIN
-            INSERT INTO tasks_fts(rowid, title, notes, description)
-            VALUES (new.id, new.title, new.notes, new.description);
-        END;
-        CREATE TRIGGER IF NOT EXISTS tasks_ad AFTER DELETE ON tasks BEGIN
-            INSERT INTO tasks_fts(tasks_fts, rowid, title, notes, description)
-            VALUES('delete', old.id, old.title, old.notes, old.description);
-        END;
-        CREATE TRIGGER IF NOT EXISTS tasks_au AFTER UPDATE ON tasks BEGIN
-            INSERT INTO tasks_fts(tasks_fts, rowid, title, notes, description)
-            VALUES('delete', old.id, old.title, old.notes, old.description);
-            INSERT INTO tasks_fts(rowid, title, notes, description)
-            VALUES (new.id, new.title, new.notes, new.description);
-        END;
-    """)
+    if not _installed(conn):
+        # eski (katlamasız, her UPDATE'te çalışan) tetikleyicileri değiştir ve indeksi yeniden kur
+        conn.executescript("""
+            DROP TRIGGER IF EXISTS tasks_ai;
+            DROP TRIGGER IF EXISTS tasks_ad;
+            DROP TRIGGER IF EXISTS tasks_au;
+        """ + _TRIGGERS)
+        _rebuild(conn)
     conn.commit()
+    _ready[_db_file(conn)] = True
     return True
 
-def reindex(conn: sqlite3.Connection) -> bool:
-    if not ensure_fts(conn):  # FTS yoksa False dön
-        return False
-    conn.execute("DELETE FROM tasks_fts;")
-    conn.execute("""
+def _rebuild(conn: sqlite3.Connection):
+    conn.execute("INSERT INTO tasks_fts(tasks_fts) VALUES('delete-all')")
+    conn.execute(f"""
         INSERT INTO tasks_fts(rowid, title, notes, description)
-        SELECT id, COALESCE(title,''), COALESCE(notes,''), COALESCE(description,'')
+        SELECT id, {_fold('title')}, {_fold('notes')}, {_fold('description')}
         FROM tasks;
     """)
+
+def _db_file(conn: sqlite3.Connection) -> str:
+    path = getattr(conn, "path", None)  # db_pool.PooledConnection
+    if path: return path
+    for _, name, path in conn.execute("PRAGMA database_list"):
+        if name == "main": return path or ""
+    return ""
+
+def ready(conn: sqlite3.Connection) -> bool:
+    """tasks_fts ve tetikleyicileri kurulu mu? Sonuç DB dosyası başına önbelleklenir (istek yolunda DDL yok)."""
+    key = _db_file(conn)
+    ok = _ready.get(key)
+    if ok is None:
+        try: ok = _installed(conn)
+        except Exception: ok = False
+        _ready[key] = ok
+    return ok
+
+def rebuild(conn: sqlite3.Connection) -> bool:
+    """Kurulu indeksi tasks'tan yeniden yazar; DDL ve commit yok (yazma kuyruğu işi olarak çalışır).
+    Kurulum migrate()'in işidir; kurulu değilse False."""
+    if not _installed(conn):
+        return False
+    _rebuild(conn)
+    return True
+
+def reindex(conn: sqlite3.Connection) -> bool:
+    # betikler için: gerekirse kurar, yeniden yazar ve commit eder
+    if not ensure_fts(conn):  # FTS yoksa False dön
+        return False
+    _rebuild(conn)
     conn.commit()
     return True
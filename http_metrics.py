@@ -0,0 +1,127 @@
+﻿import os, time, threading
+import db_pool
+
+# Saf ASGI ölçüm katmanı: rota şablonu başına süre / DB süresi / yanıt boyutu histogramları,
+# durum kodu sayaçları ve uçuştaki istek göstergesi. Çıktı metrics_router'daki metin
+# formatına lines() ile eklenir. Etiket olarak ham yol değil rota şablonu kullanılır
+# (/tasks/{task_id}); eşleşmeyen istekler tek "unmatched" etiketinde toplanır.
+
+def _buckets(env: str, default: str):
+    raw = os.getenv(env) or default
+    return tuple(sorted(float(x) for x in raw.split(",") if x.strip()))
+
+LATENCY_BUCKETS = _buckets("TODO_API_LATENCY_BUCKETS", "0.001,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5")
+SIZE_BUCKETS    = _buckets("TODO_API_SIZE_BUCKETS", "100,1000,10000,100000,1000000,10000000")
+
+class _Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, v: float):
+        i = 0
+        for b in self.bounds:
+            if v <= b: break
+            i += 1
+        self.counts[i] += 1
+        self.sum += v
+        self.count += 1
+
+    def lines(self, name: str, labels: str) -> list:
+        out, acc = [], 0
+        for b, n in zip(self.bounds, self.counts):
+            acc += n
+            out.append(f'{name}_bucket{{{labels},le="{b:g}"}} {acc}')
+        out.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        out.append(f"{name}_sum{{{labels}}} {self.sum:.6f}")
+        out.append(f"{name}_count{{{labels}}} {self.count}")
+        return out
+
+_lock = threading.Lock()
+_latency: dict = {}   # (method, route) -> _Histogram
+_db: dict = {}        # (method, route) -> _Histogram
+_size: dict = {}      # (method, route) -> _Histogram
+_status: dict = {}    # (method, route, status) -> int
+_in_flight: dict = {} # method -> int
+
+def _route(scope) -> str:
+    # path_format: yol dönüştürücüsüz şablon (/tasks/{task_id:int} -> /tasks/{task_id})
+    r = scope.get("route")
+    return getattr(r, "path_format", None) or getattr(r, "path", None) or "unmatched"
+
+def _record(method, route, status, dt, db_dt, size):
+    key = (method, route)
+    with _lock:
+        h = _latency.get(key)
+        if h is None:
+            h = _latency[key] = _Histogram(LATENCY_BUCKETS)
+            _db[key] = _Histogram(LATENCY_BUCKETS)
+            _size[key] = _Histogram(SIZE_BUCKETS)
+        h.observe(dt)
+        _db[key].observe(db_dt)
+        _size[key].observe(size)
+        sk = (method, route, status)
+        _status[sk] = _status.get(sk, 0) + 1
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        method = scope["method"]
+        status, size = 500, 0
+        box = [0.0]
+        token = db_pool.db_time.set(box)
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            t = message["type"]
+            if t == "http.response.start":
+                status = message["status"]
+            elif t == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        with _lock: _in_flight[method] = _in_flight.get(method, 0) + 1
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            dt = time.perf_counter() - t0
+            db_pool.db_time.reset(token)
+            with _lock: _in_flight[method] -= 1
+            _record(method, _route(scope), status, dt, box[0], size)
+
+def _labels(method, route) -> str:
+    route = route.replace("\\", "\\\\").replace('"', '\\"')
+    return f'method="{method}",route="{route}"'
+
+def lines() -> list:
+    with _lock:
+        out = ["# HELP todo_http_requests_in_flight Requests currently being served.",
+               "# TYPE todo_http_requests_in_flight gauge"]
+        out += [f'todo_http_requests_in_flight{{method="{m}"}} {n}' for m, n in sorted(_in_flight.items())]
+        out += ["# HELP todo_http_requests_total Requests by route and status code.",
+                "# TYPE todo_http_requests_total counter"]
+        out += [f'todo_http_requests_total{{{_labels(m, r)},status="{s}"}} {n}'
+                for (m, r, s), n in sorted(_status.items())]
+        for name, store, help_ in (
+            ("todo_http_request_duration_seconds", _latency, "Request latency by route."),
+            ("todo_http_request_db_seconds", _db, "Time spent in SQLite per request, by route."),
+            ("todo_http_response_size_bytes", _size, "Response body size by route."),
+        ):
+            out += [f"# HELP {name} {help_}", f"# TYPE {name} histogram"]
+            for (m, r) in sorted(store):
+                out += store[(m, r)].lines(name, _labels(m, r))
+    return out
+
+def reset():
+    with _lock:
+        for d in (_latency, _db, _size, _status):
+            d.clear()
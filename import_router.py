@@ -1,9 +1,10 @@
 ﻿from fastapi import APIRouter, Request, UploadFile, File, Query, HTTPException
-import sqlite3, os, json, csv, io
+import sqlite3, os, json, csv, io, codecs, itertools, threading, time
 from typing import Any, List, Optional
+import db_async, task_tags, task_cache, task_times
+from fast_json import FastJSONResponse
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "todo.db")
-router = APIRouter()
+router = APIRouter(default_response_class=FastJSONResponse)
 
 def _coerce_bool(v):
     if v is None: return None
@@ -30,165 +31,260 @@ def _tags_to_json_text(val: Any):
     except Exception:
         return None
 
-def _load_json_text(text: str) -> List[dict]:
-    text = (text or "").strip()
-    if not text: return []
-    try:
-        obj = json.loads(text)
-        if isinstance(obj, list): return obj
-        return [obj]
-    except json.JSONDecodeError:
-        # NDJSON fallback
-        rows = []
-        for line in text.splitlines():
-            line=line.strip()
-            if line:
-                rows.append(json.loads(line))
-        return rows
-
-def _load_csv_text(text: str) -> List[dict]:
-    buf = io.StringIO(text)
-    rdr = csv.DictReader(buf)
-    rows = []
-    for r in rdr:
-        rows.append({k:(v if v != "" else None) for k,v in r.items()})
-    return rows
-
-def _apply_one(cur: sqlite3.Cursor, row: dict, mode: str) -> str:
-    """
-    mode: insert | update | replace | upsert
-    returns: 'inserted' | 'updated' | 'replaced' | 'ignored'
-    """
+_DECODER = json.JSONDecoder()
+_WS = " \t\r\n"
+
+async def _text_chunks(byte_chunks):
+    dec = codecs.getincrementaldecoder("utf-8-sig")(errors="ignore")
+    async for b in byte_chunks:
+        if b:
+            t = dec.decode(b)
+            if t: yield t
+    t = dec.decode(b"", final=True)
+    if t: yield t
+
+async def _iter_json(chunks):
+    """JSON dizisi, tek JSON nesnesi veya NDJSON akışını kayıt kayıt çözer; tampon en fazla bir kayıt kadar büyür."""
+    buf, pos, eof = "", 0, False
+    in_array = None
+    it = chunks.__aiter__()
+
+    async def more():
+        nonlocal buf, pos, eof
+        try:
+            buf = buf[pos:] + await it.__anext__(); pos = 0
+        except StopAsyncIteration:
+            eof = True
+
+    while True:
+        while pos < len(buf) and (buf[pos] in _WS or (in_array and buf[pos] == ",")):
+            pos += 1
+        if pos >= len(buf):
+            if eof: break
+            await more(); continue
+        if in_array is None:
+            in_array = buf[pos] == "["
+            if in_array: pos += 1
+            continue
+        if in_array and buf[pos] == "]":
+            break
+        try:
+            obj, end = _DECODER.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof: raise HTTPException(status_code=400, detail="Invalid JSON in import body")
+            await more(); continue
+        if end >= len(buf) and not eof:
+            # sayı/sabit parça sınırında bitmiş olabilir: sonrasını görmeden kabul etme
+            await more(); continue
+        pos = end
+        yield obj
+
+async def _iter_lines(chunks):
+    rest = ""
+    async for t in chunks:
+        rest += t
+        *lines, rest = rest.split("\n")
+        for line in lines:
+            yield line
+    if rest:
+        yield rest
+
+async def _iter_csv(chunks):
+    header, pending = None, ""
+    async for line in _iter_lines(chunks):
+        pending = (pending + "\n" + line) if pending else line
+        if pending.count('"') % 2:  # tırnak içinde satır sonu: kayıt henüz bitmedi
+            continue
+        rec, pending = pending, ""
+        if not rec.strip(): continue
+        vals = next(csv.reader([rec.rstrip("\r")]), [])
+        if header is None:
+            header = vals; continue
+        yield {k:(v if v != "" else None) for k,v in zip(header, vals)}
+    if pending.strip():
+        raise HTTPException(status_code=400, detail="Unterminated quoted field in CSV")
+
+async def _file_chunks(f: UploadFile, size: int = 64 * 1024):
+    while True:
+        b = await f.read(size)
+        if not b: break
+        yield b
+
+_FIELDS = f"id,title,notes,description,tags,done,due,created_at,updated_at,{task_times.TS_COLUMNS}"
+# *_ts aynı deyimde yazılır; task_times tetikleyicileri doğru yazılmış satırda ek UPDATE yapmaz
+_TS = task_times.values(due=":due", created_at=":created_at", updated_at=":updated_at")
+
+# Eksik (None) alanlar mevcut değeri korur: COALESCE(:alan, alan)
+_SET = f"""title=COALESCE(:title,title), notes=COALESCE(:notes,notes),
+          description=COALESCE(:description,description), tags=COALESCE(:tags,tags),
+          done=COALESCE(:done,done), due=COALESCE(:due,due), updated_at=CURRENT_TIMESTAMP,
+          due_ts={task_times.expr("COALESCE(:due,due)")}, updated_ts={task_times.expr("CURRENT_TIMESTAMP")}"""
+
+_SQL = {
+    "insert":  f"INSERT OR IGNORE INTO tasks ({_FIELDS}) VALUES (:id,:title,:notes,:description,:tags,:done0,:due,:created_at,:updated_at,{_TS})",
+    "replace": f"INSERT OR REPLACE INTO tasks ({_FIELDS}) VALUES (:id,:title,:notes,:description,:tags,:done0,:due,:created_at,:updated_at,{_TS})",
+    "update":  f"UPDATE tasks SET {_SET} WHERE id=:id",
+    # title NOT NULL kontrolü ON CONFLICT'ten önce yapılır; mevcut satırda COALESCE(:title,title) geçerli olur
+    "upsert":  f"""INSERT INTO tasks ({_FIELDS})
+                   VALUES (:id,COALESCE(:title,''),:notes,:description,:tags,:done0,:due,:created_at,:updated_at,{_TS})
+                   ON CONFLICT(id) DO UPDATE SET {_SET}""",
+}
+
+def _prepare(row: dict, n: Optional[int] = None) -> dict:
+    """n: hata mesajında anılan 1 tabanlı kayıt sırası."""
+    if not isinstance(row, dict):
+        raise HTTPException(status_code=400, detail="Each import record must be an object")
     rid   = row.get("id")
+    if isinstance(rid, str):
+        # CSV'den metin gelir; id kümesi karşılaştırmaları tamsayı üzerinden yapılır
+        rid = int(rid) if rid.strip().isdigit() else (rid.strip() or None)
+    if rid is not None and (isinstance(rid, bool) or not isinstance(rid, int) or rid < 1):
+        where = f"Row {n}" if n else "Row"
+        raise HTTPException(status_code=400, detail=f"{where}: 'id' must be a positive integer, got {row.get('id')!r}")
     title = row.get("title")
-    notes = row.get("notes")
-    desc  = row.get("description")
-    tags  = _tags_to_json_text(row.get("tags"))
-    doneB = _coerce_bool(row.get("done"))
-    due   = row.get("due")
-    ca    = row.get("created_at")
-    ua    = row.get("updated_at")
-
     if not title and not rid:
         raise HTTPException(status_code=400, detail="Row missing 'title' (or an existing 'id')")
+    doneB = _coerce_bool(row.get("done"))
+    done  = None if doneB is None else (1 if doneB else 0)
+    return {
+        "id": rid, "title": title, "notes": row.get("notes"), "description": row.get("description"),
+        "tags": _tags_to_json_text(row.get("tags")), "done": done, "done0": done or 0,
+        "due": row.get("due"), "created_at": row.get("created_at"), "updated_at": row.get("updated_at"),
+    }
+
+def _existing_ids(conn, ids) -> set:
+    ids = list(set(ids)); out = set()
+    for i in range(0, len(ids), 900):
+        part = ids[i:i+900]
+        out.update(r[0] for r in conn.execute(f"SELECT id FROM tasks WHERE id IN ({','.join('?' * len(part))})", part))
+    return out
+
+def _max_id(conn) -> int:
+    return conn.execute("SELECT COALESCE(MAX(id),0) FROM tasks").fetchone()[0]
+
+def _upsert(conn, rows: List[dict], counts: dict):
+    """Tek executemany ile upsert; inserted/updated sayıları satır sırasına göre birebir hesaplanır.
+    id'siz satırların aldığı autoinc id'ler (lo, hi] aralıkları olarak izlenir; sonraki bir satır
+    bu id'lerden birini açıkça verirse güncelleme sayılır (eski satır-satır davranışla aynı)."""
+    present = _existing_ids(conn, [r["id"] for r in rows if r["id"] is not None])
+    ranges = []
+    seg_start = 0
+    def run(seg):
+        if seg: conn.executemany(_SQL["upsert"], seg)
+    for i, r in enumerate(rows):
+        rid = r["id"]
+        if rid is None:
+            counts["inserted"] += 1
+            continue
+        if i > seg_start and rows[i-1]["id"] is None:
+            # önceki id'siz satırları yaz ve aldıkları id aralığını öğren
+            lo = _max_id(conn); run(rows[seg_start:i]); ranges.append((lo, _max_id(conn))); seg_start = i
+        if rid in present or any(lo < rid <= hi for lo, hi in ranges):
+            counts["updated"] += 1
+        elif not r["title"]:
+            raise HTTPException(status_code=400, detail=f"Row with new id {rid} is missing 'title'")
+        else:
+            counts["inserted"] += 1
+            present.add(rid)
+    run(rows[seg_start:])
+
+_COUNTERS = ("processed", "inserted", "updated", "replaced", "ignored")
+_progress: dict = {}
+_progress_ids = itertools.count(1)
+_progress_lock = threading.Lock()
+_KEEP_FINISHED = 20
+
+async def _apply_batch(records: List[dict], mode: str, first: int = 1) -> dict:
+    # her parti yazma kuyruğunda tek iş: yazma kilidi parti süresince tutulur, tüm import boyunca değil
+    if mode not in _SQL:
+        raise HTTPException(status_code=400, detail=f"Unsupported mode: {mode}")
+    rows = [_prepare(r, n) for n, r in enumerate(records, first)]
+    return await db_async.write(_write_batch, rows, mode)
 
-    # mevcut mu?
-    exists = False
-    if rid is not None:
-        cur.execute("SELECT 1 FROM tasks WHERE id=?", (rid,))
-        exists = cur.fetchone() is not None
-
-    if mode == "insert":
-        # sadece insert, çakışırsa ignore
-        cur.execute("""
-            INSERT OR IGNORE INTO tasks (id,title,notes,description,tags,done,due,created_at,updated_at)
-            VALUES (?,?,?,?,?,?,?,?,?)
-        """, (
-            rid, title, notes, desc, tags,
-            (1 if doneB else 0) if doneB is not None else 0,
-            due, ca, ua
-        ))
-        return 'inserted' if cur.rowcount else 'ignored'
-
-    if mode == "replace":
-        cur.execute("""
-            INSERT OR REPLACE INTO tasks (id,title,notes,description,tags,done,due,created_at,updated_at)
-            VALUES (?,?,?,?,?,?,?,?,?)
-        """, (
-            rid, title, notes, desc, tags,
-            (1 if doneB else 0) if doneB is not None else 0,
-            due, ca, ua
-        ))
-        return 'replaced'
-
-    if mode in ("update","upsert"):
-        if not exists:
-            if mode == "update":
-                return 'ignored'
-            # upsert -> yeni ekle (id yoksa autoinc)
-            cur.execute("""
-                INSERT INTO tasks (id,title,notes,description,tags,done,due,created_at,updated_at)
-                VALUES (?,?,?,?,?,?,?,?,?)
-            """, (
-                rid, title, notes, desc, tags,
-                (1 if doneB else 0) if doneB is not None else 0,
-                due, ca, ua
-            ))
-            return 'inserted'
-        # exists -> update
-        sets, params = [], []
-        if title is not None: sets.append("title=?"); params.append(title)
-        if notes is not None: sets.append("notes=?"); params.append(notes)
-        if desc  is not None: sets.append("description=?"); params.append(desc)
-        if tags  is not None: sets.append("tags=?"); params.append(tags)
-        if doneB is not None: sets.append("done=?"); params.append(1 if doneB else 0)
-        if due   is not None: sets.append("due=?"); params.append(due)
-        # updated_at varsa güncelle
-        sets.append("updated_at=CURRENT_TIMESTAMP")
-        params.append(rid)
-        cur.execute(f"UPDATE tasks SET {', '.join(sets)} WHERE id=?", params)
-        return 'updated' if cur.rowcount else 'ignored'
-
-    raise HTTPException(status_code=400, detail=f"Unsupported mode: {mode}")
+def _write_batch(conn, rows: List[dict], mode: str) -> dict:
+    counts = dict.fromkeys(_COUNTERS[1:], 0)
+    before = _max_id(conn)
+    if mode == "upsert":
+        _upsert(conn, rows, counts)
+    else:
+        cur = conn.executemany(_SQL[mode], rows if mode != "update" else [r for r in rows if r["id"] is not None])
+        if mode == "replace":
+            counts["replaced"] = len(rows)
+        else:
+            key = "inserted" if mode == "insert" else "updated"
+            counts[key] = cur.rowcount
+            counts["ignored"] = len(rows) - cur.rowcount
+    # açık id'ler + bu partide autoinc ile eklenenler
+    touched = {r["id"] for r in rows if r["id"] is not None}
+    touched.update(range(before + 1, _max_id(conn) + 1))
+    task_tags.sync(conn, touched)
+    task_cache.invalidate_on_commit(touched)
+    return counts
+
+def _progress_start(mode: str) -> dict:
+    with _progress_lock:
+        finished = [k for k, v in _progress.items() if v["finished"]]
+        for k in finished[:-_KEEP_FINISHED]:
+            _progress.pop(k, None)
+        st = {"id": next(_progress_ids), "mode": mode, "batches": 0, "started": time.time(),
+              "finished": None, "error": None, **dict.fromkeys(_COUNTERS, 0)}
+        _progress[st["id"]] = st
+    return st
+
+@router.get("/import/progress", tags=["tasks"])
+async def import_progress():
+    with _progress_lock:
+        return {"imports": [dict(v) for v in _progress.values()]}
 
 @router.post("/import", tags=["tasks"])
 async def import_tasks(request: Request,
-                       mode: str = Query("upsert", pattern="^(insert|update|replace|upsert)$")):
+                       mode: str = Query("upsert", pattern="^(insert|update|replace|upsert)$"),
+                       batch: int = Query(1000, ge=1, le=50000, description="Kaç kayıtta bir commit edilir")):
     ct = (request.headers.get("content-type") or "").lower()
-    records: List[dict] = []
-    text: Optional[str] = None
-
-    if "application/json" in ct or "text/json" in ct:
-        text = (await request.body()).decode("utf-8-sig", "ignore")
-        records = _load_json_text(text)
-    elif "text/csv" in ct:
-        text = (await request.body()).decode("utf-8-sig", "ignore")
-        records = _load_csv_text(text)
+
+    if "text/csv" in ct:
+        records = _iter_csv(_text_chunks(request.stream()))
     elif "multipart/form-data" in ct:
         form = await request.form()
         f: UploadFile = form.get("file")  # name=file
         if not f:
             raise HTTPException(status_code=400, detail="No file part 'file'")
-        content = (await f.read()).decode("utf-8-sig", "ignore")
         if (f.filename or "").lower().endswith(".csv"):
-            records = _load_csv_text(content)
+            records = _iter_csv(_text_chunks(_file_chunks(f)))
         else:
-            records = _load_json_text(content)
+            records = _iter_json(_text_chunks(_file_chunks(f)))
     else:
-        # ham gövdeyi JSON dene
-        text = (await request.body()).decode("utf-8-sig", "ignore")
-        records = _load_json_text(text)
+        # application/json, NDJSON ya da ham gövde: JSON değer akışı olarak çöz
+        records = _iter_json(_text_chunks(request.stream()))
+
+    st = _progress_start(mode)
+    pending: List[dict] = []
 
-    if not isinstance(records, list) or not records:
-        return {"ok": True, "processed": 0, "inserted": 0, "updated": 0, "replaced": 0, "ignored": 0}
+    async def flush():
+        counts = await _apply_batch(pending, mode, st["processed"] + 1)
+        with _progress_lock:
+            for k, v in counts.items(): st[k] += v
+            st["processed"] += len(pending); st["batches"] += 1
+        pending.clear()
 
-    conn = sqlite3.connect(DB_PATH)
     try:
-        cur = conn.cursor()
-        # tablo garanti
-        cur.executescript("""
-        CREATE TABLE IF NOT EXISTS tasks (
-          id INTEGER PRIMARY KEY,
-          title TEXT NOT NULL,
-          notes TEXT,
-          description TEXT,
-          tags TEXT,
-          done INTEGER DEFAULT 0,
-          due TEXT,
-          created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-          updated_at TEXT DEFAULT CURRENT_TIMESTAMP
-        );
-        """)
-        inserted=updated=replaced=ignored=0
-        for r in records:
-            res = _apply_one(cur, r, mode)
-            if   res == 'inserted':  inserted += 1
-            elif res == 'updated':   updated  += 1
-            elif res == 'replaced':  replaced += 1
-            else:                    ignored  += 1
-        conn.commit()
-        return {"ok": True, "processed": len(records),
-                "inserted": inserted, "updated": updated,
-                "replaced": replaced, "ignored": ignored}
+        async for r in records:
+            if isinstance(r, list):
+                raise HTTPException(status_code=400, detail="Each import record must be an object")
+            pending.append(r)
+            if len(pending) >= batch:
+                await flush()
+        if pending:
+            await flush()
+    except HTTPException as e:
+        st["error"] = e.detail
+        if st["processed"]:
+            e.detail = f"{e.detail} (first {st['processed']} rows were already committed)"
+        raise
+    except Exception as e:
+        st["error"] = str(e)
+        raise
     finally:
-        conn.close()
+        st["finished"] = time.time()
+
+    return {"ok": True, **{k: st[k] for k in _COUNTERS}, "batches": st["batches"]}
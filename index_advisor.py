@@ -0,0 +1,75 @@
+﻿import sqlite3, time
+from typing import List
+import migrations, task_record
+from task_query import TaskQuery, SORTS
+
+# Kanonik okuma sorgularının EXPLAIN QUERY PLAN denetimi (GET /admin/indexes/advice).
+# Liste/export sorguları uçların kendi yoluyla kurulur (TaskQuery.page / select), metrics sorguları
+# kendi SQL'lerinin aynısıyla. Bir sorgu, tabloyu baştan sona okuyorsa işaretlenir: indekssiz SCAN ve
+# ya LIMIT yok ya da sonuç geçici B-tree'de sıralanıyor (LIMIT'li, ORDER BY sırasındaki SCAN ilk
+# sayfada durur; o işaretlenmez).
+
+_SAMPLE = {"due": "2025-01-01", "tag": "x"}
+
+def canonical(conn: sqlite3.Connection) -> List[dict]:
+    """[{name, sql, params, full}] — full: sorgu doğası gereği tüm satırları okur (filtresiz export)."""
+    out = []
+    def add(name, sql_params, full=False):
+        out.append({"name": name, "sql": sql_params[0], "params": list(sql_params[1]), "full": full})
+    due, available = _SAMPLE["due"], migrations.columns(conn)
+    filters = {
+        "": {},
+        "done": {"done": False},
+        "due_before": {"due_before": due},
+        "due_after": {"due_after": due},
+        "done due_before": {"done": False, "due_before": due},
+        "tag": {"tag": [_SAMPLE["tag"]]},
+    }
+    # main.list_tasks: varsayılan sıralama id desc (adda yazılmaz), "main" biçimi
+    for sort in SORTS:
+        for fname, kw in filters.items():
+            name = "main.list" + ("" if sort == "id" else f" sort={sort}") + (f" {fname}" if fname else "")
+            add(name, TaskQuery(sort=sort, **kw).page("main", None, available, 50))
+    sparse = task_record.parse_fields("id,title,done", "main")
+    for fname, kw in (("fields=id,title,done", {}), ("done fields=id,title,done", {"done": False})):
+        add(f"main.list {fname}", TaskQuery(**kw).page("main", sparse, available, 50))
+    for fname, kw in filters.items():
+        add("export" + (f" {fname}" if fname else ""), TaskQuery(**kw).select(fts=False), full=not kw)
+    add("metrics.recent_done_24h",
+        ("SELECT COUNT(*) FROM tasks WHERE done=1 AND updated_ts >= ?", [int(time.time()) - 86400]))
+    add("metrics.overdue", ("SELECT COUNT(*) AS n FROM tasks WHERE done=0 AND due_ts < ?", [int(time.time())]))
+    add("metrics.counts", ("SELECT total, done FROM task_stats WHERE id = 1", []))
+    add("metrics.tag_counts", ("SELECT tag, total, open FROM tag_stats ORDER BY tag", []))
+    return out
+
+def _scan_of_table(detail: str) -> bool:
+    # "SCAN t" / "SCAN tasks" — "SCAN t USING INDEX ..." indeks sırasıyla okur, sayılmaz
+    parts = detail.split()
+    return len(parts) >= 2 and parts[0] == "SCAN" and parts[1] in ("t", "tasks") and "USING" not in parts
+
+def explain(conn: sqlite3.Connection, sql: str, params) -> List[str]:
+    rows = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    depth = {0: 0}
+    lines = []
+    for r in rows:
+        depth[r[0]] = depth.get(r[1], 0) + 1
+        lines.append("  " * (depth[r[0]] - 1) + r[3])
+    return lines
+
+def advise(conn: sqlite3.Connection) -> dict:
+    queries = []
+    for q in canonical(conn):
+        plan = explain(conn, q["sql"], q["params"])
+        details = [p.strip() for p in plan]
+        scan = any(_scan_of_table(d) for d in details)
+        temp_sort = any(d.startswith("USE TEMP B-TREE FOR ORDER BY") for d in details)
+        limited = " LIMIT " in q["sql"]
+        indexes = sorted({d.split(" INDEX ")[1].split()[0] for d in details if " INDEX " in d})
+        queries.append({
+            "name": q["name"], "sql": q["sql"], "plan": plan, "indexes": indexes,
+            "covering": any("COVERING INDEX" in d for d in details),
+            "full_scan": scan, "temp_sort": temp_sort,
+            "flagged": scan and (temp_sort or not limited) and not q["full"],
+        })
+    flagged = [q["name"] for q in queries if q["flagged"]]
+    return {"ok": not flagged, "flagged": flagged, "queries": queries}
@@ -2,15 +2,17 @@
 
 
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Response, Request
 from pydantic import BaseModel, field_validator
 from typing import Optional, List
 import logging
 import sqlite3, os, datetime as dt
+import db_pool, task_query, task_tags, task_stats, fts_util, migrations, http_metrics, sql_profiler, db_async, etag, task_cache, task_record, task_times
+from fast_json import FastJSONResponse, dumps as json_bytes
 logger = logging.getLogger(__name__)
 
 APP_TITLE = "Todo API"
-DB_PATH = os.path.join(os.path.dirname(__file__), "todo.db")
+DB_PATH = db_pool.DB_PATH
 
 app = FastAPI(
     title="Todo API",
@@ -18,31 +20,27 @@ app = FastAPI(
     openapi_url="/openapi.json",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=FastJSONResponse,
 )
+app.add_middleware(http_metrics.MetricsMiddleware)
+app.add_middleware(sql_profiler.ProfilerMiddleware)
 
+@app.exception_handler(db_pool.PoolTimeout)
+async def _pool_timeout(request: Request, exc: db_pool.PoolTimeout):
+    # bağlantı şeridi ya da yazma kuyruğu dolu: genel 500 yerine geçici hata, istemci tekrar dener
+    return FastJSONResponse({"detail": str(exc)}, status_code=503, headers={"Retry-After": "1"})
 
-def _conn():
-    con = sqlite3.connect(DB_PATH, check_same_thread=False)
-    con.row_factory = sqlite3.Row
-    return con
+
+FTS_ENABLED = False
 
 def _ensure_schema():
-    con = _conn(); c = con.cursor()
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS tasks(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            notes TEXT DEFAULT '',
-            tags  TEXT DEFAULT '',
-            done  INTEGER DEFAULT 0,
-            due   TEXT,
-            created_at TEXT DEFAULT (datetime('now')),
-            updated_at TEXT DEFAULT (datetime('now'))
-        );
-    """)
-    con.commit(); con.close()
+    global FTS_ENABLED
+    with db_pool.writer() as con:
+        migrations.migrate(con)
+        FTS_ENABLED = fts_util.ready(con)
 
 _ensure_schema()
+db_pool.get_pool().warm()
 
 def _tags_to_str(tags: List[str] | None) -> str:
     if not tags: return ""
@@ -54,21 +52,18 @@ def _tags_to_str(tags: List[str] | None) -> str:
             seen.add(t.lower()); out.append(t)
     return " ".join(out)
 
-def _str_to_tags(s: str | None) -> List[str]:
-    s = (s or "").strip()
-    return [t for t in s.split() if t]
-
 def _row_to_task(r: sqlite3.Row):
-    return {
-        "id": r["id"],
-        "title": r["title"],
-        "notes": r["notes"],
-        "tags": _str_to_tags(r["tags"]),
-        "done": bool(r["done"]),
-        "due": r["due"],
-        "created_at": r["created_at"],
-        "updated_at": r["updated_at"],
-    }
+    # TaskOut sözleşmesi task_record'un "main" biçiminde sağlanır (NULL metinler ""): handler'lar
+    # dict'i doğrudan FastJSONResponse ile döner, response_model yalnız OpenAPI şeması için kalır
+    return task_record.to_dict(r, "main")
+
+def _fields(fields: Optional[str]):
+    try:
+        return task_record.parse_fields(fields, "main")
+    except task_record.FieldsError as e:
+        raise HTTPException(400, detail=str(e))
+
+_FIELDS_Q = Query(None, description="Virgülle ayrılmış alanlar (örn. id,title,done); SQL yalnız bu kolonları okur")
 
 class TaskCreate(BaseModel):
     title: str
@@ -108,71 +103,77 @@ def where():
 def routes():
     return sorted([r.path for r in app.routes])
 
+# *_ts aynı deyimde yazılır (task_times); tetikleyici ikinci bir UPDATE yapmaz
+_INSERT_TASK = f"""
+    INSERT INTO tasks(title, notes, tags, done, due, created_at, updated_at, {task_times.TS_COLUMNS})
+    VALUES(:title, :notes, :tags, 0, :due, datetime('now'), datetime('now'),
+           {task_times.values(due=":due", created_at="datetime('now')", updated_at="datetime('now')")})
+"""
+
 @app.post("/tasks", response_model=TaskOut)
-def create_task(task: TaskCreate):
+async def create_task(task: TaskCreate):
     tags_str = _tags_to_str(task.tags)
-    con = _conn(); c = con.cursor()
-    c.execute("""
-        INSERT INTO tasks(title, notes, tags, done, due, created_at, updated_at)
-        VALUES(?,?,?,?,?, datetime('now'), datetime('now'))
-    """, (task.title.strip(), task.notes or "", tags_str, 0, task.due))
-    tid = c.lastrowid
-    con.commit()
-    r = c.execute("SELECT * FROM tasks WHERE id=?", (tid,)).fetchone()
-    con.close()
-    return _row_to_task(r)
+    def write(con):
+        c = con.cursor()
+        c.execute(_INSERT_TASK, {"title": task.title.strip(), "notes": task.notes or "", "tags": tags_str, "due": task.due})
+        tid = c.lastrowid
+        task_tags.sync_rows(con, [(tid, tags_str)])
+        task_cache.invalidate_on_commit([tid])
+        return c.execute("SELECT * FROM tasks WHERE id=?", (tid,)).fetchone()
+    return FastJSONResponse(_row_to_task(await db_async.write(write)))
 
 @app.get("/tasks", response_model=List[TaskOut])
-def list_tasks(
+async def list_tasks(
+    request: Request,
     q: Optional[str] = None,
     done: Optional[bool] = None,
-    tag: Optional[str] = None,
-    due_before: Optional[str] = None,
-    due_after: Optional[str] = None,
+    tag: Optional[List[str]] = Query(None, description="Birden çok tag (hepsi eşleşmeli)"),
+    due_before: Optional[str] = Query(None, description="YYYY-MM-DD[ HH:MM] ya da @epoch"),
+    due_after: Optional[str] = Query(None, description="YYYY-MM-DD[ HH:MM] ya da @epoch"),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    sort: Optional[str] = Query("id", description="id|title|due|created_at|updated_at"),
+    order: Optional[str] = Query("desc", description="asc|desc"),
+    count: bool = Query(False, description="Toplam eşleşme sayısını X-Total-Count başlığında döndür"),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = _FIELDS_Q,
 ):
-    clauses, args = [], []
-    if q:
-        clauses.append("(title LIKE ? OR notes LIKE ?)")
-        like = f"%{q}%"
-        args.extend([like, like])
-    if done is not None:
-        clauses.append("done = ?")
-        args.append(1 if done else 0)
-    if tag:
-        # tags stored as space-separated; match token boundary
-        clauses.append("((' ' || tags || ' ') LIKE ?)")
-        args.append(f"% {tag} %")
-    # due filters
-    def _valid_iso(s: str) -> bool:
-        try:
-            dt.datetime.fromisoformat(s)
-            return True
-        except Exception:
-            return False
-    if due_before:
-        if not _valid_iso(due_before): raise HTTPException(422, detail="invalid due_before")
-        clauses.append("(due IS NOT NULL AND due < ?)")
-        args.append(due_before)
-    if due_after:
-        if not _valid_iso(due_after): raise HTTPException(422, detail="invalid due_after")
-        clauses.append("(due IS NOT NULL AND due > ?)")
-        args.append(due_after)
-
-    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
-    sql = f"SELECT * FROM tasks {where} ORDER BY id DESC LIMIT ? OFFSET ?"
-    args.extend([limit, offset])
-
-    con = _conn(); c = con.cursor()
-    rows = c.execute(sql, tuple(args)).fetchall()
-    con.close()
+    # filtre/sıralama/cursor anlamı task_query.TaskQuery'de: export ile aynı derleyici
+    keys = _fields(fields)
+    if cursor and offset: raise HTTPException(400, detail="cursor and offset cannot be combined")
+    try:
+        tq = task_query.TaskQuery(done=done, q=q, tag=tag, due_before=due_before, due_after=due_after,
+                                  sort=sort, order=order, cursor=cursor)
+    except task_query.CursorError as e:
+        raise HTTPException(400, detail=str(e))
+    except task_query.FilterError as e:
+        raise HTTPException(422, detail=str(e))
+
+    def read(con):
+        # sayaç ve satırlar aynı anlık görüntüden; etiket eşleşirse liste sorgusu hiç çalışmaz
+        con.execute("BEGIN")
+        tag_ = etag.list_etag(task_stats.version(con), request)
+        if etag.matches(request, tag_): return tag_, None, None
+        sql, params = tq.page("main", keys, migrations.columns(con), limit, offset, fts=FTS_ENABLED)
+        rows = con.execute(sql, params).fetchall()
+        total = None
+        if count:
+            csql, cparams = tq.count(fts=FTS_ENABLED)
+            total = con.execute(csql, cparams).fetchone()[0]
+        return tag_, rows, total
+    tag_, rows, total = await db_async.read(read)
+    if rows is None: return etag.not_modified(tag_)
+    headers = {"ETag": tag_}
+    if total is not None: headers["X-Total-Count"] = str(total)
+    nxt = tq.next_cursor(rows, limit)
+    if nxt: headers["X-Next-Cursor"] = nxt
 
     items = []
     skipped_ids = []
+    to_task = task_record.mapper(rows[0], "main", keys).to_dict if rows else None
     for row in rows:
         try:
-            items.append(_row_to_task(row))
+            items.append(to_task(row))
         except Exception as exc:
             task_id = None
             if isinstance(row, sqlite3.Row):
@@ -184,82 +185,84 @@ def list_tasks(
             logger.warning("list_tasks: skipping task id=%s due to invalid data: %s", task_id, exc)
     if skipped_ids:
         logger.warning("list_tasks: skipped %d task(s) due to invalid data. ids=%s", len(skipped_ids), skipped_ids)
-    return items
-
-
-@app.get("/tasks/{task_id}", response_model=TaskOut)
-def get_task(task_id: int):
-    con = _conn(); c = con.cursor()
-    r = c.execute("SELECT * FROM tasks WHERE id=?", (task_id,)).fetchone()
-    con.close()
-    if not r: raise HTTPException(404, "not found")
-    return _row_to_task(r)
-
-@app.patch("/tasks/{task_id}")
-def patch_task(task_id: int, patch: TaskUpdate):
-    con = _conn(); c = con.cursor()
-    r = c.execute("SELECT * FROM tasks WHERE id=?", (task_id,)).fetchone()
-    if not r:
-        con.close(); raise HTTPException(404, "not found")
-
-    title = patch.title if patch.title is not None else r["title"]
-    notes = patch.notes if patch.notes is not None else r["notes"]
-    tags_str = _tags_to_str(patch.tags) if patch.tags is not None else r["tags"]
-    done = (1 if patch.done else 0) if patch.done is not None else r["done"]
-    due = patch.due if patch.due is not None else r["due"]
-
-    c.execute("""
-        UPDATE tasks SET title=?, notes=?, tags=?, done=?, due=?, updated_at=datetime('now')
-        WHERE id=?
-    """, (title, notes, tags_str, done, due, task_id))
-    con.commit()
-    con.close()
+    return FastJSONResponse(items, headers=headers)
+
+
+@app.get("/tasks/{task_id:int}", response_model=TaskOut)
+async def get_task(task_id: int, request: Request, fields: Optional[str] = _FIELDS_Q):
+    # önbellekte serileştirilmiş gövde durur; her alan kümesi ayrı gösterim
+    keys = _fields(fields)
+    ns = "main" if keys is None else "main:" + ",".join(keys)
+    hit = task_cache.get(ns, task_id)
+    if hit is None:
+        token = task_cache.begin()
+        def read(con):
+            cols = task_record.projection("main", keys, migrations.columns(con), extra=("id", "updated_at"))
+            return con.execute(f"SELECT {cols} FROM tasks t WHERE t.id=?", (task_id,)).fetchone()
+        r = await db_async.read(read)
+        if not r: raise HTTPException(404, "not found")
+        tag_ = etag.task_etag(r)
+        body = json_bytes(task_record.to_dict(r, "main", keys))
+        task_cache.put(ns, task_id, tag_, body, token)
+    else:
+        tag_, body = hit
+    if etag.matches(request, tag_): return etag.not_modified(tag_)
+    return Response(body, headers={"ETag": tag_}, media_type=FastJSONResponse.media_type)
+
+@app.patch("/tasks/{task_id:int}")
+async def patch_task(task_id: int, patch: TaskUpdate):
+    def write(con):
+        r = con.execute("SELECT * FROM tasks WHERE id=?", (task_id,)).fetchone()
+        if not r: raise HTTPException(404, "not found")
+
+        title = patch.title if patch.title is not None else r["title"]
+        notes = patch.notes if patch.notes is not None else r["notes"]
+        tags_str = _tags_to_str(patch.tags) if patch.tags is not None else r["tags"]
+        done = (1 if patch.done else 0) if patch.done is not None else r["done"]
+        due = patch.due if patch.due is not None else r["due"]
+
+        con.execute("""
+            UPDATE tasks SET title=?, notes=?, tags=?, done=?, due=?, updated_at=datetime('now')
+            WHERE id=?
+        """, (title, notes, tags_str, done, due, task_id))
+        if patch.tags is not None:
+            task_tags.sync_rows(con, [(task_id, tags_str)])
+        task_cache.invalidate_on_commit([task_id])
+    await db_async.write(write)
     return {"ok": True}
 
-@app.delete("/tasks/{task_id}")
-def delete_task(task_id: int):
-    con = _conn(); c = con.cursor()
-    c.execute("DELETE FROM tasks WHERE id=?", (task_id,))
-    con.commit(); con.close()
+@app.delete("/tasks/{task_id:int}")
+async def delete_task(task_id: int):
+    def write(con):
+        con.execute("DELETE FROM tasks WHERE id=?", (task_id,))
+        task_cache.invalidate_on_commit([task_id])
+    await db_async.write(write)
     return {"ok": True}
 
 @app.get("/metrics")
-def metrics():
-    con = _conn(); c = con.cursor()
-    total = c.execute("SELECT COUNT(*) AS n FROM tasks").fetchone()["n"]
-    done = c.execute("SELECT COUNT(*) AS n FROM tasks WHERE done=1").fetchone()["n"]
+async def metrics():
+    def read(con):
+        total, done = task_stats.counts(con)
+        # yerel saat, saklanan due değerleriyle aynı (dilimsiz) kuralla epoch'a çevrilir
+        now_ts = task_times.epoch(dt.datetime.now().isoformat())
+        overdue = con.execute(
+            "SELECT COUNT(*) AS n FROM tasks WHERE done=0 AND due_ts < ?",
+            (now_ts,)
+        ).fetchone()["n"]
+        return total, done, overdue
+    total, done, overdue = await db_async.read(read)
     open_ = total - done
-    now_iso = dt.datetime.now().isoformat()
-    overdue = c.execute(
-        "SELECT COUNT(*) AS n FROM tasks WHERE done=0 AND due IS NOT NULL AND due < ?",
-        (now_iso,)
-    ).fetchone()["n"]
-    con.close()
     return {"count": total, "done": done, "open": open_, "overdue": overdue}
 # --- MAIQ PATCH START: health+where+routes+dbinit ---
 try:
     from pathlib import Path
     import os, sqlite3, json
     APP_DIR = Path(__file__).resolve().parent
-    DB_PATH = APP_DIR / "todo.db"
 
     def __maiq_init_db():
-        con = sqlite3.connect(DB_PATH)
-        c = con.cursor()
-        c.execute("""
-        CREATE TABLE IF NOT EXISTS tasks(
-          id INTEGER PRIMARY KEY AUTOINCREMENT,
-          title TEXT NOT NULL,
-          description TEXT DEFAULT '',
-          done INTEGER DEFAULT 0,
-          tags TEXT DEFAULT '[]',
-          due TEXT,
-          created_at TEXT DEFAULT (datetime('now'))
-        )""")
-        cols = [r[1] for r in c.execute("PRAGMA table_info(tasks)").fetchall()]
-        if "completed" in cols and "done" in cols:
-            c.execute("UPDATE tasks SET done=COALESCE(done,0) OR COALESCE(completed,0)")
-        con.commit(); con.close()
+        # şema artık migrations modülünde; açılışta güncelse yalnız user_version okunur
+        with db_pool.writer() as con:
+            migrations.migrate(con)
 
     if 'app' in globals():
         @app.on_event("startup")
@@ -293,20 +296,8 @@ class TaskPartialUpdate(BaseModel):
     notes: Optional[str] = None
     description: Optional[str] = None
 
-def _db_path():
-    here = os.path.dirname(__file__)
-    for cand in ("todo.db", os.path.join("data","todo.db")):
-        p = os.path.join(here, cand)
-        if os.path.exists(p):
-            return p
-    return os.path.join(here, "todo.db")
-
 @app.patch("/tasks/{task_id}/fields")
-def patch_task_fields(task_id: int, body: TaskPartialUpdate):
-    db = _db_path()
-    con = sqlite3.connect(db)
-    cur = con.cursor()
-
+async def patch_task_fields(task_id: int, body: TaskPartialUpdate):
     set_parts = []
     params = []
 
@@ -320,15 +311,14 @@ def patch_task_fields(task_id: int, body: TaskPartialUpdate):
         params.append(note_text)
 
     if not set_parts:
-        con.close()
         raise HTTPException(status_code=400, detail="No supported fields in body")
 
     params.append(task_id)
-    cur.execute(f"UPDATE tasks SET {', '.join(set_parts)} WHERE id=?", params)
-    con.commit()
-
-    row = cur.execute("SELECT id,title,notes,tags,done,due,created_at,updated_at FROM tasks WHERE id=?", (task_id,)).fetchone()
-    con.close()
+    def write(con):
+        con.execute(f"UPDATE tasks SET {', '.join(set_parts)} WHERE id=?", params)
+        task_cache.invalidate_on_commit([task_id])
+        return con.execute("SELECT id,title,notes,tags,done,due,created_at,updated_at FROM tasks WHERE id=?", (task_id,)).fetchone()
+    row = await db_async.write(write)
     if not row:
         raise HTTPException(status_code=404, detail="not found")
 
@@ -359,20 +349,8 @@ class TaskPartialUpdate(BaseModel):
     notes: Optional[str] = None
     description: Optional[str] = None
 
-def _db_path():
-    here = os.path.dirname(__file__)
-    for cand in ("todo.db", os.path.join("data","todo.db")):
-        p = os.path.join(here, cand)
-        if os.path.exists(p):
-            return p
-    return os.path.join(here, "todo.db")
-
 @app.patch("/tasks/{task_id}/fields")
-def patch_task_fields(task_id: int, body: TaskPartialUpdate):
-    db = _db_path()
-    con = sqlite3.connect(db)
-    cur = con.cursor()
-
+async def patch_task_fields(task_id: int, body: TaskPartialUpdate):
     set_parts = []
     params = []
 
@@ -386,15 +364,14 @@ def patch_task_fields(task_id: int, body: TaskPartialUpdate):
         params.append(note_text)
 
     if not set_parts:
-        con.close()
         raise HTTPException(status_code=400, detail="No supported fields in body")
 
     params.append(task_id)
-    cur.execute(f"UPDATE tasks SET {', '.join(set_parts)} WHERE id=?", params)
-    con.commit()
-
-    row = cur.execute("SELECT id,title,notes,tags,done,due,created_at,updated_at FROM tasks WHERE id=?", (task_id,)).fetchone()
-    con.close()
+    def write(con):
+        con.execute(f"UPDATE tasks SET {', '.join(set_parts)} WHERE id=?", params)
+        task_cache.invalidate_on_commit([task_id])
+        return con.execute("SELECT id,title,notes,tags,done,due,created_at,updated_at FROM tasks WHERE id=?", (task_id,)).fetchone()
+    row = await db_async.write(write)
     if not row:
         raise HTTPException(status_code=404, detail="not found")
 
@@ -440,11 +417,23 @@ except Exception as _e:
     pass
 # --- end include fields_router ---
 
-# --- route fix: remove conflicting routes & include latest routers ---
-try:
-    import route_fix
-    route_fix.apply(app)
-except Exception as _e:
-    pass
-# --- end route fix ---
+# --- routers ---
+# route_fix.apply burada hiç çalışmıyordu (route_fix.py derlenmiyor, hata yutuluyordu). Router'lar
+# açıkça bağlanır; main'in kendi rotalarının önüne alınmaz, eşleşme sırası değişmez.
+from fastapi import Depends
+import admin_router, bulk_router, bulk_alias_router, export_router, import_router, metrics_router
+
+def _admin_enabled():
+    # /admin/* yalnız TODO_API_ENABLE_ADMIN=1 iken; istek anında okunur
+    if os.getenv("TODO_API_ENABLE_ADMIN", "0") != "1":
+        raise HTTPException(404, "Not Found")
+
+app.include_router(admin_router.router, dependencies=[Depends(_admin_enabled)])  # /admin/* (sql/slow, sql/profile)
+# main'in /tasks/{task_id:int} rotaları yalnız tamsayı id'yi eşler; /tasks/bulk onlara düşmez
+app.include_router(bulk_router.router)        # PATCH /tasks/bulk
+app.include_router(bulk_alias_router.router)  # PATCH /bulk
+app.include_router(export_router.router)      # GET /export
+app.include_router(import_router.router)      # POST /import, GET /import/progress
+app.include_router(metrics_router.router, prefix="/prom")  # Prometheus; JSON /metrics main'de kalır
+# --- end routers ---
 
@@ -1,92 +1,136 @@
 ﻿from fastapi import APIRouter, Response
 import sqlite3, os, time, json
+import db_pool, db_async, task_stats, http_metrics, write_queue, task_cache
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "todo.db")
 router = APIRouter()
 
-def _has_column(conn, table, col):
-    cur = conn.execute(f"PRAGMA table_info({table})")
-    return any(r[1] == col for r in cur.fetchall())
-
 def _counts(conn):
-    cur = conn.cursor()
-    cur.execute("SELECT COUNT(*), SUM(CASE WHEN done=1 THEN 1 ELSE 0 END) FROM tasks")
-    row = cur.fetchone() or (0,0)
-    total = int(row[0] or 0); done = int(row[1] or 0)
+    total, done = task_stats.counts(conn)
     open_ = total - done; ratio = (done/total) if total else 0.0
     return total, done, open_, ratio
 
 def _recent_done_24h(conn):
-    col = "updated_at" if _has_column(conn, "tasks", "updated_at") else "created_at"
+    # updated_ts UTC epoch'tur (datetime('now') gibi); (done, updated_ts) indeksinde aralık sayımı
     try:
-        cur = conn.execute(f"SELECT COUNT(*) FROM tasks WHERE done=1 AND {col} >= datetime('now','-1 day')")
+        cur = conn.execute("SELECT COUNT(*) FROM tasks WHERE done=1 AND updated_ts >= ?", (int(time.time()) - 86400,))
         return int(cur.fetchone()[0] or 0)
     except Exception:
         return 0
 
-def _tags_counts(conn, only_open=False):
-    if not _has_column(conn, "tasks", "tags"): return {}
-    sql = "SELECT tags FROM tasks"
-    if only_open: sql += " WHERE done=0"
-    cur = conn.execute(sql)
-    agg = {}
-    for (t,) in cur.fetchall():
-        if not t: continue
-        try: obj = json.loads(t)
-        except Exception: continue
-        vals=[]
-        if isinstance(obj, list): vals = [str(x) for x in obj]
-        elif isinstance(obj, dict):
-            for k,v in obj.items():
-                vals.append(str(k)); vals.append(f"{k}:{v}")
-        else: vals=[str(obj)]
-        for tag in vals:
-            tag = tag.strip()
-            if not tag: continue
-            agg[tag] = agg.get(tag,0)+1
-    return agg
+def _tags_counts(conn):
+    # tag_stats tetikleyicilerle güncel tutulur: etiket sayısı kadar satır okunur
+    by_all, by_open = {}, {}
+    for tag, total, open_ in task_stats.tag_counts(conn):
+        by_all[tag] = total
+        if open_: by_open[tag] = open_
+    return by_all, by_open
+
+_LANES = ("read", "write", "stream")
+
+def _pool_lines():
+    st = db_pool.stats()
+    gauges = (
+        ("size", "Configured connections per lane."),
+        ("open", "Open connections per lane."),
+        ("in_use", "Connections currently checked out per lane."),
+        ("idle", "Idle (warm) connections per lane."),
+    )
+    counters = (
+        ("acquired", "acquired_total", "Connection checkouts per lane."),
+        ("waited", "waited_total", "Checkouts that had to wait for a free connection."),
+        ("timeouts", "timeouts_total", "Checkouts that gave up waiting."),
+        ("wait_seconds_total", "wait_seconds_total", "Total time spent waiting for a connection."),
+    )
+    lines = []
+    for key, help_ in gauges:
+        lines.append(f"# HELP todo_db_pool_{key} {help_}")
+        lines.append(f"# TYPE todo_db_pool_{key} gauge")
+        for lane in _LANES:
+            lines.append(f'todo_db_pool_{key}{{lane="{lane}"}} {st[lane][key]}')
+    for key, name, help_ in counters:
+        lines.append(f"# HELP todo_db_pool_{name} {help_}")
+        lines.append(f"# TYPE todo_db_pool_{name} counter")
+        for lane in _LANES:
+            lines.append(f'todo_db_pool_{name}{{lane="{lane}"}} {st[lane][key]}')
+    lines.append("# HELP todo_db_pool_wait_seconds_max Longest single wait for a connection.")
+    lines.append("# TYPE todo_db_pool_wait_seconds_max gauge")
+    for lane in _LANES:
+        lines.append(f'todo_db_pool_wait_seconds_max{{lane="{lane}"}} {st[lane]["wait_seconds_max"]}')
+    return lines
+
+def _write_queue_lines():
+    st = write_queue.stats()
+    out = []
+    for key, name, kind, help_ in (
+        ("depth", "depth", "gauge", "Mutations waiting for the writer thread."),
+        ("max_batch", "max_batch", "gauge", "Largest group-committed batch so far."),
+        ("batches", "batches_total", "counter", "Group-committed transactions."),
+        ("jobs", "jobs_total", "counter", "Mutations applied through the write queue."),
+        ("failed_jobs", "failed_jobs_total", "counter", "Mutations rolled back to their savepoint."),
+        ("failed_commits", "failed_commits_total", "counter", "Batches whose commit failed."),
+        ("busy_seconds", "busy_seconds_total", "counter", "Time the writer thread spent applying batches."),
+    ):
+        out += [f"# HELP todo_write_queue_{name} {help_}", f"# TYPE todo_write_queue_{name} {kind}",
+                f"todo_write_queue_{name} {st[key]}"]
+    return out
+
+def _task_cache_lines():
+    st = task_cache.stats()
+    out = []
+    for key, name, kind, help_ in (
+        ("size", "entries", "gauge", "Serialised task payloads currently cached."),
+        ("capacity", "capacity", "gauge", "Maximum cached payloads (0 = cache disabled)."),
+        ("hits", "hits_total", "counter", "Task reads served from the cache."),
+        ("misses", "misses_total", "counter", "Task reads that went to SQLite."),
+        ("evictions", "evictions_total", "counter", "Entries dropped to stay within capacity."),
+        ("expired", "expired_total", "counter", "Entries dropped after their TTL."),
+        ("invalidations", "invalidations_total", "counter", "Entries dropped by writes."),
+        ("rejected", "rejected_total", "counter", "Reads not cached because a write raced them."),
+    ):
+        out += [f"# HELP todo_task_cache_{name} {help_}", f"# TYPE todo_task_cache_{name} {kind}",
+                f"todo_task_cache_{name} {st[key]}"]
+    return out
 
 @router.get("/metrics")
-def metrics():
-    conn = sqlite3.connect(DB_PATH)
-    try:
-        total, done, open_, ratio = _counts(conn)
-        recent24 = _recent_done_24h(conn)
-        by_tag_all  = _tags_counts(conn, only_open=False)
-        by_tag_open = _tags_counts(conn, only_open=True)
+async def metrics():
+    def read(conn):
+        return _counts(conn), _recent_done_24h(conn), _tags_counts(conn)
+    (total, done, open_, ratio), recent24, (by_tag_all, by_tag_open) = await db_async.read(read)
 
-        now = int(time.time())
-        def esc(s:str)->str: return s.replace("\\", "\\\\").replace('"','\\"')
+    now = int(time.time())
+    def esc(s:str)->str: return s.replace("\\", "\\\\").replace('"','\\"')
 
-        lines=[]
-        lines.append("# HELP todo_tasks_total_current Current number of tasks.")
-        lines.append("# TYPE todo_tasks_total_current gauge")
-        lines.append(f"todo_tasks_total_current {total} {now}")
-        lines.append("# HELP todo_tasks_done_current Current number of done tasks.")
-        lines.append("# TYPE todo_tasks_done_current gauge")
-        lines.append(f"todo_tasks_done_current {done} {now}")
-        lines.append("# HELP todo_tasks_open_current Current number of open tasks.")
-        lines.append("# TYPE todo_tasks_open_current gauge")
-        lines.append(f"todo_tasks_open_current {open_} {now}")
-        lines.append("# HELP todo_tasks_done_ratio Ratio of done to total tasks.")
-        lines.append("# TYPE todo_tasks_done_ratio gauge")
-        lines.append(f"todo_tasks_done_ratio {ratio:.6f} {now}")
+    lines=[]
+    lines.append("# HELP todo_tasks_total_current Current number of tasks.")
+    lines.append("# TYPE todo_tasks_total_current gauge")
+    lines.append(f"todo_tasks_total_current {total} {now}")
+    lines.append("# HELP todo_tasks_done_current Current number of done tasks.")
+    lines.append("# TYPE todo_tasks_done_current gauge")
+    lines.append(f"todo_tasks_done_current {done} {now}")
+    lines.append("# HELP todo_tasks_open_current Current number of open tasks.")
+    lines.append("# TYPE todo_tasks_open_current gauge")
+    lines.append(f"todo_tasks_open_current {open_} {now}")
+    lines.append("# HELP todo_tasks_done_ratio Ratio of done to total tasks.")
+    lines.append("# TYPE todo_tasks_done_ratio gauge")
+    lines.append(f"todo_tasks_done_ratio {ratio:.6f} {now}")
 
-        lines.append("# HELP todo_tasks_recent_done_24h Count of tasks marked done in the last 24 hours.")
-        lines.append("# TYPE todo_tasks_recent_done_24h gauge")
-        lines.append(f"todo_tasks_recent_done_24h {recent24} {now}")
+    lines.append("# HELP todo_tasks_recent_done_24h Count of tasks marked done in the last 24 hours.")
+    lines.append("# TYPE todo_tasks_recent_done_24h gauge")
+    lines.append(f"todo_tasks_recent_done_24h {recent24} {now}")
 
-        lines.append("# HELP todo_tasks_by_tag_current Current number of tasks per tag.")
-        lines.append("# TYPE todo_tasks_by_tag_current gauge")
-        for tag in sorted(by_tag_all):
-            lines.append(f'todo_tasks_by_tag_current{{tag="{esc(tag)}"}} {by_tag_all[tag]} {now}')
+    lines.append("# HELP todo_tasks_by_tag_current Current number of tasks per tag.")
+    lines.append("# TYPE todo_tasks_by_tag_current gauge")
+    for tag in sorted(by_tag_all):
+        lines.append(f'todo_tasks_by_tag_current{{tag="{esc(tag)}"}} {by_tag_all[tag]} {now}')
 
-        lines.append("# HELP todo_tasks_open_by_tag_current Current number of OPEN tasks per tag.")
-        lines.append("# TYPE todo_tasks_open_by_tag_current gauge")
-        for tag in sorted(by_tag_open):
-            lines.append(f'todo_tasks_open_by_tag_current{{tag="{esc(tag)}"}} {by_tag_open[tag]} {now}')
+    lines.append("# HELP todo_tasks_open_by_tag_current Current number of OPEN tasks per tag.")
+    lines.append("# TYPE todo_tasks_open_by_tag_current gauge")
+    for tag in sorted(by_tag_open):
+        lines.append(f'todo_tasks_open_by_tag_current{{tag="{esc(tag)}"}} {by_tag_open[tag]} {now}')
 
-        body = "\n".join(lines) + "\n"
-        return Response(content=body, media_type="text/plain; version=0.0.4; charset=utf-8")
-    finally:
-        conn.close()
+    lines.extend(_pool_lines())
+    lines.extend(_write_queue_lines())
+    lines.extend(_task_cache_lines())
+    lines.extend(http_metrics.lines())
+    body = "\n".join(lines) + "\n"
+    return Response(content=body, media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,152 @@
+﻿import sqlite3, logging
+import fts_util, task_tags, task_stats, task_times, task_query
+
+logger = logging.getLogger(__name__)
+
+# Şema bilgisi tek yerde: uygulama açılışında migrate() bir kez çalışır, PRAGMA user_version ile
+# hangi adımların uygulandığını izler. İstek yolları şemayı sorgulamaz; kolon bilgisi columns()
+# önbelleğinden okunur. Adımlar idempotent yazılır (user_version'ı 0 olan eski DB'ler için).
+
+# main.py, MAIQ init ve import_router'ın tanımladığı tasks biçimlerinin birleşimi
+_TASK_COLUMNS = (
+    ("notes",       "TEXT DEFAULT ''"),
+    ("description", "TEXT"),
+    ("tags",        "TEXT DEFAULT ''"),
+    ("done",        "INTEGER DEFAULT 0"),
+    ("due",         "TEXT"),
+    ("created_at",  "TEXT"),
+    ("updated_at",  "TEXT"),
+)
+
+def _table_columns(conn: sqlite3.Connection, table: str) -> list:
+    return [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+
+def _v1_tasks(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS tasks(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            notes TEXT DEFAULT '',
+            description TEXT,
+            tags  TEXT DEFAULT '',
+            done  INTEGER DEFAULT 0,
+            due   TEXT,
+            created_at TEXT DEFAULT (datetime('now')),
+            updated_at TEXT DEFAULT (datetime('now'))
+        )""")
+    cols = _table_columns(conn, "tasks")
+    for name, decl in _TASK_COLUMNS:
+        if name not in cols:
+            # ALTER TABLE sabit olmayan DEFAULT kabul etmez; zaman damgaları ayrıca doldurulur
+            conn.execute(f"ALTER TABLE tasks ADD COLUMN {name} {decl}")
+    if "updated_at" not in cols:
+        conn.execute("UPDATE tasks SET updated_at=COALESCE(created_at, datetime('now'))")
+    if "completed" in cols:
+        conn.execute("UPDATE tasks SET done=COALESCE(done,0) OR COALESCE(completed,0)")
+
+def _v2_task_tags(conn):
+    task_tags.ensure(conn)
+
+def _v3_indexes(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_done ON tasks(done)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_due ON tasks(due)")
+
+def _v4_stats(conn):
+    task_stats.ensure(conn)
+    # /metrics son 24 saatte tamamlananları bu indeksle okur
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_done_updated ON tasks(done, updated_at)")
+
+def _v5_change_counter(conn):
+    task_stats.ensure_changes(conn)
+
+def _v6_access_indexes(conn):
+    # (done) yerine (done, id, title): done filtreli, id sıralı listeler sıralamasız okunur ve
+    # fields=id,title,done için kapsayan indeks olur (tabloya hiç gidilmez)
+    conn.execute("DROP INDEX IF EXISTS idx_tasks_done")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_done_id_title ON tasks(done, id, title)")
+    # done + due aralığı (liste/export filtreleri, /metrics overdue sayımı kapsayan)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_done_due ON tasks(done, due)")
+    # sort=title: (title, rowid) sırası ORDER BY title, id ile birebir
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_title ON tasks(title)")
+
+def _v7_epoch_columns(conn):
+    # *_ts gölge kolonları parça parça doldurulur; indeksler doldurma bittikten sonra tek geçişte kurulur
+    task_times.ensure(conn)
+    # metin aralık indeksleri yerine tamsayı aralık indeksleri (metin kolonlar artık aralıkla sorgulanmaz)
+    for name in ("idx_tasks_due", "idx_tasks_done_due", "idx_tasks_done_updated"):
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_due_ts ON tasks(due_ts)")
+    # done + due aralığı, /metrics overdue sayımı (kapsayan)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_done_due_ts ON tasks(done, due_ts)")
+    # /metrics son 24 saatte tamamlananlar (kapsayan)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_done_updated_ts ON tasks(done, updated_ts)")
+
+def _v8_sort_indexes(conn):
+    # sort=due/created_at/updated_at cursor sayfaları: anahtar ifadesi + id sırasıyla tek aralık araması
+    for name, col, null in task_query.SORT_INDEXES:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON tasks({task_query.ts_key(col, null, '')}, id)")
+
+def _v9_sparse_covering(conn):
+    # filtresiz fields=id,title,done: done kolonu notes/description'dan sonra saklanır, tablo taraması
+    # uzun notların taşma sayfalarını da okur; id sıralı kapsayan indeks tabloya hiç gitmez
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_id_title_done ON tasks(id, title, done)")
+
+def _v10_epoch_triggers(conn):
+    # koşullu tetikleyiciler (INSERT'ler *_ts'yi kendisi yazar) ve v7 doldurması yarıda kalmış
+    # DB'lerde *_ts'si eksik satırlar; ensure() ikisini de yapar
+    task_times.ensure(conn)
+
+MIGRATIONS = (
+    (1, _v1_tasks),
+    (2, _v2_task_tags),
+    (3, _v3_indexes),
+    (4, _v4_stats),
+    (5, _v5_change_counter),
+    (6, _v6_access_indexes),
+    (7, _v7_epoch_columns),
+    (8, _v8_sort_indexes),
+    (9, _v9_sparse_covering),
+    (10, _v10_epoch_triggers),
+)
+VERSION = MIGRATIONS[-1][0]
+
+def version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Eksik adımları sırayla uygular ve her adımdan sonra user_version'ı ilerletir; son sürümü döner.
+    executescript ara commit yapabildiğinden adımlar yarıda kalırsa tekrar çalıştırılabilir olmalı."""
+    current = version(conn)
+    for v, step in MIGRATIONS:
+        if v <= current: continue
+        logger.info("schema migration %s (%s)", v, step.__name__)
+        step(conn)
+        conn.execute(f"PRAGMA user_version={v}")
+        conn.commit()
+        current = v
+    # FTS5 derleme seçeneğine bağlı; sürümden bağımsız her açılışta doğrulanır (kuruluysa ucuz)
+    try:
+        fts_util.ensure_fts(conn)
+    except Exception as exc:
+        logger.warning("FTS5 setup failed, q falls back to LIKE: %s", exc)
+    conn.commit()
+    refresh(conn)
+    return current
+
+_columns: dict = {}
+
+def refresh(conn: sqlite3.Connection):
+    db = fts_util._db_file(conn)
+    for k in [k for k in _columns if k[0] == db]:
+        del _columns[k]
+
+def columns(conn: sqlite3.Connection, table: str = "tasks") -> frozenset:
+    """Tablonun kolon kümesi; DB dosyası başına bir kez okunur, migrate() sonrası yenilenir."""
+    key = (fts_util._db_file(conn), table)
+    cols = _columns.get(key)
+    if cols is None:
+        cols = _columns[key] = frozenset(_table_columns(conn, table))
+    return cols
+
+def has_column(conn: sqlite3.Connection, col: str, table: str = "tasks") -> bool:
+    return col in columns(conn, table)
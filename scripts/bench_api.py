@@ -0,0 +1,194 @@
+﻿import os, sys, time, json, random, shutil, sqlite3, asyncio, tempfile, argparse, platform, subprocess, statistics
+# kullanım: python scripts/bench_api.py --sizes 1000,100000 --n 200 --out bench.json [--baseline eski.json --threshold 0.15]
+# bağımlılıklar: pip install -r requirements-dev.txt (httpx)
+# Uç noktaların süreç içi (httpx ASGITransport, ağ yok) benchmark'ı. Her boyut için tohumlu bir şablon DB
+# bir kez üretilir (--db-dir altında saklanır, sonraki koşular yeniden kullanır) ve her koşuda geçici bir
+# kopyası üzerinde çalışılır: yazma durumları koşudan koşuya aynı veriden başlar.
+# Tüm uçlar main.app üzerinden ölçülür (export/import/bulk ve Prometheus /prom altında orada bağlı).
+# Sonuç JSON'u --baseline ile verilen eski bir sonuçla karşılaştırılır (eskide olmayan vakalar atlanır):
+# p95 eşikten (ve --min-delta-ms gürültü tabanından) fazla kötüleşirse ya da req/s düşerse çıkış kodu 2.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))]
+
+def _template(db_dir: str, rows: int, seed: int) -> str:
+    import migrations, gen_dataset
+    path = os.path.join(db_dir, f"tasks-{rows}-{seed}-v{migrations.VERSION}.db")
+    if os.path.exists(path): return path
+    tmp = path + ".tmp"
+    if os.path.exists(tmp): os.remove(tmp)
+    conn = sqlite3.connect(tmp)
+    t0 = time.perf_counter()
+    gen_dataset.generate(conn, rows, seed, quiet=True)  # scripts/gen_dataset.py: tohumdan belirlenen veri
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)"); conn.execute("PRAGMA journal_mode=DELETE")
+    conn.close()
+    os.replace(tmp, path)
+    print(f"seeded {rows:,} rows in {time.perf_counter() - t0:.1f}s -> {path}")
+    return path
+
+def _cases(rows: int, rnd: random.Random):
+    """(ad, uygulama, metot, yol, params, json/gövde üreteci, ağır mı)"""
+    rid = lambda: rnd.randint(1, rows)
+    nxt = iter(range(rows + 1, 1 << 62))
+    def items(k=100): return [{"id": rid(), "done": bool(rnd.getrandbits(1))} for _ in range(k)]
+    def ndjson(new: bool, k=100):
+        return "\n".join(json.dumps({"id": next(nxt) if new else rid(), "title": f"içe {i}", "tags": ["iş", "yük"],
+                                     "done": i % 2}, ensure_ascii=False) for i in range(k)).encode("utf-8")
+    c = [
+        ("main GET /tasks", "main", "GET", "/tasks", {"limit": 50}, None, False),
+        ("main GET /tasks done=false", "main", "GET", "/tasks", {"limit": 50, "done": "false"}, None, False),
+        ("main GET /tasks tag", "main", "GET", "/tasks", {"limit": 50, "tag": "iş"}, None, False),
+        ("main GET /tasks q", "main", "GET", "/tasks", {"limit": 50, "q": "fatura"}, None, False),
+        ("main GET /tasks due_before", "main", "GET", "/tasks", {"limit": 50, "due_before": "2025-03-01"}, None, False),
+        ("main GET /tasks due_after", "main", "GET", "/tasks", {"limit": 50, "due_after": "2025-11-01"}, None, False),
+        ("main GET /tasks tag x2", "main", "GET", "/tasks", {"limit": 50, "tag": ["iş", "ev"]}, None, False),
+        ("main GET /tasks fields", "main", "GET", "/tasks", {"limit": 50, "fields": "id,title,done"}, None, False),
+        ("main GET /tasks deep offset", "main", "GET", "/tasks", {"limit": 50, "offset": rows // 2}, None, False),
+        ("main GET /tasks/{id}", "main", "GET", lambda: f"/tasks/{rid()}", None, None, False),
+        ("main GET /metrics", "main", "GET", "/metrics", None, None, False),
+        ("main GET /prom/metrics", "main", "GET", "/prom/metrics", None, None, False),
+    ]
+    import task_query
+    for sort in task_query.SORTS:
+        for order in ("desc", "asc"):
+            c.append((f"main GET /tasks sort={sort} {order}", "main", "GET", "/tasks",
+                      {"limit": 50, "sort": sort, "order": order}, None, False))
+    c += [
+        ("GET /export json limit=1000", "main", "GET", "/export", {"limit": 1000}, None, False),
+        ("GET /export ndjson done=false limit=1000", "main", "GET", "/export",
+         {"format": "ndjson", "done": "false", "limit": 1000}, None, False),
+        ("GET /export csv fields limit=1000", "main", "GET", "/export",
+         {"format": "csv", "fields": "id,title,done,due", "limit": 1000}, None, False),
+        ("GET /export json full", "main", "GET", "/export", None, None, True),
+        # yazmalar: okumalardan sonra, DB kopyası üzerinde
+        ("main POST /tasks", "main", "POST", "/tasks", None, lambda: {"title": f"yeni {rnd.random()}", "tags": ["iş"]}, False),
+        ("main PATCH /tasks/{id} done", "main", "PATCH", lambda: f"/tasks/{rid()}", None,
+         lambda: {"done": bool(rnd.getrandbits(1))}, False),
+        ("main PATCH /tasks/{id} tags", "main", "PATCH", lambda: f"/tasks/{rid()}", None,
+         lambda: {"tags": ["iş", f"etiket{rnd.randint(30, 60)}"]}, False),
+        ("main PATCH /tasks/{id}/fields", "main", "PATCH", lambda: f"/tasks/{rid()}/fields", None,
+         lambda: {"notes": "güncel not"}, False),
+        ("PATCH /tasks/bulk x100", "main", "PATCH", "/tasks/bulk", None, items, False),
+        ("PATCH /bulk x100", "main", "PATCH", "/bulk", None, items, False),
+        ("POST /import upsert x100", "main", "POST", "/import", {"mode": "upsert"}, lambda: ndjson(False), False),
+        ("POST /import insert x100", "main", "POST", "/import", {"mode": "insert"}, lambda: ndjson(True), False),
+    ]
+    return c
+
+async def _run_case(client, case, n: int, concurrency: int) -> dict:
+    name, _, method, path, params, body, _ = case
+    lat, errors, size = [], 0, 0
+    todo = iter(range(n))
+    async def worker():
+        nonlocal errors, size
+        for _ in todo:
+            kw = {"params": params}
+            if body is not None:
+                b = body()
+                kw["content" if isinstance(b, bytes) else "json"] = b
+            url = path() if callable(path) else path
+            t0 = time.perf_counter()
+            r = await client.request(method, url, **kw)
+            lat.append(time.perf_counter() - t0)
+            size += len(r.content)
+            if r.status_code >= 400: errors += 1
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - t0
+    return {"n": n, "errors": errors, "rps": round(n / wall, 1),
+            "p50_ms": round(pct(lat, 50) * 1000, 3), "p95_ms": round(pct(lat, 95) * 1000, 3),
+            "p99_ms": round(pct(lat, 99) * 1000, 3), "mean_ms": round(statistics.fmean(lat) * 1000, 3),
+            "max_ms": round(max(lat) * 1000, 3), "bytes": size // n}
+
+def _apps():
+    import httpx, main as app_main
+    return {"main": httpx.AsyncClient(transport=httpx.ASGITransport(app=app_main.app), base_url="http://bench", timeout=None)}
+
+async def _run_size(a, rows: int, only) -> dict:
+    import db_pool, task_cache
+    work = os.path.join(tempfile.mkdtemp(), "bench.db")
+    shutil.copyfile(_template(a.db_dir, rows, a.seed), work)
+    db_pool.configure(work)
+    task_cache.clear()
+    rnd = random.Random(a.seed)
+    clients = _apps()
+    out = {}
+    try:
+        for case in _cases(rows, rnd):
+            if only and not any(s in case[0] for s in only): continue
+            n = max(3, a.n // 40) if case[6] else a.n
+            client = clients[case[1]]
+            await _run_case(client, case, max(1, min(a.warmup, n)), 1)  # ısınma: önbellekler, derlenmiş eşleyiciler
+            res = out[case[0]] = await _run_case(client, case, n, a.concurrency)
+            print(f"{rows:>9,} {case[0]:44s} {res['rps']:9,.1f} req/s  p50 {res['p50_ms']:8.2f}  "
+                  f"p95 {res['p95_ms']:8.2f}  p99 {res['p99_ms']:8.2f} ms" + (f"  errors {res['errors']}" if res["errors"] else ""))
+    finally:
+        for c in clients.values(): await c.aclose()
+        shutil.rmtree(os.path.dirname(work), ignore_errors=True)
+    return out
+
+def _meta(a) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip()
+    except Exception:
+        commit = ""
+    return {"commit": commit, "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version, "platform": platform.platform(), "n": a.n,
+            "concurrency": a.concurrency, "seed": a.seed}
+
+def compare(cur: dict, base: dict, threshold: float, min_delta_ms: float) -> list:
+    """[(boyut, vaka, ölçüt, eski, yeni)] — eşiği aşan kötüleşmeler."""
+    bad = []
+    for size, cases in cur["sizes"].items():
+        for name, r in cases.items():
+            b = base.get("sizes", {}).get(size, {}).get(name)
+            if not b: continue
+            if r["p95_ms"] > b["p95_ms"] * (1 + threshold) and r["p95_ms"] - b["p95_ms"] > min_delta_ms:
+                bad.append((size, name, "p95_ms", b["p95_ms"], r["p95_ms"]))
+            # req/s için de aynı gürültü tabanı: istek başına süre farkı olarak
+            if r["rps"] < b["rps"] * (1 - threshold) and (1 / r["rps"] - 1 / b["rps"]) * 1000 > min_delta_ms:
+                bad.append((size, name, "rps", b["rps"], r["rps"]))
+    return bad
+
+async def main(a) -> int:
+    os.environ.setdefault("TODO_API_DB_PATH", os.path.join(tempfile.mkdtemp(), "boot.db"))  # main import'ta migrate eder
+    os.makedirs(a.db_dir, exist_ok=True)
+    only = [s for s in (a.only or "").split(",") if s]
+    res = {"meta": _meta(a), "sizes": {}}
+    for rows in (int(s) for s in a.sizes.split(",")):
+        res["sizes"][str(rows)] = await _run_size(a, rows, only)
+    if a.out:
+        with open(a.out, "w", encoding="utf-8") as f:
+            json.dump(res, f, ensure_ascii=False, indent=1)
+        print(f"results -> {a.out}")
+    if not a.baseline:
+        return 0
+    with open(a.baseline, encoding="utf-8") as f:
+        base = json.load(f)
+    bad = compare(res, base, a.threshold, a.min_delta_ms)
+    print(f"baseline {base['meta'].get('commit')} ({base['meta'].get('time')}), threshold {a.threshold:.0%}")
+    for size, name, metric, old, new in bad:
+        print(f"REGRESSION {int(size):>9,} {name:44s} {metric} {old} -> {new}")
+    print("no regressions" if not bad else f"{len(bad)} regression(s)")
+    return 2 if bad else 0
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000,100000", help="virgülle görev sayıları, ör. 1000,100000,1000000")
+    ap.add_argument("--n", type=int, default=200, help="vaka başına istek (tam export n/40)")
+    ap.add_argument("--warmup", type=int, default=20)
+    ap.add_argument("--concurrency", type=int, default=1)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--db-dir", default=os.path.join(tempfile.gettempdir(), "todo_api_bench"),
+                    help="tohumlu şablon DB'lerin saklandığı dizin")
+    ap.add_argument("--only", help="yalnız adında bu parçalardan biri geçen vakalar (virgülle)")
+    ap.add_argument("--out", help="sonuç JSON dosyası")
+    ap.add_argument("--baseline", help="karşılaştırılacak eski sonuç JSON'u")
+    ap.add_argument("--threshold", type=float, default=0.15, help="izin verilen göreli kötüleşme")
+    ap.add_argument("--min-delta-ms", type=float, default=0.5, help="p95 için mutlak gürültü tabanı")
+    sys.exit(asyncio.run(main(ap.parse_args())))
@@ -0,0 +1,46 @@
+﻿import os, sys, time, asyncio, statistics, argparse
+# kullanım: python scripts/bench_http_metrics.py --n 20000
+# Aynı uygulamayı MetricsMiddleware ile ve onsuz, doğrudan ASGI çağrısıyla (ağ/HTTP istemcisi yok)
+# sürer ve istek başına ek maliyeti mikro saniye olarak yazar.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fastapi import FastAPI
+import http_metrics
+
+def _app(instrumented: bool):
+    app = FastAPI()
+    if instrumented:
+        app.add_middleware(http_metrics.MetricsMiddleware)
+    @app.get("/tasks/{task_id}")
+    def get_task(task_id: int):
+        return {"id": task_id, "title": "x"}
+    return app
+
+async def _drive(app, n: int) -> float:
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": "/tasks/1", "raw_path": b"/tasks/1", "root_path": "",
+             "query_string": b"", "headers": [], "client": ("b", 1), "server": ("b", 80)}
+    async def receive(): return {"type": "http.request", "body": b"", "more_body": False}
+    async def send(_): pass
+    for _ in range(200):  # ısınma
+        await app(dict(scope), receive, send)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - t0) / n
+
+def main(n: int, rounds: int):
+    res = {False: [], True: []}
+    for _ in range(rounds):
+        for inst in (False, True):
+            res[inst].append(asyncio.run(_drive(_app(inst), n)))
+    base, inst = statistics.median(res[False]), statistics.median(res[True])
+    print(f"plain         {base * 1e6:8.1f} us/req")
+    print(f"instrumented  {inst * 1e6:8.1f} us/req")
+    print(f"overhead      {(inst - base) * 1e6:8.1f} us/req ({(inst / base - 1) * 100:.1f}%)")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=5000)
+    ap.add_argument("--rounds", type=int, default=3)
+    a = ap.parse_args()
+    main(a.n, a.rounds)
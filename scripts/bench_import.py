@@ -0,0 +1,30 @@
+﻿import os, sys, time, tempfile, argparse
+# kullanım: python scripts/bench_import.py --rows 50000 --batch 1000
+# import_router'ın parti yazma yolunu (_prepare + yazma kuyruğu) geçici bir DB üzerinde doğrudan ölçer (HTTP/parse maliyeti hariç)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import db_pool, migrations, write_queue, import_router
+
+def run(rows: int, batch: int, modes):
+    tmp = tempfile.mkdtemp()
+    db_pool.configure(os.path.join(tmp, "bench.db"), readers=1)
+    with db_pool.writer() as conn:
+        migrations.migrate(conn)
+    out = {}
+    for mode in modes:
+        recs = [{"id": i + 1, "title": f"görev {i}", "tags": ["iş", f"t{i % 50}"], "done": i % 2,
+                 "notes": "not" if mode != "update" else None} for i in range(rows)]
+        t0 = time.perf_counter()
+        for i in range(0, rows, batch):
+            write_queue.run(import_router._write_batch, [import_router._prepare(r) for r in recs[i:i + batch]], mode)
+        dt = time.perf_counter() - t0
+        out[mode] = round(rows / dt)
+        print(f"{mode:8s} {rows} rows  {dt:7.3f}s  {out[mode]:>9,} rows/s")
+    return out
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=20000)
+    ap.add_argument("--batch", type=int, default=1000)
+    ap.add_argument("--modes", default="insert,upsert,update,replace")
+    a = ap.parse_args()
+    run(a.rows, a.batch, a.modes.split(","))
@@ -0,0 +1,52 @@
+﻿import os, sys, time, random, asyncio, tempfile, argparse, statistics
+# kullanım: python scripts/bench_mixed_load.py --concurrency 64 --requests 4000 --write-ratio 0.2
+# main.app'i süreç içinde (httpx ASGITransport) karışık okuma/yazma yüküyle sürer; event loop'u
+# bloklayan bir handler tüm eşzamanlı isteklerin kuyruk gecikmesine yansır, bu yüzden p99'a bakılır.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))]
+
+async def main(a):
+    os.environ["TODO_API_DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+    import httpx, main as app_main
+    app = app_main.app
+    transport = httpx.ASGITransport(app=app)
+    rnd = random.Random(42)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        for i in range(a.seed):
+            await c.post("/tasks", json={"title": f"görev {i}", "tags": ["iş", f"t{i % 20}"]})
+        lat = {"read": [], "write": []}
+        errors = 0
+        sem = asyncio.Semaphore(a.concurrency)
+        async def one(i):
+            nonlocal errors
+            write = rnd.random() < a.write_ratio
+            async with sem:
+                t0 = time.perf_counter()
+                if write:
+                    if i % 2: r = await c.post("/tasks", json={"title": f"yeni {i}", "tags": ["yük"]})
+                    else: r = await c.patch(f"/tasks/{rnd.randint(1, a.seed)}", json={"done": bool(i % 3)})
+                else:
+                    if i % 4: r = await c.get("/tasks", params={"limit": 50, "tag": f"t{i % 20}"})
+                    else: r = await c.get(f"/tasks/{rnd.randint(1, a.seed)}")
+                lat["write" if write else "read"].append(time.perf_counter() - t0)
+                if r.status_code >= 400: errors += 1
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(a.requests)))
+        wall = time.perf_counter() - t0
+    allv = lat["read"] + lat["write"]
+    print(f"{a.requests} req, concurrency {a.concurrency}, {a.requests / wall:,.0f} req/s, errors {errors}")
+    for k, v in (("all", allv), ("read", lat["read"]), ("write", lat["write"])):
+        if v:
+            print(f"{k:5s} p50 {pct(v, 50) * 1000:7.2f} ms  p95 {pct(v, 95) * 1000:7.2f} ms  p99 {pct(v, 99) * 1000:7.2f} ms")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--concurrency", type=int, default=64)
+    ap.add_argument("--requests", type=int, default=4000)
+    ap.add_argument("--write-ratio", type=float, default=0.2)
+    ap.add_argument("--seed", type=int, default=2000)
+    asyncio.run(main(ap.parse_args()))
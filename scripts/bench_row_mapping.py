@@ -0,0 +1,71 @@
+﻿import os, sys, time, json, sqlite3, tracemalloc, statistics, argparse
+# kullanım: python scripts/bench_row_mapping.py --rows 10000
+# Satır → yanıt eşlemesinin maliyeti: eski _row_to_task (dict(row) + yeni dict + tag çözümü)
+# ile task_record eşleyicisi. Bellekteki bir DB'den gelen sqlite3.Row'lar üzerinde, kodlama
+# dahil süre (satır başına µs) ve sayfa kurulurken ayrılan tepe bellek (tracemalloc) ölçülür.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import task_record, fast_json
+
+_TAGS = ['["iş","ev"]', '["acil"]', "a, b", '{"prio":"high"}', None, "", '["ev","okul","spor"]']
+
+# --- eski main._row_to_task/export_router eşlemesi (karşılaştırma için birebir kopya) ---
+def _legacy_str_to_tags(s):
+    s = (s or "").strip()
+    return [t for t in s.split() if t]
+
+def _legacy_main(r):
+    return {"id": r["id"], "title": r["title"], "notes": r["notes"], "tags": _legacy_str_to_tags(r["tags"]),
+            "done": bool(r["done"]), "due": r["due"], "created_at": r["created_at"], "updated_at": r["updated_at"]}
+
+def _legacy_export(row):
+    d = dict(row); d["done"] = bool(d.get("done", 0))
+    t = d.get("tags")
+    if t:
+        try: d["tags"] = json.loads(t) if isinstance(t, str) else t
+        except Exception: d["tags"] = {}
+    else:
+        d["tags"] = {}
+    return d
+
+def _rows(n: int):
+    conn = sqlite3.connect(":memory:"); conn.row_factory = sqlite3.Row
+    conn.execute("""CREATE TABLE tasks(id INTEGER PRIMARY KEY, title TEXT, notes TEXT, description TEXT,
+                    tags TEXT, done INTEGER, due TEXT, created_at TEXT, updated_at TEXT)""")
+    conn.executemany("INSERT INTO tasks VALUES(?,?,?,?,?,?,?,?,?)",
+                     [(i, f"görev {i}", "not " * 20, None, _TAGS[i % len(_TAGS)], i % 2, "2025-10-01 12:00",
+                       "2025-09-01 08:00:00", "2025-09-02 09:30:00") for i in range(1, n + 1)])
+    return conn.execute("SELECT * FROM tasks").fetchall()
+
+_CASES = {
+    "list  legacy":  lambda rows: [_legacy_main(r) for r in rows],
+    "list  record":  lambda rows: task_record.records(rows, "main"),
+    "export legacy": lambda rows: [_legacy_export(r) for r in rows],
+    "export record": lambda rows: task_record.records(rows, "raw"),
+}
+
+def _measure(fn, rows, rounds: int):
+    times = []
+    for _ in range(rounds):
+        task_record.tags_words.cache_clear(); task_record.tags_json.cache_clear()
+        t0 = time.perf_counter()
+        fast_json.dumps(fn(rows))
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    page = fn(rows)  # kodlamadan önce tutulan sayfa: handler'ın yanıt kurulana kadar taşıdığı
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del page
+    return statistics.median(times) / len(rows), peak
+
+def main(n: int, rounds: int):
+    rows = _rows(n)
+    for name, fn in _CASES.items():
+        per_row, peak = _measure(fn, rows, rounds)
+        print(f"{name:14s} {per_row * 1e6:7.2f} us/row (encode dahil)   sayfa {peak / n:7.0f} B/row")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=10000)
+    ap.add_argument("--rounds", type=int, default=7)
+    a = ap.parse_args()
+    main(a.rows, a.rounds)
@@ -0,0 +1,53 @@
+﻿import os, sys, time, tempfile, threading, argparse, sqlite3
+# kullanım: python scripts/bench_write_queue.py --ops 2000 --threads 1,8,32
+# Eşzamanlı küçük yazmalar (INSERT + task_tags senkronu) üç yolla: istek başına yeni bağlantı,
+# havuzun yazma şeridi (istek başına commit) ve yazma kuyruğu (group commit).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import db_pool, migrations, task_tags, write_queue
+
+def _write(conn, i):
+    tid = conn.execute("INSERT INTO tasks(title, tags) VALUES(?, ?)", (f"t{i}", '["a","b"]')).lastrowid
+    task_tags.sync_rows(conn, [(tid, '["a","b"]')])
+
+def _connect(i):
+    conn = sqlite3.connect(db_pool.get_pool().path, timeout=db_pool.BUSY_TIMEOUT / 1000)
+    try:
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _write(conn, i); conn.commit()
+    finally:
+        conn.close()
+
+def _pool(i):
+    with db_pool.writer() as conn:
+        _write(conn, i)
+
+def _queue(i):
+    write_queue.run(_write, i)
+
+def run(ops: int, threads: int, fn) -> tuple:
+    errors = []
+    per = ops // threads
+    def worker(k):
+        for j in range(per):
+            try: fn(k * per + j)
+            except Exception as e: errors.append(type(e).__name__ + ": " + str(e))
+    ts = [threading.Thread(target=worker, args=(k,)) for k in range(threads)]
+    t0 = time.perf_counter()
+    for t in ts: t.start()
+    for t in ts: t.join()
+    return per * threads / (time.perf_counter() - t0), errors
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--ops", type=int, default=2000)
+    ap.add_argument("--threads", default="1,8,32")
+    a = ap.parse_args()
+    db_pool.configure(os.path.join(tempfile.mkdtemp(), "bench.db"))
+    with db_pool.writer() as conn:
+        migrations.migrate(conn)
+    print(f"{'threads':>7} {'connect/s':>10} {'pool/s':>10} {'queue/s':>10}  errors(connect/pool/queue)")
+    for n in (int(x) for x in a.threads.split(",")):
+        res = [run(a.ops, n, fn) for fn in (_connect, _pool, _queue)]
+        print(f"{n:>7} " + " ".join(f"{r[0]:>10,.0f}" for r in res) + "  " + "/".join(str(len(r[1])) for r in res))
+    st = write_queue.stats()
+    print(f"queue: {st['jobs']} jobs in {st['batches']} transactions (max batch {st['max_batch']})")
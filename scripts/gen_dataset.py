@@ -0,0 +1,208 @@
+﻿import os, sys, json, time, random, sqlite3, argparse, itertools, bisect
+# kullanım: python scripts/gen_dataset.py --db /tmp/big.db --rows 2000000 --seed 42
+#           python scripts/gen_dataset.py --db mevcut.db --rows 10000 --append      (tetikleyiciler açık, yavaş yol)
+# Üretim ölçeğinde, tohumdan belirlenen (aynı seed -> aynı satırlar, parti boyutundan bağımsız) sentetik görevler.
+# Dağılımlar: başlık/not uzunlukları log-normal (uzun kuyruklu notlar), kelimeler Zipf ağırlıklı Türkçe/aksanlı
+# sözlükten (task_query._MAP'in katladığı harflerin hepsi geçer), etiketler Zipf dağılımlı ve üç saklama
+# biçiminde (boşluklu metin, JSON liste, JSON sözlük), done oranı eski görevlerde yüksek, due ve zaman
+# damgaları karışık biçimlerde (datetime('now'), isoformat, mikro saniye, Z, +03:00, "/", epoch) ve az oranda
+# ayrıştırılamayan elle girilmiş değerler ("yarın", "31.12.2024", ...).
+# Boş tabloda hızlı yol: tasks/task_tags tetikleyicileri ve ikincil indeksleri kaldırılır, satırlar toplu
+# eklenir, sonra hepsi geri kurulur ve türetilmiş veriler (FTS, *_ts, tag_stats) tek geçişte yeniden hesaplanır.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import migrations, task_query, task_tags, task_stats, task_times, fts_util
+
+_WORDS = (
+    "görev toplantı rapor fatura ödeme müşteri sipariş güncelleme çağrı inceleme alışveriş öğrenci şirket "
+    "değerlendirme yazılım ürün görüşme kayıt dönüş işlem bakım sunucu yedek ölçüm değişiklik hazırlık "
+    "İstanbul Ankara İzmir Muğla Iğdır Çanakkale Şanlıurfa Ödemiş Üsküdar Ağrı ılık ılgaz kış yaz köprü "
+    "ağaç şehir çiçek gümüş düğün öğle akşam sabah haftalık aylık acil önemli gözden geçir kontrol et "
+    "gönder ara yaz oku düzelt sil taşı planla bitir başlat bekle onayla "
+    "café résumé naïve façade crème brûlée jalapeño São Zürich Ángel Ísland Ýr Ñandú Ÿvonne Ôrléans "
+    "Ãnsel Èlan Ëlise Ïlse Òscar Ùlrich Àlbert Âme Ûrsula Ìsola Ìnci Õdessa "
+    "kod test deploy review sprint bug fix api db backup log cache index query"
+).split()
+_TAG_HEAD = ("iş ev acil okul alışveriş sağlık çocuk ödeme proje toplantı spor okuma seyahat araba banka "
+             "fatura müşteri kod yedek bakım hafta_sonu önemli bekleyen ertelendi çağrı belge kişisel aile "
+             "bahçe yemek").split()
+_PRIO = ("high", "low", "normal", "yüksek", "düşük")
+_TS_FORMATS = ((70, "space"), (15, "iso"), (6, "iso_us"), (4, "z"), (3, "slash"), (2, "epoch"), (0.5, "invalid"))
+_DUE_FORMATS = ((50, "date"), (20, "space_min"), (15, "iso"), (5, "slash_date"), (5, "offset"), (5, "z"), (1, "invalid"))
+# elle girilmiş/bozuk değerler: task_times bunları NULL'a çevirir (hiçbir aralığa girmez)
+_INVALID = ("yarın", "TBD", "n/a", "2025-13-45", "31.12.2024", "12/31/2024", "2025-01-01 25:61")
+_STREAM, _MAX_WORDS = 1 << 16, 5000
+
+def _cum(weights):
+    return list(itertools.accumulate(weights))
+
+def _zipf(n: int, s: float):
+    return _cum([1 / (k ** s) for k in range(1, n + 1)])
+
+def _fmt(t: float, kind: str) -> str:
+    g = time.gmtime(t)
+    if kind == "space": return time.strftime("%Y-%m-%d %H:%M:%S", g)
+    if kind == "iso": return time.strftime("%Y-%m-%dT%H:%M:%S", g)
+    if kind == "iso_us": return time.strftime("%Y-%m-%dT%H:%M:%S", g) + f".{int(t * 1e6) % 1000000:06d}"
+    if kind == "z": return time.strftime("%Y-%m-%dT%H:%M:%SZ", g)
+    if kind == "slash": return time.strftime("%Y/%m/%d %H:%M:%S", g)
+    if kind == "epoch": return str(int(t))
+    if kind == "date": return time.strftime("%Y-%m-%d", g)
+    if kind == "space_min": return time.strftime("%Y-%m-%d %H:%M", g)
+    if kind == "slash_date": return time.strftime("%Y/%m/%d", g)
+    if kind == "offset": return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(t + 3 * 3600)) + "+03:00"
+    if kind == "invalid": return _INVALID[int(t) % len(_INVALID)]
+    raise ValueError(kind)
+
+class Generator:
+    """Satır üreteci; tek bir random.Random akışı kullanır, böylece çıktı yalnız seed ve satır sırasına bağlıdır."""
+
+    def __init__(self, rows: int, seed: int = 42, now: str = "2025-10-01T00:00:00", span_days: int = 730,
+                 done_ratio: float = 0.35, tag_vocab: int = 500, start_id: int = 1):
+        self.rnd = random.Random(seed)
+        self.rows, self.start_id, self.done_ratio = rows, start_id, done_ratio
+        self.now = task_times.epoch(now)
+        self.span = span_days * 86400
+        # metinler önceden Zipf ağırlığıyla çekilmiş bir kelime akışından dilimlenir (kelime başına choices yerine)
+        stream = self.rnd.choices(_WORDS, cum_weights=_zipf(len(_WORDS), 1.05), k=_STREAM)
+        self.stream = stream + stream[:_MAX_WORDS]
+        self.tags = _TAG_HEAD + [f"etiket{i}" for i in range(len(_TAG_HEAD), tag_vocab)]
+        self.tag_cw = _zipf(len(self.tags), 1.1)
+        self.ts_kinds, self.ts_cw = zip(*((k, w) for w, k in _TS_FORMATS))
+        self.ts_cw = _cum(self.ts_cw)
+        self.due_kinds, self.due_cw = zip(*((k, w) for w, k in _DUE_FORMATS))
+        self.due_cw = _cum(self.due_cw)
+
+    def _pick(self, seq, cw):
+        # random.choices(k=1)'in çağrı yükü olmadan aynı ağırlıklı seçim
+        return seq[bisect.bisect(cw, self.rnd.random() * cw[-1])]
+
+    def _text(self, n: int) -> str:
+        o = int(self.rnd.random() * _STREAM)
+        return " ".join(self.stream[o:o + n])
+
+    def _tags(self):
+        rnd = self.rnd
+        k = self._pick((0, 1, 2, 3, 4, 5), (25, 55, 77, 90, 97, 100))
+        tags = list(dict.fromkeys(self._pick(self.tags, self.tag_cw) for _ in range(k)))
+        fmt = rnd.random()
+        if fmt < 0.4:
+            return " ".join(tags) if tags or rnd.random() < 0.5 else None
+        if fmt < 0.8:
+            return json.dumps(tags, ensure_ascii=False)
+        d = {t: None for t in tags}
+        if rnd.random() < 0.6: d["prio"] = rnd.choice(_PRIO)
+        return json.dumps(d, ensure_ascii=False)
+
+    def row(self, i: int) -> tuple:
+        rnd = self.rnd
+        age = 1 - i / max(1, self.rows)  # 1: en eski
+        created = self.now - self.span * age - rnd.random() * 3600
+        title_n = max(1, min(20, int(rnd.lognormvariate(1.2, 0.5))))
+        title = self._text(title_n)
+        r = rnd.random()
+        if r < 0.4: notes = ""
+        elif r < 0.99: notes = self._text(max(1, min(400, int(rnd.lognormvariate(2.8, 0.9)))))
+        else: notes = self._text(min(5000, int(rnd.paretovariate(1.1) * 600)))  # uzun kuyruk: KB'lar
+        description = None if rnd.random() < 0.85 else self._text(rnd.randint(3, 30))
+        done = int(rnd.random() < min(0.95, self.done_ratio * (0.4 + 1.2 * age)))
+        updated = min(self.now, created + rnd.expovariate(1 / (10 * 86400)) + (86400 * rnd.random() * 5 if done else 0))
+        r = rnd.random()
+        if r < 0.35: due = None
+        elif r < 0.38: due = ""
+        else:
+            due = _fmt(created + rnd.uniform(-10, 120) * 86400, self._pick(self.due_kinds, self.due_cw))
+        return (self.start_id + i, title, notes, description, self._tags(), done, due,
+                _fmt(created, self._pick(self.ts_kinds, self.ts_cw)), _fmt(updated, self._pick(self.ts_kinds, self.ts_cw)))
+
+    def batches(self, size: int):
+        for lo in range(0, self.rows, size):
+            yield [self.row(i) for i in range(lo, min(self.rows, lo + size))]
+
+_INSERT = ("INSERT INTO tasks(id, title, notes, description, tags, done, due, created_at, updated_at) "
+           "VALUES(?,?,?,?,?,?,?,?,?)")
+
+def _suspend(conn: sqlite3.Connection) -> list:
+    """tasks/task_tags tetikleyicileri ve ikincil indekslerini kaldırır; geri kurmak için SQL'lerini döner."""
+    objs = conn.execute("SELECT type, name, sql FROM sqlite_master WHERE tbl_name IN ('tasks','task_tags') "
+                        "AND type IN ('trigger','index') AND sql IS NOT NULL").fetchall()
+    for typ, name, _ in objs:
+        conn.execute(f"DROP {typ.upper()} IF EXISTS {name}")
+    conn.commit()
+    return objs
+
+def _restore(conn: sqlite3.Connection, objs: list, log):
+    # türetilmiş kolonlar/tablolar tetikleyiciler ve indeksler yokken tek geçişte hesaplanır
+    t0 = time.perf_counter()
+    task_times.backfill(conn)
+    log("*_ts backfill", t0)
+    t0 = time.perf_counter()
+    for typ, _, sql in objs:
+        if typ == "index": conn.execute(sql)
+    conn.commit()
+    log("indexes", t0)
+    t0 = time.perf_counter()
+    task_stats.rebuild(conn)
+    for typ, _, sql in objs:
+        if typ == "trigger": conn.execute(sql)
+    conn.commit()
+    log("stats+triggers", t0)
+    t0 = time.perf_counter()
+    fts_util.reindex(conn)
+    log("fts rebuild", t0)
+
+def generate(conn: sqlite3.Connection, rows: int, seed: int = 42, batch: int = 20000, append: bool = False,
+             quiet: bool = False, **kw) -> dict:
+    """rows görevi conn'a yazar. Boş tabloda hızlı yol, append=True ile mevcut verinin ardına (tetikleyiciler açık)."""
+    def log(what, t0, n=None):
+        if not quiet:
+            dt = time.perf_counter() - t0
+            print(f"{what:22s} {dt:8.2f}s" + (f"  {n / dt:>10,.0f} rows/s" if n else ""), flush=True)
+    conn.create_function("todo_norm", 1, task_query.norm, deterministic=True)
+    migrations.migrate(conn)
+    existing, top = conn.execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM tasks").fetchone()
+    if existing and not append:
+        raise SystemExit(f"tasks already has {existing} rows; use --append or an empty database")
+    gen = Generator(rows, seed, start_id=top + 1, **kw)
+    fast = not existing
+    objs = _suspend(conn) if fast else []
+    conn.execute("PRAGMA synchronous=OFF")
+    t0 = time.perf_counter()
+    try:
+        for chunk in gen.batches(batch):
+            conn.executemany(_INSERT, chunk)
+            # task_tags uygulama tarafında tutulur (tetikleyici yok): aynı biçim çözümüyle doğrudan yazılır
+            conn.executemany("INSERT OR IGNORE INTO task_tags(task_id, tag) VALUES(?,?)",
+                             [(r[0], t) for r in chunk for t in dict.fromkeys(task_query.tag_values(r[4]))])
+            conn.commit()
+        log("insert", t0, rows)
+    finally:
+        if fast:
+            _restore(conn, objs, log)
+        conn.execute("PRAGMA synchronous=NORMAL")
+    total, done = task_stats.counts(conn)
+    return {"rows": rows, "total": total, "done": done,
+            "tags": conn.execute("SELECT COUNT(*) FROM tag_stats").fetchone()[0]}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", required=True)
+    ap.add_argument("--rows", type=int, default=1000000)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--batch", type=int, default=20000)
+    ap.add_argument("--append", action="store_true", help="dolu tabloya ekle (tetikleyiciler açık, yavaş)")
+    ap.add_argument("--now", default="2025-10-01T00:00:00", help="zaman dağılımının sabit referansı")
+    ap.add_argument("--span-days", type=int, default=730)
+    ap.add_argument("--done-ratio", type=float, default=0.35)
+    ap.add_argument("--tag-vocab", type=int, default=500)
+    ap.add_argument("--analyze", action="store_true", help="sonunda ANALYZE")
+    ap.add_argument("--quiet", action="store_true")
+    a = ap.parse_args()
+    conn = sqlite3.connect(a.db)
+    t0 = time.perf_counter()
+    res = generate(conn, a.rows, a.seed, a.batch, a.append, a.quiet, now=a.now, span_days=a.span_days,
+                   done_ratio=a.done_ratio, tag_vocab=a.tag_vocab)
+    if a.analyze:
+        conn.execute("ANALYZE"); conn.commit()
+    conn.close()
+    print(json.dumps({**res, "seconds": round(time.perf_counter() - t0, 1)}, ensure_ascii=False))
@@ -0,0 +1,312 @@
+﻿import os, sys, re, json, time, random, shutil, socket, asyncio, tempfile, argparse, subprocess
+# kullanım: python scripts/load_test.py --mix dashboard=40,cli=5,nightly=0.1 --duration 60 --rows 100000 --out load.json
+#           python scripts/load_test.py --app scripts.load_test:full_app --factory ...   (main:app ile aynı)
+#           python scripts/load_test.py --url http://127.0.0.1:9103 --server-log uvicorn_9103.err.log ...
+# bağımlılıklar: pip install -r requirements-dev.txt (httpx istemcisi; sunucu için uvicorn requirements.txt'ten)
+# Gerçek sunucuya (uvicorn, ağ üzerinden) açık döngülü yük: her profil kendi Poisson geliş hızıyla istek üretir,
+# yanıtları beklemez; gecikme planlanan geliş anından ölçülür (istemci kuyruğu dahil, koordineli ihmal yok).
+# --url verilmezse sunucu tohumlu bir DB kopyası üzerinde (bench_api şablonları) bu betik tarafından başlatılır.
+# Rapor: profil/işlem başına gecikme yüzdelikleri ve histogram, hata ve "database is locked" oranları
+# (sunucu bunu düz 500 olarak döner; sayım sunucunun stderr günlüğünden yapılır) ve sunucu /metrics farkları.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+_LOCKED = re.compile(rb"database is locked|database table is locked", re.I)
+_ID = re.compile(r'"\{id\}"|\{id\}')
+_PARAM = re.compile(r"\{[^}]*\}")
+
+def full_app():
+    """main.app (export/import/bulk ve /prom/metrics main.py'de bağlı); eski --factory kullanımları için."""
+    import main
+    return main.app
+
+# işlem: (metot, yol şablonu, params üreteci, gövde üreteci); {id} rastgele mevcut bir id ile doldurulur
+def _ops(rnd: random.Random):
+    # gen_dataset etiketleri Zipf dağılımlı: baştakiler sık, etiketN kuyruğu seyrek
+    tag = lambda: rnd.choice(["iş", "ev", "acil", "okul", "proje", "etiket40", "etiket200"])
+    def items(k=100): return [{"id": "{id}", "done": bool(rnd.getrandbits(1))} for _ in range(k)]
+    def ndjson(k=1000):
+        return "\n".join(json.dumps({"id": "{id}", "title": f"gece {i}", "tags": ["iş", tag()], "done": i % 2},
+                                    ensure_ascii=False) for i in range(k))
+    return {
+        "list":        ("GET", "/tasks", lambda: rnd.choice([{}, {"done": "false"}, {"tag": tag()}, {"q": "fatura"}]) | {"limit": 50}, None),
+        "list_fields": ("GET", "/tasks", lambda: {"limit": 50, "fields": "id,title,done,due"}, None),
+        "list200":     ("GET", "/tasks", lambda: {"limit": 200, "offset": 0}, None),
+        "get":         ("GET", "/tasks/{id}", None, None),
+        "metrics":     ("GET", "/metrics", None, None),
+        "create":      ("POST", "/tasks", None, lambda: {"title": f"cli {rnd.random():.6f}", "tags": ["cli"]}),
+        "done":        ("PATCH", "/tasks/{id}", None, lambda: {"done": True}),
+        "fields":      ("PATCH", "/tasks/{id}/fields", None, lambda: {"notes": "cli notu"}),
+        "bulk":        ("PATCH", "/bulk", None, items),
+        "import":      ("POST", "/import", lambda: {"mode": "upsert"}, ndjson),
+        "export":      ("GET", "/export", lambda: {"format": "ndjson"}, None),
+    }
+
+# profil: işlem ağırlıkları ve ortalama patlama boyutu (bir gelişte art arda gönderilen istek sayısı)
+PROFILES = {
+    "dashboard": ({"list": 6, "list_fields": 1, "get": 2, "metrics": 1}, 1),
+    "cli":       ({"list200": 2, "done": 4, "fields": 1, "create": 1}, 4),   # Todo-CLI.ps1: liste + PATCH patlamaları
+    "nightly":   ({"import": 1, "export": 1, "bulk": 1}, 1),
+}
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))] if xs else 0.0
+
+def histogram(lat_ms) -> list:
+    counts = [0] * (len(BUCKETS_MS) + 1)
+    for v in lat_ms:
+        i = 0
+        while i < len(BUCKETS_MS) and v > BUCKETS_MS[i]: i += 1
+        counts[i] += 1
+    return counts
+
+class Stat:
+    __slots__ = ("lat", "status", "errors", "locked")
+
+    def __init__(self):
+        self.lat, self.status, self.errors, self.locked = [], {}, {}, 0
+
+    def report(self, wall: float) -> dict:
+        n = sum(self.status.values()) + sum(self.errors.values())
+        bad = sum(v for k, v in self.status.items() if k >= 400) + sum(self.errors.values())
+        return {"n": n, "rps": round(n / wall, 2), "error_rate": round(bad / n, 4) if n else 0.0,
+                "locked_rate": round(self.locked / n, 4) if n else 0.0,
+                "status": {str(k): v for k, v in sorted(self.status.items())}, "exceptions": self.errors,
+                "p50_ms": round(pct(self.lat, 50), 2), "p95_ms": round(pct(self.lat, 95), 2),
+                "p99_ms": round(pct(self.lat, 99), 2), "max_ms": round(max(self.lat, default=0), 2),
+                "histogram": histogram(self.lat)}
+
+# --- sunucu ---
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _start_server(a, tmp: str):
+    import bench_api
+    db = os.path.join(tmp, "load.db")
+    shutil.copyfile(a.db or bench_api._template(a.db_dir, a.rows, a.seed), db)
+    port = _free_port()
+    log = os.path.join(tmp, "server.log")
+    cmd = [sys.executable, "-m", "uvicorn", a.app, "--host", "127.0.0.1", "--port", str(port),
+           "--app-dir", ROOT, "--log-level", "warning", "--no-access-log"] + (["--factory"] if a.factory else [])
+    env = dict(os.environ, TODO_API_DB_PATH=db)
+    f = open(log, "wb")
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=f, stderr=subprocess.STDOUT)
+    return proc, f, f"http://127.0.0.1:{port}", log
+
+async def _wait_up(client, proc, timeout: float = 60):
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < timeout:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            if (await client.get("/health")).status_code < 500: return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("server did not come up")
+
+def _log_size(path) -> int:
+    return os.path.getsize(path) if path and os.path.exists(path) else 0
+
+def _log_locked(path, start: int) -> int:
+    if not path or not os.path.exists(path): return 0
+    with open(path, "rb") as f:
+        f.seek(start)
+        return len(_LOCKED.findall(f.read()))
+
+# --- sunucu metrikleri ---
+
+def _prom(text: str) -> dict:
+    out = {}
+    for line in text.splitlines():
+        if not line or line[0] == "#": continue
+        # name{labels} value [timestamp]
+        i = line.rfind("}") + 1 or line.find(" ")
+        name, rest = line[:i], line[i:].split()
+        try: out[name] = float(rest[0])
+        except (ValueError, IndexError): pass
+    return out
+
+async def _server_metrics(client, prom_path) -> dict:
+    out = {}
+    try:
+        r = await client.get("/metrics")
+        if r.headers.get("content-type", "").startswith("application/json"):
+            out.update({f"json:{k}": v for k, v in r.json().items() if isinstance(v, (int, float))})
+        else:
+            out.update(_prom(r.text))
+    except Exception:
+        pass
+    if prom_path:
+        try:
+            r = await client.get(prom_path)
+            if r.status_code == 200: out.update(_prom(r.text))
+        except Exception:
+            pass
+    return out
+
+def _deltas(before: dict, after: dict) -> dict:
+    return {k: round(after[k] - before.get(k, 0.0), 6) for k in sorted(after) if after[k] != before.get(k, 0.0)}
+
+# --- yük ---
+
+async def _served(client) -> set:
+    try:
+        spec = (await client.get("/openapi.json")).json()
+        return {(m.upper(), _PARAM.sub("{}", p)) for p, ms in spec.get("paths", {}).items() for m in ms}
+    except Exception:
+        return set()
+
+async def _max_id(client) -> int:
+    r = await client.get("/tasks", params={"limit": 1})
+    rows = r.json() if r.status_code == 200 else []
+    return int(rows[0]["id"]) if rows else 1
+
+def _fill(v, rid):
+    # gövde/yol içindeki "{id}" yer tutucularını her istekte yeni bir id ile doldur
+    if isinstance(v, str): return _ID.sub(lambda m: str(rid()), v)
+    if isinstance(v, list): return [_fill(x, rid) for x in v]
+    if isinstance(v, dict): return {k: _fill(x, rid) for k, x in v.items()}
+    return v
+
+async def _profile(client, name, rate, weights, burst, ops, rid, rnd, deadline, stats, state, a):
+    names, w = zip(*weights.items())
+    loop = asyncio.get_running_loop()
+    t_next = loop.time()
+
+    async def one(op, scheduled):
+        method, path, params, body = ops[op]
+        st = stats.setdefault(f"{name}/{op}", Stat())
+        kw = {"params": params() if params else None}
+        if body:
+            b = _fill(body(), rid)
+            if isinstance(b, str): kw["content"] = b.encode("utf-8")
+            else: kw["json"] = b
+        try:
+            r = await client.request(method, _fill(path, rid), **kw)
+            st.status[r.status_code] = st.status.get(r.status_code, 0) + 1
+            if r.status_code >= 500 and _LOCKED.search(r.content): st.locked += 1
+        except Exception as e:
+            k = type(e).__name__
+            st.errors[k] = st.errors.get(k, 0) + 1
+            if _LOCKED.search(str(e).encode()): st.locked += 1
+        st.lat.append((loop.time() - scheduled) * 1000)
+        state["inflight"] -= 1
+
+    while t_next < deadline:
+        await asyncio.sleep(max(0.0, t_next - loop.time()))
+        k = 1 if burst <= 1 else 1 + int(rnd.expovariate(1 / (burst - 1)))
+        for _ in range(k):
+            if state["inflight"] >= a.max_inflight:
+                state["dropped"] += 1; continue
+            state["inflight"] += 1
+            state["tasks"].append(asyncio.ensure_future(one(rnd.choices(names, w)[0], t_next)))
+        t_next += rnd.expovariate(rate)
+
+async def main(a) -> dict:
+    import httpx
+    tmp = tempfile.mkdtemp()
+    proc = f = None
+    url, log = a.url, a.server_log
+    if not url:
+        proc, f, url, log = _start_server(a, tmp)
+    limits = httpx.Limits(max_connections=a.concurrency, max_keepalive_connections=a.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=url, timeout=a.timeout, limits=limits) as client:
+            await _wait_up(client, proc)
+            rnd = random.Random(a.seed)
+            ops = _ops(rnd)
+            served = await _served(client)
+            skipped = sorted({op for op, (m, p, _, _) in ops.items() if served and (m, _PARAM.sub("{}", p)) not in served})
+            for op in skipped:
+                print(f"skip {op}: {ops[op][0]} {ops[op][1]} is not served by {a.app if not a.url else url}")
+            top = await _max_id(client)
+            rid = lambda: rnd.randint(1, top)
+            mix = {}
+            for part in a.mix.split(","):
+                name, _, rate = part.partition("=")
+                weights = {k: v for k, v in PROFILES[name][0].items() if k not in skipped}
+                if weights and float(rate or 0) > 0:
+                    mix[name] = (float(rate), weights, PROFILES[name][1])
+            before, log_start = await _server_metrics(client, a.prom_path), _log_size(log)
+            stats, state = {}, {"inflight": 0, "dropped": 0, "tasks": []}
+            loop = asyncio.get_running_loop()
+            t0 = loop.time(); deadline = t0 + a.duration
+            await asyncio.gather(*(_profile(client, n, r, w, b, ops, rid, rnd, deadline, stats, state, a)
+                                   for n, (r, w, b) in mix.items()))
+            pending = [t for t in state["tasks"] if not t.done()]
+            if pending:
+                await asyncio.wait(pending, timeout=a.drain)
+            wall = loop.time() - t0
+            after = await _server_metrics(client, a.prom_path)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try: proc.wait(timeout=10)
+            except subprocess.TimeoutExpired: proc.kill()
+            f.close()
+    total = Stat()
+    for s in stats.values():
+        total.lat += s.lat; total.locked += s.locked
+        for k, v in s.status.items(): total.status[k] = total.status.get(k, 0) + v
+        for k, v in s.errors.items(): total.errors[k] = total.errors.get(k, 0) + v
+    res = {"meta": {"url": url, "app": None if a.url else a.app, "mix": a.mix, "duration": a.duration,
+                    "concurrency": a.concurrency, "seed": a.seed, "rows": None if a.url or a.db else a.rows,
+                    "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "buckets_ms": list(BUCKETS_MS), "skipped": skipped},
+           "wall_s": round(wall, 2), "dropped": state["dropped"],
+           "server_locked_log_lines": _log_locked(log, log_start),
+           "total": total.report(wall), "ops": {k: s.report(wall) for k, s in sorted(stats.items())},
+           "server_metrics_delta": _deltas(before, after)}
+    if proc is not None:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return res
+
+def _print(res: dict, metrics_filter: str = ""):
+    hdr = " ".join(f"≤{b}" for b in BUCKETS_MS) + " >"
+    print(f"wall {res['wall_s']}s  dropped {res['dropped']}  server 'database is locked' lines {res['server_locked_log_lines']}")
+    print(f"{'op':26s} {'n':>6s} {'req/s':>8s} {'err%':>6s} {'lock%':>6s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'max':>8s}  histogram(ms) {hdr}")
+    for name, r in [*res["ops"].items(), ("TOTAL", res["total"])]:
+        print(f"{name:26s} {r['n']:6d} {r['rps']:8.1f} {r['error_rate'] * 100:6.2f} {r['locked_rate'] * 100:6.2f} "
+              f"{r['p50_ms']:8.1f} {r['p95_ms']:8.1f} {r['p99_ms']:8.1f} {r['max_ms']:8.1f}  {' '.join(map(str, r['histogram']))}")
+        if r["exceptions"] or any(int(k) >= 400 for k in r["status"]):
+            print(f"{'':26s} status {r['status']} exceptions {r['exceptions']}")
+    shown = {k: v for k, v in res["server_metrics_delta"].items() if re.search(metrics_filter, k)}
+    if shown:
+        print("server metrics delta:")
+        for k, v in shown.items():
+            print(f"  {k} {v:+g}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mix", default="dashboard=20,cli=2,nightly=0.05",
+                    help=f"profil=geliş/s, virgülle; profiller: {', '.join(PROFILES)}")
+    ap.add_argument("--duration", type=float, default=30)
+    ap.add_argument("--concurrency", type=int, default=64, help="eşzamanlı HTTP bağlantısı")
+    ap.add_argument("--max-inflight", type=int, default=2000, help="aşılırsa gelişler düşürülür (dropped)")
+    ap.add_argument("--timeout", type=float, default=60)
+    ap.add_argument("--drain", type=float, default=60, help="süre bitince uçuştaki isteklerin beklenmesi (s)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--url", help="çalışan bir sunucu; verilmezse uvicorn başlatılır")
+    ap.add_argument("--server-log", help="--url ile: 'database is locked' sayımı için sunucunun stderr günlüğü")
+    ap.add_argument("--app", default="main:app")
+    ap.add_argument("--factory", action="store_true", help="--app bir fabrika fonksiyonu (ör. scripts.load_test:full_app)")
+    ap.add_argument("--db", help="kopyalanıp kullanılacak DB; verilmezse --rows boyutunda tohumlu şablon")
+    ap.add_argument("--rows", type=int, default=100000)
+    ap.add_argument("--db-dir", default=os.path.join(tempfile.gettempdir(), "todo_api_bench"))
+    ap.add_argument("--prom-path", default="/prom/metrics", help="Prometheus metin çıktısı (varsa)")
+    ap.add_argument("--metrics-filter", default=r"^(?!todo_tasks_(open_)?by_tag)",
+                    help="ekrana yazılan metrik farkları için regex (JSON'a hepsi yazılır)")
+    ap.add_argument("--out", help="sonuç JSON dosyası")
+    a = ap.parse_args()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    res = asyncio.run(main(a))
+    _print(res, a.metrics_filter)
+    if a.out:
+        with open(a.out, "w", encoding="utf-8") as fh:
+            json.dump(res, fh, ensure_ascii=False, indent=1)
+        print(f"results -> {a.out}")
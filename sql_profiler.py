@@ -0,0 +1,159 @@
+﻿import os, time, threading, logging, collections
+from starlette.concurrency import run_in_threadpool
+import db_pool
+
+logger = logging.getLogger(__name__)
+
+# İsteğe bağlı SQL profilleyici. Açıkken her istek bir Profile taşır; db_pool.TimedCursor
+# execute/fetch çağrılarını buraya devreder. Deyim başına: metin (trace callback'ten bağlanmış
+# parametreli hali ve çalışan trigger programı sayısı), süre (execute + fetch), dönen/etkilenen satır ve
+# progress handler ile sayılan VM adımı. Eşiği aşanlara istekten sonra EXPLAIN QUERY PLAN
+# eklenir, loglanır ve /admin/sql/slow'dan okunur. Debug başlığı açıksa yanıta X-SQL-Profile eklenir.
+
+settings = {
+    "enabled":      os.getenv("TODO_API_SQL_PROFILE", "0") == "1",
+    "debug_header": os.getenv("TODO_API_DEBUG", "0") == "1",
+    "threshold_ms": float(os.getenv("TODO_API_SLOW_QUERY_MS", "50")),
+}
+_STEP = 1000  # progress handler her N VM komutunda bir çağrılır
+_slow = collections.deque(maxlen=int(os.getenv("TODO_API_SLOW_QUERY_KEEP", "200")))
+_lock = threading.Lock()
+
+_IMPLICIT = ("BEGIN", "COMMIT", "ROLLBACK")
+
+class _Stmt:
+    __slots__ = ("sql", "params", "expanded", "triggers", "seconds", "rows", "steps")
+
+    def __init__(self, sql, params):
+        self.sql = sql
+        self.params = params
+        self.expanded = None
+        self.triggers = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.steps = 0
+
+    def traced(self, text):
+        if text.startswith(_IMPLICIT): return  # sqlite3 modülünün örtük BEGIN/COMMIT'i
+        # ilk olay deyimin kendisi; aynı deyim içindeki sonraki olaylar tetiklenen trigger programlarıdır
+        if self.expanded is None: self.expanded = text
+        else: self.triggers += 1
+
+def _plan_params(fn_name, a):
+    if len(a) < 2: return ()
+    p = a[1]
+    if fn_name == "executemany":
+        # üreteç tüketilmesin: yalnız liste/tuple'ın ilk parametre kümesi plan için saklanır
+        return p[0] if isinstance(p, (list, tuple)) and p else None
+    return p
+
+class Profile:
+    def __init__(self):
+        self.stmts = []
+        self.route = ""
+
+    def call(self, cur, fn, a, stmt, box):
+        conn = cur.connection
+        if stmt:
+            e = _Stmt(a[0] if a else "", _plan_params(fn.__name__, a))
+            cur._prof_stmt = e
+            self.stmts.append(e)
+            conn.set_trace_callback(e.traced)
+        else:
+            e = getattr(cur, "_prof_stmt", None)
+        ticks = [0]
+        def tick():
+            ticks[0] += 1
+        conn.set_progress_handler(tick, _STEP)
+        t0 = time.perf_counter()
+        try:
+            r = fn(*a)
+        finally:
+            dt = time.perf_counter() - t0
+            conn.set_progress_handler(None, 0)
+            if stmt: conn.set_trace_callback(None)
+            if box is not None: box[0] += dt
+            if e is not None:
+                e.seconds += dt; e.steps += ticks[0] * _STEP
+        if e is not None:
+            if stmt:
+                if cur.description is None: e.rows += max(cur.rowcount, 0)
+            elif isinstance(r, list):
+                e.rows += len(r)
+            elif r is not None:
+                e.rows += 1
+        return r
+
+    def slow(self) -> list:
+        lim = settings["threshold_ms"] / 1000
+        return [e for e in self.stmts if e.seconds >= lim]
+
+    def summary(self) -> str:
+        total = sum(e.seconds for e in self.stmts)
+        worst = max((e.seconds for e in self.stmts), default=0.0)
+        return (f"statements={len(self.stmts)}; total_ms={total * 1000:.2f}; "
+                f"slowest_ms={worst * 1000:.2f}; slow={len(self.slow())}")
+
+def _plan(conn, e: _Stmt):
+    if e.params is None: return None
+    try:
+        rows = conn.execute("EXPLAIN QUERY PLAN " + e.sql, e.params).fetchall()
+    except Exception:
+        return None  # çok deyimli betik, DDL vb.
+    depth, out = {0: -1}, []
+    for r in rows:
+        d = depth.get(r[1], -1) + 1; depth[r[0]] = d
+        out.append("  " * d + r[3])
+    return out
+
+def finish(prof: Profile):
+    """Eşiği aşan deyimlerin planını çıkarır, loglar ve halka tampona yazar."""
+    slow = prof.slow()
+    if not slow: return
+    token = db_pool.sql_profile.set(None)  # plan sorguları kendilerini profillemesin
+    try:
+        with db_pool.reader() as conn:
+            entries = [{
+                "at": round(time.time(), 3), "route": prof.route, "sql": e.sql, "expanded": e.expanded,
+                "ms": round(e.seconds * 1000, 3), "rows": e.rows, "vm_steps": e.steps,
+                "triggers": e.triggers, "plan": _plan(conn, e),
+            } for e in slow]
+    finally:
+        db_pool.sql_profile.reset(token)
+    for x in entries:
+        logger.warning("slow query %.1f ms rows=%s route=%s: %s", x["ms"], x["rows"], x["route"], " ".join((x["expanded"] or x["sql"]).split()))
+    with _lock:
+        _slow.extend(entries)
+
+def slow_queries() -> list:
+    with _lock:
+        return list(_slow)
+
+def clear():
+    with _lock:
+        _slow.clear()
+
+class ProfilerMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (settings["enabled"] or settings["debug_header"]):
+            return await self.app(scope, receive, send)
+        prof = Profile()
+        token = db_pool.sql_profile.set(prof)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and settings["debug_header"]:
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (b"x-sql-profile", prof.summary().encode("ascii"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            db_pool.sql_profile.reset(token)
+            r = scope.get("route")  # http_metrics ile aynı etiket: dönüştürücüsüz şablon
+            prof.route = getattr(r, "path_format", None) or getattr(r, "path", None) or scope.get("path", "")
+            if settings["enabled"] and prof.slow():
+                await run_in_threadpool(finish, prof)
@@ -0,0 +1,109 @@
+﻿import os, time, threading, logging
+from collections import OrderedDict
+import db_pool, task_stats, write_queue
+
+logger = logging.getLogger(__name__)
+
+# Tekil görev okumaları için süreç içi read-through önbellek. Değer, serileştirilmiş yanıt
+# gövdesi (bytes) + ETag'dir; isabette ne SQLite'a gidilir ne de satır yeniden dict'e çevrilir.
+# Anahtar (ad alanı, id): aynı görevin farklı uç noktalardaki farklı gösterimleri ayrı tutulur.
+# Tüm yazma yolları invalidate_on_commit ile id'leri commit sonrası (sonuç çağırana dönmeden) düşürür.
+# Yarış: okuma başlamadan alınan begin() jetonu, arada herhangi bir invalidation olduysa put'u reddeder;
+# böylece commit'ten önce okunmuş eski satır önbelleğe geri yazılamaz.
+# Çok worker'lı kurulumda (TODO_API_TASK_CACHE_SHARED=1) başka süreçlerin yazmaları görülmez;
+# arka plan thread'i task_stats değişiklik sayacını POLL_MS'de bir okur, değişince önbelleği boşaltır.
+
+SIZE = int(os.getenv("TODO_API_TASK_CACHE_SIZE", "2048"))  # 0: kapalı
+TTL = float(os.getenv("TODO_API_TASK_CACHE_TTL", "60"))
+SHARED = os.getenv("TODO_API_TASK_CACHE_SHARED", "0") == "1"
+POLL_MS = float(os.getenv("TODO_API_TASK_CACHE_POLL_MS", "500"))
+
+_lock = threading.Lock()
+_entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # (ns, id) -> (son geçerlilik, etag, gövde)
+_namespaces: set = set()
+_gen = 0
+_stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "invalidations": 0, "rejected": 0}
+_poller: threading.Thread | None = None
+
+def enabled() -> bool:
+    return SIZE > 0
+
+def begin() -> int:
+    """DB okumasından ÖNCE alınır ve put'a verilir."""
+    return _gen
+
+def get(ns: str, task_id: int):
+    """(etag, gövde) ya da None."""
+    if SIZE <= 0: return None
+    if SHARED: _ensure_poller()
+    key = (ns, task_id)
+    with _lock:
+        e = _entries.get(key)
+        if e is None:
+            _stats["misses"] += 1; return None
+        if e[0] < time.monotonic():
+            del _entries[key]
+            _stats["expired"] += 1; _stats["misses"] += 1
+            return None
+        _entries.move_to_end(key)
+        _stats["hits"] += 1
+        return e[1], e[2]
+
+def put(ns: str, task_id: int, etag: str, body: bytes, token: int) -> bool:
+    if SIZE <= 0: return False
+    with _lock:
+        if token != _gen:
+            _stats["rejected"] += 1; return False
+        _namespaces.add(ns)
+        _entries[(ns, task_id)] = (time.monotonic() + TTL, etag, body)
+        _entries.move_to_end((ns, task_id))
+        while len(_entries) > SIZE:
+            _entries.popitem(last=False)
+            _stats["evictions"] += 1
+    return True
+
+def invalidate(ids) -> None:
+    global _gen
+    with _lock:
+        _gen += 1
+        for tid in ids:
+            for ns in _namespaces:
+                if _entries.pop((ns, tid), None) is not None:
+                    _stats["invalidations"] += 1
+
+def invalidate_on_commit(ids) -> None:
+    """Yazma işinin içinden çağrılır; id'ler transaction commit edilince düşürülür."""
+    ids = list(ids)
+    if ids: write_queue.after_commit(lambda: invalidate(ids))
+
+def clear() -> None:
+    global _gen
+    with _lock:
+        _gen += 1
+        _stats["invalidations"] += len(_entries)
+        _entries.clear()
+
+def stats() -> dict:
+    with _lock:
+        return {**_stats, "size": len(_entries), "capacity": SIZE, "ttl_seconds": TTL, "shared": SHARED}
+
+def _poll():
+    last = None
+    while True:
+        try:
+            with db_pool.reader() as conn:
+                v = task_stats.version(conn)
+            if last is not None and v != last:
+                clear()
+            last = v
+        except Exception:
+            logger.exception("task cache version poll failed")
+        time.sleep(POLL_MS / 1000.0)
+
+def _ensure_poller():
+    global _poller
+    if _poller is not None: return
+    with _lock:
+        if _poller is None:
+            _poller = threading.Thread(target=_poll, name="todo-cache-poll", daemon=True)
+            _poller.start()
@@ -0,0 +1,245 @@
+﻿import json, base64, re
+from typing import Optional, List
+import db_pool, task_times, task_record
+
+# GET /tasks, GET /tasks?count ve /export aynı filtre derleyicisini kullanır;
+# filtre/sıralama anlamı tek yerde tanımlıdır.
+
+# Türkçe unaccent + casefold
+_MAP = str.maketrans({
+    "ı":"i","İ":"I","ğ":"g","Ğ":"G","ş":"s","Ş":"S","ö":"o","Ö":"O","ü":"u","Ü":"U","ç":"c","Ç":"C",
+    "â":"a","Â":"A","ä":"a","Ä":"A","à":"a","À":"A","á":"a","Á":"A","ã":"a","Ã":"A",
+    "é":"e","É":"E","è":"e","È":"E","ê":"e","Ê":"E","ë":"e","Ë":"E",
+    "í":"i","Í":"I","ì":"i","Ì":"I","î":"i","Î":"I","ï":"i","Ï":"I",
+    "ó":"o","Ó":"O","ò":"o","Ò":"O","ô":"o","Ô":"O","õ":"o","Õ":"O",
+    "ú":"u","Ú":"U","ù":"u","Ù":"U","û":"u","Û":"U",
+    "ñ":"n","Ñ":"N","ÿ":"y","Ý":"Y"
+})
+def norm(s: Optional[str]) -> str:
+    if not s: return ""
+    return s.translate(_MAP).casefold()
+
+_WORD = re.compile(r"\w+")
+
+def fts_match(q: Optional[str]) -> Optional[str]:
+    """q -> FTS5 MATCH ifadesi: norm() uygulanmış her kelime tırnaklı önek sorgusu olur (örtük AND)."""
+    toks = _WORD.findall(norm(q))
+    if not toks: return None
+    return " ".join(f'"{t}"*' for t in toks)
+
+def tag_values(t) -> List[str]:
+    """Saklanan tag değerini (boşluklu / virgüllü metin, JSON liste, JSON sözlük) eşleşme listesine çevirir.
+    Sözlükte hem anahtar hem 'anahtar:değer' eşleşir."""
+    if t is None: return []
+    if isinstance(t, (bytes, bytearray)):
+        t = t.decode("utf-8", "ignore")
+    if isinstance(t, str):
+        ts = t.strip()
+        if not ts: return []
+        if ts[0] in "[{":
+            try: t = json.loads(ts)
+            except Exception: t = None
+        if isinstance(t, str) or t is None:
+            return [p for p in ts.replace(",", " ").split() if p]
+    if isinstance(t, dict):
+        out = []
+        for k, v in t.items():
+            out.append(str(k))
+            if v is not None: out.append(f"{k}:{v}")
+        return out
+    if isinstance(t, list):
+        return [str(x).strip() for x in t if x is not None and str(x).strip()]
+    return [str(t)]
+
+db_pool.register_function("todo_norm", 1, norm)
+
+SORTS = ("id", "title", "due", "created_at", "updated_at")
+
+# Zaman sıralamaları metin yerine task_times'ın epoch kolonlarıyla yapılır (biçimden bağımsız
+# kronolojik sıra). NULL (boş/ayrıştırılamayan) değer bir uç değere çevrilir: due her iki yönde
+# sona, created_at/updated_at en küçük. Anahtar ifadeleri migrations'daki ifade indeksleriyle
+# birebir aynı olmalı (SORT_INDEXES), yoksa her sayfa tam tarama + geçici sıralama olur.
+_TS_SORTS = {"due": "due_ts", "created_at": "created_ts", "updated_at": "updated_ts"}
+_TS_LOW, _TS_HIGH = -(1 << 62), 1 << 62
+
+def _null_ts(sort: str, desc: bool) -> int:
+    return _TS_HIGH if sort == "due" and not desc else _TS_LOW
+
+def ts_key(col: str, null: int, alias: str = "t.") -> str:
+    return f"IFNULL({alias}{col},{null})"
+
+# (indeks adı, kolon, NULL yerine geçen değer) -> ON tasks(IFNULL(kolon, değer), id)
+SORT_INDEXES = (
+    ("idx_tasks_due_sort_asc", "due_ts", _TS_HIGH),
+    ("idx_tasks_due_sort_desc", "due_ts", _TS_LOW),
+    ("idx_tasks_created_sort", "created_ts", _TS_LOW),
+    ("idx_tasks_updated_sort", "updated_ts", _TS_LOW),
+)
+
+def sort_columns(sort: str) -> tuple:
+    """Sıralama/cursor için okunması gereken kolonlar (projection extra'sı)."""
+    return ("id", _TS_SORTS.get(sort, sort))
+
+def _sort_keys(sort: str, desc: bool):
+    d = "DESC" if desc else "ASC"
+    if sort == "id":
+        return [("t.id", d)]
+    if sort == "title":
+        return [("t.title", d), ("t.id", d)]
+    return [(ts_key(_TS_SORTS[sort], _null_ts(sort, desc)), d), ("t.id", d)]
+
+def _sort_values(sort: str, desc: bool, row) -> list:
+    # _sort_keys ifadelerinin Python karşılığı (cursor içine yazılan değerler)
+    if sort == "id":
+        return [row["id"]]
+    if sort == "title":
+        return [row["title"], row["id"]]
+    v = row[_TS_SORTS[sort]]
+    return [_null_ts(sort, desc) if v is None else v, row["id"]]
+
+def _keyset(keys, values):
+    """(k1,k2,..) sıralamasında verilen değerlerden *sonra* gelen satırlar için koşul.
+    Aynı yöndeki ardışık anahtarlar satır-değeri karşılaştırmasına birleştirilir (index seek)."""
+    groups = []
+    for (expr, d), v in zip(keys, values):
+        if groups and groups[-1][0] == d:
+            groups[-1][1].append(expr); groups[-1][2].append(v)
+        else:
+            groups.append((d, [expr], [v]))
+    def rv(exprs):
+        return exprs[0] if len(exprs) == 1 else "(" + ",".join(exprs) + ")"
+    def ph(n):
+        return "?" if n == 1 else "(" + ",".join("?" * n) + ")"
+    ors, params = [], []
+    for i, (d, exprs, vals) in enumerate(groups):
+        parts, p = [], []
+        for _, pe, pv in groups[:i]:
+            parts.append(f"{rv(pe)}={ph(len(pe))}"); p += pv
+        parts.append(f"{rv(exprs)}{'<' if d == 'DESC' else '>'}{ph(len(exprs))}"); p += vals
+        ors.append(" AND ".join(parts)); params += p
+    cond = "(" + " OR ".join(f"({o})" for o in ors) + ")" if len(ors) > 1 else ors[0]
+    # satır-değeri karşılaştırması ifade indeksinde aralık aramasına dönüşmez; ilk anahtar için
+    # eşdeğer kapsayıcı sınır ayrıca yazılır (sonucu değiştirmez, planı SEARCH yapar)
+    (e0, d0), v0 = keys[0], values[0]
+    return f"{e0}{'<=' if d0 == 'DESC' else '>='}? AND {cond}", [v0, *params]
+
+class CursorError(ValueError):
+    pass
+
+class FilterError(ValueError):
+    pass
+
+# due_before/due_after: tarih biçimli değer (YYYY-MM-DD, ardından isteğe bağlı saat/dilim) ya da
+# açık epoch işareti (@1740819600). Salt rakam reddedilir: "2025" yıl mı saniye mi belirsiz.
+_DATE_SHAPED = re.compile(r"\d{4}[-/]\d{2}[-/]\d{2}")
+_EPOCH_MARKED = re.compile(r"@-?\d+")
+
+def due_bound(value: str, name: str) -> int:
+    """Sorgu parametresini epoch saniyesine çevirir; geçersizse FilterError."""
+    v = str(value).strip()
+    if _EPOCH_MARKED.fullmatch(v):
+        return int(v[1:])
+    ts = task_times.epoch(v) if _DATE_SHAPED.match(v) else None
+    if ts is None:
+        raise FilterError(f"invalid {name}: expected YYYY-MM-DD[ HH:MM[:SS]][+HH:MM] or @epoch")
+    return ts
+
+def encode_cursor(sort: str, desc: bool, row) -> str:
+    raw = json.dumps([sort, "desc" if desc else "asc", *_sort_values(sort, desc, row)],
+                     ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+def decode_cursor(token: str, sort: str, desc: bool) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        obj = json.loads(raw.decode("utf-8"))
+    except Exception:
+        raise CursorError("invalid cursor")
+    if not isinstance(obj, list) or len(obj) < 3:
+        raise CursorError("invalid cursor")
+    if obj[0] != sort or obj[1] != ("desc" if desc else "asc"):
+        raise CursorError("cursor does not match sort/order")
+    values = obj[2:]
+    if len(values) != len(_sort_keys(sort, desc)):
+        raise CursorError("invalid cursor")
+    # değerler bağlama parametresi olur; sqlite dict/list kabul etmez
+    if not all(v is None or isinstance(v, (str, int, float)) for v in values):
+        raise CursorError("invalid cursor")
+    return values
+
+class TaskQuery:
+    def __init__(self, done: Optional[bool] = None, q: Optional[str] = None,
+                 tag: Optional[List[str]] = None, due_before: Optional[str] = None,
+                 due_after: Optional[str] = None, sort: Optional[str] = "id",
+                 order: Optional[str] = "desc", cursor: Optional[str] = None):
+        self.done = done
+        self.q = (q or "").strip() or None
+        self.tags = list(dict.fromkeys(str(x).strip() for x in (tag or []) if str(x).strip()))
+        self.due_before = due_before
+        self.due_after = due_after
+        # bir kez doğrulanır; where() yalnız tamsayı sınırları kullanır
+        self.due_range = [(due_bound(v, n), op) for v, n, op in
+                          ((due_before, "due_before", "<="), (due_after, "due_after", ">=")) if v]
+        self.sort = sort if sort in SORTS else "id"
+        self.desc = str(order).lower() != "asc"
+        self.columns = sort_columns(self.sort)
+        self.after = decode_cursor(cursor, self.sort, self.desc) if cursor else None
+
+    def where(self, paged: bool = True, fts: bool = False, range_ids: bool = False):
+        where, params = [], []
+        if self.done is not None:
+            where.append("t.done=?"); params.append(1 if self.done else 0)
+        # tamsayı epoch aralığı (task_times); NULL due_ts hiçbir aralığa girmez
+        if range_ids and self.due_range:
+            # LIMIT'siz id sıralı okuma (tam export): aralık due_ts indeksinden id kümesine çevrilir,
+            # satırlar id sırasıyla birincil anahtardan okunur (tag kesişimi gibi). Aksi halde planlayıcı
+            # sıralamadan kaçmak için tüm tabloyu tarar; satırları geçici B-tree'de sıralamak da
+            # akışın sabit belleğini bozardı.
+            sub = " AND ".join(f"due_ts {op} ?" for _, op in self.due_range)
+            where.append(f"t.id IN (SELECT id FROM tasks WHERE {sub})"); params.extend(ts for ts, _ in self.due_range)
+        for ts, op in ([] if range_ids else self.due_range):
+            where.append(f"t.due_ts {op} ?"); params.append(ts)
+            if self.sort == "due":
+                # aynı aralık sıralama ifadesi üzerinden de: sıralama indeksi sınırdan başlar
+                where.append(f"{_sort_keys('due', self.desc)[0][0]} {op} ?"); params.append(params[-1])
+        match = fts_match(self.q) if (self.q and fts) else None
+        if match:
+            where.append("t.id IN (SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH ?)"); params.append(match)
+        elif self.q:
+            # FTS5 yoksa: aynı unaccent+casefold kuralıyla alt-dize taraması
+            nq = norm(self.q)
+            where.append("(instr(todo_norm(t.title),?)>0 OR instr(todo_norm(t.notes),?)>0"
+                         " OR instr(todo_norm(t.description),?)>0)")
+            params.extend([nq, nq, nq])
+        if self.tags:
+            # task_tags(tag, task_id) indeksi üzerinde kesişim
+            sub = " INTERSECT ".join(["SELECT task_id FROM task_tags WHERE tag=?"] * len(self.tags))
+            where.append(f"t.id IN ({sub})"); params.extend(self.tags)
+        if paged and self.after is not None:
+            cond, p = _keyset(_sort_keys(self.sort, self.desc), self.after)
+            where.append(cond); params.extend(p)
+        return (" WHERE " + " AND ".join(where)) if where else "", params
+
+    def order_by(self) -> str:
+        return " ORDER BY " + ", ".join(f"{e} {d}" for e, d in _sort_keys(self.sort, self.desc))
+
+    def select(self, limit: Optional[int] = None, offset: int = 0, columns: str = "t.*", fts: bool = False):
+        where, params = self.where(fts=fts, range_ids=limit is None and self.sort == "id")
+        sql = f"SELECT {columns} FROM tasks t{where}{self.order_by()}"
+        if limit is not None or offset:
+            sql += " LIMIT ? OFFSET ?"; params += [-1 if limit is None else int(limit), int(offset)]
+        return sql, params
+
+    def page(self, shape: str, keys, available, limit: Optional[int], offset: int = 0, fts: bool = False):
+        """Liste uçlarının sayfa sorgusu: alan kümesinin kolonları + cursor kolonları (task_record.projection)."""
+        cols = task_record.projection(shape, keys, available, extra=self.columns)
+        return self.select(limit=limit, offset=offset, columns=cols, fts=fts)
+
+    def count(self, fts: bool = False):
+        where, params = self.where(paged=False, fts=fts)
+        return f"SELECT COUNT(*) FROM tasks t{where}", params
+
+    def next_cursor(self, rows, limit: Optional[int]) -> Optional[str]:
+        if not limit or len(rows) < limit:
+            return None
+        return encode_cursor(self.sort, self.desc, rows[-1])
@@ -0,0 +1,151 @@
+﻿import json
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+import task_times
+
+# Görev satırlarının ortak eşleyicisi. Her uç nokta kendi çıktı biçimini (shape) tanımlar:
+# hangi anahtar hangi kolondan, hangi dönüştürücüyle gelir. Sorgu kolon sırası için bir kez
+# (shape, kolon adları) başına düz bir fonksiyon üretilir: r[i] indeksleriyle tek dict kurar,
+# dict(row) ara kopyası ve sütun adı aramaları yoktur.
+# tags yalnız istenince çözülür; aynı metin tekrar tekrar gelir (az sayıda farklı tag kombinasyonu)
+# ve çözüm sınırlı bir önbellekten paylaşılır. Dönen liste/dict'ler paylaşımlıdır: değiştirmeyin.
+# TaskRecord satırı sarmalayan __slots__ nesnesidir; fast_json onu doğrudan kodlar (to_dict).
+# Seyrek alan kümeleri (fields=id,title,done): eşleyici yalnız istenen anahtarları üretir,
+# projection() SELECT listesini bu anahtarların kaynak kolonlarına daraltır.
+
+def _str(v) -> str:
+    return "" if v is None else str(v)
+
+def _text(t):
+    if isinstance(t, (bytes, bytearray)):
+        return bytes(t).decode("utf-8", "ignore")
+    return t
+
+@lru_cache(maxsize=4096)
+def tags_words(t) -> list:
+    """main biçimi: boşlukla ayrılmış etiketler."""
+    t = _text(t)
+    return [w for w in _str(t).split() if w]
+
+@lru_cache(maxsize=4096)
+def tags_json(t):
+    """export/fields biçimi: saklanan JSON olduğu gibi; boş ya da bozuksa {}."""
+    t = _text(t)
+    if isinstance(t, str) and t.strip():
+        try: return json.loads(t)
+        except Exception: return {}
+    return t if t and not isinstance(t, str) else {}
+
+def _tags(parse):
+    # lru_cache hashlenemeyen değerde TypeError verir (SQLite'tan gelmez, yine de)
+    def f(t):
+        try: return parse(t)
+        except TypeError: return parse.__wrapped__(t)
+    return f
+
+# shape: (anahtar, kolon, dönüştürücü adı) — None kimlik. "*" tüm kolonlar sırasıyla.
+SHAPES: Dict[str, tuple] = {
+    "main": (("id", "id", None), ("title", "title", "_or_empty"), ("notes", "notes", "_or_empty"),
+             ("tags", "tags", "tags_words"), ("done", "done", "bool"), ("due", "due", None),
+             ("created_at", "created_at", "_or_empty"), ("updated_at", "updated_at", "_or_empty")),
+    "raw": "*",
+}
+_RAW_CONV = {"done": "bool", "tags": "tags_json"}
+_TAG_PARSERS = {"tags_words": tags_words, "tags_json": tags_json}
+_NS = {"bool": bool, "_or_empty": lambda v: v or "",
+       **{k: _tags(p) for k, p in _TAG_PARSERS.items()}}
+
+class FieldsError(ValueError):
+    pass
+
+# task_times'ın tetikleyicilerle tutulan *_ts kolonları iç ayrıntıdır; "*" biçiminde görünmez
+_HIDDEN = frozenset(ts for ts, _ in task_times.COLUMNS)
+
+def _spec(shape: str, names) -> tuple:
+    spec = SHAPES[shape]
+    return tuple((n, n, _RAW_CONV.get(n)) for n in names if n not in _HIDDEN) if spec == "*" else spec
+
+def parse_fields(fields: Optional[str], shape: str, available=None) -> Optional[Tuple[str, ...]]:
+    """'id,title' -> ('id','title'); boşsa None (tüm alanlar). Bilinmeyen alan FieldsError verir.
+    Sabit biçimlerde izinli alanlar biçimin anahtarlarıdır; "raw" biçimde tablonun kolonları (available)."""
+    if not fields: return None
+    req = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    if not req: return None
+    allowed = [k for k, _, _ in _spec(shape, sorted(available or ()))]
+    bad = [f for f in req if f not in allowed]
+    if bad:
+        raise FieldsError(f"Unknown field(s): {', '.join(bad)}. Allowed: {', '.join(allowed)}")
+    return req
+
+def projection(shape: str, keys: Optional[Tuple[str, ...]], available, extra=("id",)) -> str:
+    """SELECT listesi: istenen anahtarların kaynak kolonları + extra (sıralama/cursor/ETag için);
+    tabloda olmayan kolonlar atlanır (eşleyici onları None gibi ele alır)."""
+    if keys is None: return "t.*"
+    src = {k: c for k, c, _ in _spec(shape, keys)}
+    cols = dict.fromkeys([*extra, *(src[k] for k in keys)])
+    return ", ".join(f"t.{c}" for c in cols if c in available)
+
+class Mapper:
+    __slots__ = ("shape", "names", "index", "to_dict", "tags")
+
+    def __init__(self, shape: str, names: Tuple[str, ...], keys: Optional[Tuple[str, ...]] = None):
+        self.shape, self.names = shape, names
+        self.index = {n: i for i, n in enumerate(names)}
+        spec = _spec(shape, names if keys is None else [n for n in names if n in keys])
+        if keys is not None:
+            spec = tuple(s for s in spec if s[0] in keys)
+        parts = []
+        tags = None
+        for key, col, conv in spec:
+            i = self.index.get(col)
+            val = "None" if i is None else f"r[{i}]"
+            parts.append(f"{key!r}: {conv}({val})" if conv else f"{key!r}: {val}")
+            if col == "tags": tags = conv
+        src = "def to_dict(r):\n    return {" + ", ".join(parts) + "}\n"
+        ns = dict(_NS); exec(src, ns)
+        self.to_dict = ns["to_dict"]
+        self.tags = _NS[tags] if tags else None
+
+_mappers: Dict[tuple, Mapper] = {}
+
+def mapper(row, shape: str, keys: Optional[Tuple[str, ...]] = None) -> Mapper:
+    """row'un kolon düzeni (sqlite3.Row ya da cursor.description) ve alan kümesi için derlenmiş eşleyici."""
+    names = tuple(row.keys()) if hasattr(row, "keys") else tuple(d[0] for d in row)
+    m = _mappers.get((shape, names, keys))
+    if m is None:
+        m = _mappers[(shape, names, keys)] = Mapper(shape, names, keys)
+    return m
+
+class TaskRecord:
+    """Bir satırın görünümü: alanlara ad ile erişilir, tags ilk erişimde çözülür, to_dict kodlanacak dict'i verir."""
+    __slots__ = ("row", "m")
+
+    def __init__(self, row, m: Mapper):
+        self.row, self.m = row, m
+
+    def __getitem__(self, col):
+        return self.row[self.m.index[col]]
+
+    @property
+    def tags(self):
+        i = self.m.index.get("tags")
+        raw = None if i is None else self.row[i]
+        return self.m.tags(raw) if self.m.tags else raw
+
+    def to_dict(self) -> dict:
+        return self.m.to_dict(self.row)
+
+def to_dict(row, shape: str, keys=None) -> dict:
+    return mapper(row, shape, keys).to_dict(row)
+
+def records(rows: List, shape: str, keys=None) -> List[TaskRecord]:
+    """Sayfa boyunca yalnız satır + küçük sarmalayıcı tutulur; dict'ler kodlama anında kurulup bırakılır."""
+    if not rows: return []
+    m = mapper(rows[0], shape, keys)
+    return [TaskRecord(r, m) for r in rows]
+
+def to_dicts(rows: Iterable, shape: str, keys=None) -> List[dict]:
+    rows = rows if isinstance(rows, list) else list(rows)
+    if not rows: return []
+    f = mapper(rows[0], shape, keys).to_dict
+    return [f(r) for r in rows]
@@ -0,0 +1,114 @@
+﻿import sqlite3
+
+# /metrics için özet sayaçlar. task_stats tek satırlık toplam/done sayacı, tag_stats etiket başına
+# toplam/açık görev sayısıdır; ikisini de SQLite tetikleyicileri günceller, yani hangi yoldan
+# (API, import, harici araç) yazılırsa yazılsın tutarlı kalır. Kayma şüphesinde rebuild().
+# "açık" = done=0 (eski GROUP BY sorgusuyla aynı tanım); NULL done ne açık ne tamamlanmış sayılır.
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS task_stats(
+        id    INTEGER PRIMARY KEY CHECK (id = 1),
+        total INTEGER NOT NULL DEFAULT 0,
+        done  INTEGER NOT NULL DEFAULT 0
+    );
+    INSERT OR IGNORE INTO task_stats(id) VALUES (1);
+    CREATE TABLE IF NOT EXISTS tag_stats(
+        tag   TEXT PRIMARY KEY,
+        total INTEGER NOT NULL DEFAULT 0,
+        open  INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID;
+
+    CREATE TRIGGER IF NOT EXISTS task_stats_ai AFTER INSERT ON tasks BEGIN
+        UPDATE task_stats SET total = total + 1, done = done + (new.done IS 1) WHERE id = 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS task_stats_ad AFTER DELETE ON tasks BEGIN
+        UPDATE task_stats SET total = total - 1, done = done - (old.done IS 1) WHERE id = 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS task_stats_au AFTER UPDATE OF done ON tasks
+    WHEN new.done IS NOT old.done BEGIN
+        UPDATE task_stats SET done = done + (new.done IS 1) - (old.done IS 1) WHERE id = 1;
+        UPDATE tag_stats SET open = open + (new.done IS 0) - (old.done IS 0)
+        WHERE tag IN (SELECT tag FROM task_tags WHERE task_id = new.id);
+    END;
+
+    -- task_tags satırları görev hâlâ mevcutken yazılır/silinir (bkz. task_tags_td BEFORE DELETE)
+    CREATE TRIGGER IF NOT EXISTS tag_stats_ai AFTER INSERT ON task_tags BEGIN
+        INSERT INTO tag_stats(tag, total, open)
+        VALUES (new.tag, 1, COALESCE((SELECT done IS 0 FROM tasks WHERE id = new.task_id), 0))
+        ON CONFLICT(tag) DO UPDATE SET total = total + 1, open = open + excluded.open;
+    END;
+    CREATE TRIGGER IF NOT EXISTS tag_stats_ad AFTER DELETE ON task_tags BEGIN
+        UPDATE tag_stats
+        SET total = total - 1,
+            open  = open - COALESCE((SELECT done IS 0 FROM tasks WHERE id = old.task_id), 0)
+        WHERE tag = old.tag;
+        DELETE FROM tag_stats WHERE tag = old.tag AND total <= 0;
+    END;
+"""
+
+# Genel değişiklik sayacı: tasks'a her yazmada artar (ETag, önbellek geçersizleştirme).
+# Tetikleyiciyle tutulduğu için harici araçların yazdıkları da sayılır; PRAGMA data_version
+# ise bağlantıya özgüdür ve aynı bağlantının kendi yazmalarını görmez.
+_CHANGES = """
+    CREATE TRIGGER IF NOT EXISTS task_changes_ai AFTER INSERT ON tasks BEGIN
+        UPDATE task_stats SET changes = changes + 1 WHERE id = 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS task_changes_ad AFTER DELETE ON tasks BEGIN
+        UPDATE task_stats SET changes = changes + 1 WHERE id = 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS task_changes_au AFTER UPDATE ON tasks BEGIN
+        UPDATE task_stats SET changes = changes + 1 WHERE id = 1;
+    END;
+"""
+
+def ensure_changes(conn: sqlite3.Connection):
+    cols = [r[1] for r in conn.execute("PRAGMA table_info(task_stats)")]
+    if "changes" not in cols:
+        conn.execute("ALTER TABLE task_stats ADD COLUMN changes INTEGER NOT NULL DEFAULT 0")
+    conn.executescript(_CHANGES)
+
+def version(conn: sqlite3.Connection) -> int:
+    """tasks tablosunun değişiklik sayacı (tek satır okuması)."""
+    row = conn.execute("SELECT changes FROM task_stats WHERE id = 1").fetchone()
+    return int(row[0]) if row else 0
+
+def ensure(conn: sqlite3.Connection) -> bool:
+    """Tabloları ve tetikleyicileri kurar; ilk kurulumda mevcut veriden doldurur. Doldurduysa True."""
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='tag_stats'").fetchone()
+    conn.executescript(_SCHEMA)
+    if exists:
+        return False
+    rebuild(conn)
+    return True
+
+def rebuild(conn: sqlite3.Connection) -> dict:
+    conn.execute("""
+        UPDATE task_stats SET
+            total = (SELECT COUNT(*) FROM tasks),
+            done  = (SELECT COUNT(*) FROM tasks WHERE done IS 1)
+        WHERE id = 1""")
+    conn.execute("DELETE FROM tag_stats")
+    conn.execute("""
+        INSERT INTO tag_stats(tag, total, open)
+        SELECT tt.tag, COUNT(*), SUM(t.done IS 0)
+        FROM task_tags tt JOIN tasks t ON t.id = tt.task_id
+        GROUP BY tt.tag""")
+    total, done = conn.execute("SELECT total, done FROM task_stats WHERE id = 1").fetchone()
+    tags = conn.execute("SELECT COUNT(*) FROM tag_stats").fetchone()[0]
+    return {"tasks": total, "done": done, "tags": tags}
+
+def counts(conn: sqlite3.Connection):
+    """(total, done) — tek satır okuması."""
+    row = conn.execute("SELECT total, done FROM task_stats WHERE id = 1").fetchone()
+    return (int(row[0]), int(row[1])) if row else (0, 0)
+
+def tag_counts(conn: sqlite3.Connection) -> list:
+    """[(tag, total, open)] — etiket sayısı kadar satır."""
+    return [(r[0], int(r[1]), int(r[2])) for r in conn.execute("SELECT tag, total, open FROM tag_stats ORDER BY tag")]
+
+if __name__ == "__main__":
+    # python task_stats.py  -> sayaçları tasks/task_tags'ten yeniden hesaplar
+    import db_pool
+    with db_pool.writer() as conn:
+        ensure(conn)
+        print(rebuild(conn))
@@ -0,0 +1,64 @@
+﻿import sqlite3
+from typing import Iterable, Tuple
+from task_query import tag_values
+
+# tasks.tags üç biçimde saklanabiliyor (boşluklu metin, JSON liste, JSON sözlük);
+# task_tags bunların tek, indeksli karşılığıdır. Satır silinince tetikleyici temizler,
+# tags değişen her yazma yolu sync()/sync_rows() çağırır.
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS task_tags(
+        task_id INTEGER NOT NULL,
+        tag     TEXT NOT NULL,
+        PRIMARY KEY(task_id, tag)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_task_tags_tag ON task_tags(tag, task_id);
+    CREATE TRIGGER IF NOT EXISTS task_tags_td BEFORE DELETE ON tasks BEGIN
+        DELETE FROM task_tags WHERE task_id=old.id;
+    END;
+"""
+
+_CHUNK = 500
+
+def ensure(conn: sqlite3.Connection) -> bool:
+    """Tabloyu kurar; ilk kurulumda mevcut tasks.tags verisini taşır. Taşıma yapıldıysa True."""
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='task_tags'").fetchone()
+    conn.executescript(_SCHEMA)
+    if exists:
+        return False
+    rebuild(conn)
+    return True
+
+def _pairs(task_id, tags) -> list:
+    return [(task_id, t) for t in dict.fromkeys(tag_values(tags))]
+
+def sync_rows(conn: sqlite3.Connection, rows: Iterable[Tuple[int, object]]):
+    """(task_id, tags) çiftleri için task_tags satırlarını yeniden yazar."""
+    rows = list(rows)
+    for i in range(0, len(rows), _CHUNK):
+        part = rows[i:i + _CHUNK]
+        ids = [r[0] for r in part]
+        conn.execute(f"DELETE FROM task_tags WHERE task_id IN ({','.join('?' * len(ids))})", ids)
+        conn.executemany("INSERT OR IGNORE INTO task_tags(task_id, tag) VALUES(?,?)",
+                         [p for tid, tags in part for p in _pairs(tid, tags)])
+
+def sync(conn: sqlite3.Connection, ids: Iterable[int]):
+    """Verilen görevlerin etiketlerini tasks.tags kolonundan yeniden okuyup indeksler."""
+    ids = list(dict.fromkeys(i for i in ids if i is not None))
+    for i in range(0, len(ids), _CHUNK):
+        part = ids[i:i + _CHUNK]
+        found = conn.execute(f"SELECT id, tags FROM tasks WHERE id IN ({','.join('?' * len(part))})", part).fetchall()
+        seen = {r[0] for r in found}
+        sync_rows(conn, [(r[0], r[1]) for r in found] + [(tid, None) for tid in part if tid not in seen])
+
+def rebuild(conn: sqlite3.Connection) -> int:
+    conn.execute("DELETE FROM task_tags")
+    cur = conn.execute("SELECT id, tags FROM tasks")
+    n = 0
+    while True:
+        chunk = cur.fetchmany(_CHUNK)
+        if not chunk: break
+        conn.executemany("INSERT OR IGNORE INTO task_tags(task_id, tag) VALUES(?,?)",
+                         [p for r in chunk for p in _pairs(r[0], r[1])])
+        n += len(chunk)
+    return n
@@ -0,0 +1,97 @@
+﻿import sqlite3, threading, os
+from functools import lru_cache
+from typing import Optional
+
+# Zaman damgalarının tamsayı (Unix epoch, saniye) gölge kolonları. due/created_at/updated_at
+# TEXT ve karışık biçimlerde tutulur (datetime('now') "YYYY-MM-DD HH:MM:SS", isoformat "T"li,
+# import/araçlar "/"li ya da sayısal); metin karşılaştırması biçimler arasında yanlış sonuç verir.
+# Uygulamanın INSERT'leri *_ts'yi aynı ifadeyle kendisi yazar (values()); tetikleyiciler yalnız değer
+# tutmuyorsa düzeltir, yani başka yoldan yazılan satırlar da güncel kalır ama doğru yazılmış satır
+# ikinci bir UPDATE görmez. Aralık filtreleri (due_before/due_after, overdue, son 24 saat) bunlar
+# üzerinde indeksli çalışır.
+# Saat dilimsiz değerler UTC kabul edilir (datetime('now') UTC'dir); "+03:00"/"Z" eki çevrilir.
+# Ayrıştırılamayan değer NULL olur ve hiçbir aralığa girmez.
+
+COLUMNS = (("due_ts", "due"), ("created_ts", "created_at"), ("updated_ts", "updated_at"))
+BACKFILL_CHUNK = int(os.getenv("TODO_API_TS_BACKFILL_CHUNK", "5000"))
+
+def expr(x: str) -> str:
+    """x'i epoch saniyesine çeviren SQL ifadesi (tetikleyiciler, backfill ve epoch() aynısını kullanır)."""
+    return (f"(CASE WHEN {x} IS NULL THEN NULL"
+            f" WHEN typeof({x}) IN ('integer','real') THEN CAST({x} AS INTEGER)"
+            # salt rakam: epoch (strftime bunu Jülyen günü sayardı)
+            f" WHEN trim({x}) <> '' AND trim({x}) NOT GLOB '*[^0-9]*' THEN CAST(trim({x}) AS INTEGER)"
+            # 'now' deterministik değil; veri olarak saklanmışsa zaman sayılmaz
+            f" WHEN lower(trim({x})) = 'now' THEN NULL"
+            f" ELSE CAST(strftime('%s', replace(trim({x}), '/', '-')) AS INTEGER) END)")
+
+def _sets(src: str) -> str:
+    return ", ".join(f"{ts} = {expr(src + col)}" for ts, col in COLUMNS)
+
+def _stale(src: str) -> str:
+    return " OR ".join(f"{src}{ts} IS NOT {expr(src + col)}" for ts, col in COLUMNS)
+
+TS_COLUMNS = ", ".join(ts for ts, _ in COLUMNS)
+
+def values(**src: str) -> str:
+    """TS_COLUMNS sırasıyla INSERT değerleri; src her metin kolonun SQL kaynağıdır
+    (ör. due=":due", created_at="datetime('now')"). 'now' tek deyim içinde sabittir."""
+    return ", ".join(expr(src[col]) for _, col in COLUMNS)
+
+# AFTER tetikleyicisi NEW'i değiştiremez; WHEN koşulu doğru yazılmış satırda ek UPDATE'i
+# (ve task_stats değişiklik sayacının ikinci artışını) önler
+_TRIGGERS = f"""
+    DROP TRIGGER IF EXISTS task_times_ai;
+    DROP TRIGGER IF EXISTS task_times_au;
+    CREATE TRIGGER task_times_ai AFTER INSERT ON tasks WHEN {_stale("new.")} BEGIN
+        UPDATE tasks SET {_sets("new.")} WHERE id = new.id;
+    END;
+    CREATE TRIGGER task_times_au AFTER UPDATE OF due, created_at, updated_at ON tasks WHEN {_stale("new.")} BEGIN
+        UPDATE tasks SET {_sets("new.")} WHERE id = new.id;
+    END;
+"""
+
+_MISSING = " OR ".join(f"({ts} IS NULL AND {col} IS NOT NULL)" for ts, col in COLUMNS)
+
+def ensure(conn: sqlite3.Connection) -> int:
+    """Kolonları ve tetikleyicileri kurar, değeri eksik satırları doldurur (yarıda kalmış bir
+    doldurma kaldığı yerden sürer). Doldurulan satır sayısını döner."""
+    cols = [r[1] for r in conn.execute("PRAGMA table_info(tasks)")]
+    for ts, _ in COLUMNS:
+        if ts not in cols:
+            conn.execute(f"ALTER TABLE tasks ADD COLUMN {ts} INTEGER")
+    conn.executescript(_TRIGGERS)
+    return backfill(conn)
+
+def backfill(conn: sqlite3.Connection, chunk: int = BACKFILL_CHUNK, full: bool = False) -> int:
+    """*_ts kolonlarını metin kolonlardan id aralıkları halinde hesaplar; full=False iken yalnız
+    metni olup *_ts'si NULL olan satırlara bakar. Her parça ayrı commit edilir: yazma kilidi kısa
+    tutulur, WAL büyümez; yarıda kalırsa tekrar çalıştırmak kalanı doldurur. Ayrıştırılamayan
+    değerler NULL kalır ve her çalıştırmada yeniden denenir."""
+    cond = "" if full else f" AND ({_MISSING})"
+    last, n = 0, 0
+    while True:
+        row = conn.execute(f"SELECT MAX(id), COUNT(*) FROM (SELECT id FROM tasks WHERE id > ?{cond} ORDER BY id LIMIT ?)",
+                           (last, chunk)).fetchone()
+        if not row[1]: break
+        conn.execute(f"UPDATE tasks SET {_sets('')} WHERE id > ? AND id <= ?{cond}", (last, row[0]))
+        conn.commit()
+        last, n = row[0], n + row[1]
+    return n
+
+_conn = sqlite3.connect(":memory:", check_same_thread=False)
+_lock = threading.Lock()
+_EPOCH_SQL = "SELECT " + expr("v") + " FROM (SELECT ? AS v)"
+
+@lru_cache(maxsize=1024)
+def epoch(value) -> Optional[int]:
+    """Sorgu parametresini kolonlarla aynı kuralla epoch'a çevirir; ayrıştırılamazsa None."""
+    with _lock:
+        return _conn.execute(_EPOCH_SQL, (value,)).fetchone()[0]
+
+if __name__ == "__main__":
+    # python task_times.py  -> *_ts kolonlarını metin kolonlardan yeniden hesaplar
+    import db_pool
+    with db_pool.writer() as conn:
+        ensure(conn)
+        print({"rows": backfill(conn, full=True)})
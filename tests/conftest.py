@@ -0,0 +1,35 @@
+﻿import pytest
+from fastapi.testclient import TestClient
+import db_pool, migrations, task_cache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    notes TEXT DEFAULT '',
+    description TEXT,
+    tags  TEXT DEFAULT '',
+    done  INTEGER DEFAULT 0,
+    due   TEXT,
+    created_at TEXT DEFAULT (datetime('now')),
+    updated_at TEXT DEFAULT (datetime('now'))
+);
+"""
+
+@pytest.fixture
+def pool(tmp_path):
+    """Her test için ayrı bir DB; modül seviyesindeki havuz geçici dosyaya yönlendirilir."""
+    prev = db_pool.get_pool().path
+    p = db_pool.configure(tmp_path / "todo.db", readers=2)
+    with p.writer() as conn:
+        conn.executescript(SCHEMA)
+        migrations.migrate(conn)
+    task_cache.clear()  # id'ler testler arasında tekrar eder
+    yield p
+    db_pool.configure(prev)
+
+@pytest.fixture
+def api(pool):
+    """main.app istemcisi; main içe aktarılınca havuzdaki DB'de migrate çalışır, bu yüzden havuzdan sonra alınır."""
+    import main
+    return TestClient(main.app)
@@ -0,0 +1,38 @@
+﻿import time
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import bulk_router, bulk_alias_router
+
+@pytest.fixture
+def client(pool):
+    with pool.writer() as conn:
+        conn.executemany("INSERT INTO tasks(id, title) VALUES(?,?)", [(i, f"t{i}") for i in range(1, 10001)])
+    app = FastAPI()
+    app.include_router(bulk_router.router); app.include_router(bulk_alias_router.router)
+    return TestClient(app)
+
+def _row(pool, tid):
+    with pool.reader() as conn:
+        return dict(conn.execute("SELECT * FROM tasks WHERE id=?", (tid,)).fetchone())
+
+@pytest.mark.parametrize("path", ["/tasks/bulk", "/bulk"])
+def test_per_item_status(client, pool, path):
+    r = client.patch(path, json=[{"id": 1, "done": True, "notes": "n"}, {"id": 99999, "done": True},
+                                 {"id": 2, "tags": ["x"]}, {"id": 3}]).json()
+    assert (r["updated"], r["not_found"]) == (2, 1)
+    assert [i["status"] for i in r["items"]] == ["updated", "not_found", "updated", "unchanged"]
+    assert _row(pool, 1)["done"] == 1 and _row(pool, 1)["notes"] == "n"
+
+def test_repeated_id_keeps_request_order(client, pool):
+    client.patch("/tasks/bulk", json=[{"id": 5, "notes": "a"}, {"id": 5, "notes": "b", "done": True},
+                                      {"id": 5, "notes": "c"}])
+    assert _row(pool, 5)["notes"] == "c" and _row(pool, 5)["done"] == 1
+
+def test_ten_thousand_items_in_one_request(client, pool):
+    items = [{"id": i, "done": i % 2 == 0, **({"notes": "x"} if i % 3 else {})} for i in range(1, 10001)]
+    t0 = time.perf_counter()
+    r = client.patch("/tasks/bulk", json=items).json()
+    assert r["updated"] == 10000 and time.perf_counter() - t0 < 5
+    with pool.reader() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM tasks WHERE done=1").fetchone()[0] == 5000
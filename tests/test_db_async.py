@@ -0,0 +1,40 @@
+﻿import asyncio, threading
+import db_async
+
+def test_reads_and_writes_run_off_the_event_loop(pool):
+    async def go():
+        loop_thread = threading.get_ident()
+        def ins(conn, t):
+            assert threading.get_ident() != loop_thread
+            return conn.execute("INSERT INTO tasks(title) VALUES(?)", (t,)).lastrowid
+        ids = await asyncio.gather(*(db_async.write(ins, f"t{i}") for i in range(20)))
+        rows = await db_async.fetchall("SELECT id FROM tasks ORDER BY id")
+        one = await db_async.read(lambda conn: (threading.get_ident(), conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]))
+        return ids, [r[0] for r in rows], one, loop_thread
+    ids, rows, (tid, n), loop_thread = asyncio.run(go())
+    assert sorted(ids) == rows and n == 20 and tid != loop_thread
+
+def test_iterate_closes_abandoned_generator(pool):
+    closed = []
+    def gen():
+        try:
+            for i in range(10): yield i
+        finally:
+            closed.append(threading.get_ident())
+    async def go():
+        out = []
+        it = db_async.iterate(gen())
+        async for x in it:
+            out.append(x)
+            if x == 2: break
+        await it.aclose()
+        return out
+    assert asyncio.run(go()) == [0, 1, 2] and closed
+
+def test_unconsumed_stream_releases_its_connection(pool):
+    async def go():
+        body = await db_async.stream(lambda conn: iter(conn.execute("SELECT 1").fetchall()))
+        assert pool.stats()["stream"]["in_use"] == 1
+        await body.aclose()  # yanıt hiç başlamadan bırakıldı
+    asyncio.run(go())
+    assert pool.stats()["stream"]["in_use"] == 0
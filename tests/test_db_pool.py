@@ -0,0 +1,43 @@
+﻿import threading, sqlite3
+import pytest
+import db_pool
+
+def test_connections_are_configured(pool):
+    with pool.reader() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == db_pool.BUSY_TIMEOUT
+        assert conn.execute("PRAGMA cache_size").fetchone()[0] == -db_pool.CACHE_KB
+        assert isinstance(conn.execute("SELECT 1 AS x").fetchone(), sqlite3.Row)
+
+def test_connections_are_reused(pool):
+    with pool.reader() as a: pass
+    with pool.reader() as b: pass
+    assert a is b
+    st = pool.stats()["read"]
+    assert st["open"] == 1 and st["in_use"] == 0 and st["acquired"] == 2
+
+def test_writer_commits_and_rolls_back(pool):
+    with pool.writer() as conn:
+        conn.execute("INSERT INTO tasks(title) VALUES('a')")
+    with pytest.raises(RuntimeError):
+        with pool.writer() as conn:
+            conn.execute("INSERT INTO tasks(title) VALUES('b')")
+            raise RuntimeError("boom")
+    with pool.reader() as conn:
+        assert [r[0] for r in conn.execute("SELECT title FROM tasks")] == ["a"]
+
+def test_write_lane_serializes_and_reports_waits(pool):
+    entered = threading.Event(); release = threading.Event()
+    def hold():
+        with pool.writer():
+            entered.set(); release.wait(5)
+    t = threading.Thread(target=hold); t.start()
+    entered.wait(5)
+    assert pool.stats()["write"]["in_use"] == 1
+    threading.Timer(0.05, release.set).start()
+    with pool.writer() as conn:
+        conn.execute("SELECT 1")
+    t.join()
+    st = pool.stats()["write"]
+    assert st["size"] == 1 and st["waited"] == 1 and st["wait_seconds_max"] > 0
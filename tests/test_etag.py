@@ -0,0 +1,41 @@
+﻿import pytest
+
+@pytest.fixture
+def client(pool, api):
+    with pool.writer() as conn:
+        conn.executemany("INSERT INTO tasks(title) VALUES(?)", [(f"t{i}",) for i in range(5)])
+    return api
+
+def test_task_etag_revalidates(client):
+    r = client.get("/tasks/1"); tag = r.headers["etag"]
+    assert client.get("/tasks/1", headers={"If-None-Match": tag}).status_code == 304
+    assert client.get("/tasks/1", headers={"If-None-Match": f'"x", W/{tag}'}).status_code == 304
+    client.patch("/tasks/bulk", json=[{"id": 1, "notes": "changed"}])
+    r2 = client.get("/tasks/1", headers={"If-None-Match": tag})
+    assert r2.status_code == 200 and r2.headers["etag"] != tag
+
+def test_list_etag_skips_query_when_unchanged(client, pool):
+    r = client.get("/tasks", params={"done": "false", "limit": 3})
+    tag = r.headers["etag"]
+    # parametre sırası etiketi değiştirmez
+    assert client.get("/tasks?limit=3&done=false", headers={"If-None-Match": tag}).status_code == 304
+    assert client.get("/tasks", params={"limit": 4}, headers={"If-None-Match": tag}).status_code == 200
+    seen = []
+    conns = []
+    for _ in range(2):
+        c = pool.read.acquire(); conns.append(c); c.set_trace_callback(seen.append)
+    for c in conns: pool.read.release(c)
+    assert client.get("/tasks?limit=3&done=false", headers={"If-None-Match": tag}).status_code == 304
+    assert not [s for s in seen if "FROM tasks t" in s]
+    for c in conns: c.set_trace_callback(None)
+    client.patch("/tasks/bulk", json=[{"id": 2, "done": True}])
+    assert client.get("/tasks?limit=3&done=false", headers={"If-None-Match": tag}).status_code == 200
+
+@pytest.mark.parametrize("ua", ["yarın", 'a"b'])
+def test_task_etag_is_ascii_for_any_updated_at(client, pool, ua):
+    with pool.writer() as conn:
+        conn.execute("UPDATE tasks SET updated_at=? WHERE id=3", (ua,))
+    r = client.get("/tasks/3")
+    tag = r.headers["etag"]
+    assert r.status_code == 200 and tag.isascii() and tag.count('"') == 2
+    assert client.get("/tasks/3", headers={"If-None-Match": tag}).status_code == 304
@@ -0,0 +1,60 @@
+﻿import asyncio, csv, io, json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import export_router, db_async, db_pool
+from task_query import TaskQuery
+
+N = 1234
+
+@pytest.fixture
+def client(pool):
+    with pool.writer() as conn:
+        conn.executemany("INSERT INTO tasks(title,tags) VALUES(?,?)",
+                         [(f"task {i}", '["x"]') for i in range(N)])
+    app = FastAPI(); app.include_router(export_router.router)
+    return TestClient(app)
+
+def test_formats_stream_every_row(client):
+    js = client.get("/export").json()
+    assert len(js) == N and js[0]["title"] == f"task {N - 1}" and js[0]["tags"] == ["x"]
+    nd = client.get("/export", params={"format": "ndjson"})
+    assert nd.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(l)["id"] for l in nd.text.splitlines()] == [t["id"] for t in js]
+    rows = list(csv.DictReader(io.StringIO(client.get("/export", params={"format": "csv"}).text)))
+    assert len(rows) == N and rows[-1]["tags"] == '["x"]'
+
+def test_empty_export_is_valid(pool):
+    app = FastAPI(); app.include_router(export_router.router)
+    c = TestClient(app)
+    assert c.get("/export").json() == []
+    assert c.get("/export", params={"format": "csv"}).text.strip() == ",".join(export_router._CSV_COLS)
+
+def test_stream_reads_one_snapshot(client, pool):
+    with pool.streamer() as sconn:
+        chunks = export_router._stream_rows(sconn, TaskQuery(sort="id", order="asc"))
+        first = next(chunks)
+        with pool.writer() as conn:
+            conn.execute("INSERT INTO tasks(title) VALUES('late')")
+        rest = [r for rows in chunks for r in rows]
+    titles = [r["title"] for r in first + rest]
+    assert len(titles) == N and "late" not in titles
+
+def test_open_stream_leaves_read_lane_free(client, pool, monkeypatch):
+    # tek okuma bağlantısı, tek akış: yarıda bekleyen bir export okumaları durdurmaz
+    monkeypatch.setattr(db_pool, "ACQUIRE_TIMEOUT", 0.2)
+    p = db_pool.configure(pool.path, readers=1, streams=1)
+    rows = lambda conn: export_router._stream_rows(conn, TaskQuery())
+    async def go():
+        body = await db_async.stream(rows)
+        first = await body.__anext__()
+        n = (await db_async.fetchone("SELECT COUNT(*) FROM tasks"))[0]
+        with pytest.raises(db_pool.PoolTimeout):
+            await db_async.stream(rows)
+        await body.aclose()
+        again = await db_async.stream(rows)
+        await again.aclose()
+        return len(first), n
+    assert asyncio.run(go()) == (export_router._CHUNK, N)
+    st = p.stats()
+    assert st["stream"]["in_use"] == 0 and st["stream"]["timeouts"] == 1 and st["read"]["timeouts"] == 0
@@ -0,0 +1,15 @@
+﻿import json
+import fast_json
+
+def test_dumps_matches_stdlib_output():
+    obj = {"title": "Çalış ğüşİ", "tags": ["a", "b"], "done": False, "due": None, "n": 3, "x": 1.5}
+    assert fast_json.dumps(obj) == json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    assert fast_json.dumps({"blob": b"\xc3\xa7"}) == '{"blob":"ç"}'.encode("utf-8")
+
+def test_task_reads_send_utf8_bytes(pool, api):
+    with pool.writer() as conn:
+        conn.execute("INSERT INTO tasks(title, notes) VALUES('ılık şöğüç', NULL)")
+    for url in ("/tasks", "/tasks/1"):
+        r = api.get(url)
+        assert r.headers["content-type"] == "application/json; charset=utf-8"
+        assert "ılık şöğüç".encode("utf-8") in r.content
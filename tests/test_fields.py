@@ -0,0 +1,46 @@
+﻿import csv, io
+import pytest
+
+@pytest.fixture
+def client(pool, api):
+    with pool.writer() as conn:
+        conn.executemany("INSERT INTO tasks(title, notes, tags) VALUES(?,?,?)",
+                         [(f"t{i}", "uzun not " * 500, "a") for i in range(5)])
+    return api
+
+def _traced(pool, fn):
+    seen, conns = [], [pool.read.acquire() for _ in range(2)]
+    for c in conns: c.set_trace_callback(seen.append); pool.read.release(c)
+    try: fn()
+    finally:
+        for c in conns: c.set_trace_callback(None)
+    return [s for s in seen if "FROM tasks t" in s]
+
+def test_list_projects_requested_columns(client, pool):
+    out = {}
+    sql = _traced(pool, lambda: out.update(r=client.get("/tasks", params={"fields": "id,title,done", "sort": "title"})))
+    assert [set(t) for t in out["r"].json()] == [{"id", "title", "done"}] * 5
+    assert sql and all("notes" not in s and "t.*" not in s for s in sql)
+    # sıralama/cursor kolonu alan kümesinde olmasa da okunur
+    r = client.get("/tasks", params={"fields": "done", "sort": "title", "limit": 2})
+    assert r.json() == [{"done": False}] * 2 and r.headers["x-next-cursor"]
+
+def test_sparse_list_reads_only_the_covering_index(client, pool):
+    sql = _traced(pool, lambda: client.get("/tasks", params={"fields": "id,title,done"}))
+    with pool.reader() as conn:
+        plan = [p[3] for s in sql for p in conn.execute("EXPLAIN QUERY PLAN " + s)]
+    assert plan == ["SCAN t USING COVERING INDEX idx_tasks_id_title_done"]
+
+def test_single_task_fieldsets_are_separate_representations(client):
+    full = client.get("/tasks/1")
+    part = client.get("/tasks/1", params={"fields": "title, tags"})
+    assert part.json() == {"title": "t0", "tags": ["a"]} and part.headers["etag"] != full.headers["etag"]
+    assert client.get("/tasks/1").json() == full.json()
+    r = client.get("/tasks/1", params={"fields": "title,secret"})
+    assert r.status_code == 400 and "secret" in r.json()["detail"]
+
+def test_export_fields(client):
+    rows = list(csv.reader(io.StringIO(client.get("/export", params={"format": "csv", "fields": "title,id"}).text)))
+    assert rows[0] == ["id", "title"] and len(rows) == 6
+    assert set(client.get("/export", params={"fields": "id,tags"}).json()[0]) == {"id", "tags"}
+    assert client.get("/export", params={"fields": "nope"}).status_code == 400
@@ -0,0 +1,21 @@
+﻿import http_metrics
+
+def test_route_histograms_and_db_time(pool, api):
+    http_metrics.reset()
+    client = api  # main.app ara katmanı bağlı; Prometheus çıktısı /prom altında
+    with pool.writer() as conn:
+        conn.executemany("INSERT INTO tasks(title) VALUES(?)", [(f"t{i}",) for i in range(50)])
+    for tid in (1, 2, 999):
+        client.get(f"/tasks/{tid}")
+    client.get("/tasks", params={"limit": 50})
+    client.get("/nope")
+    body = client.get("/prom/metrics").text
+    assert 'todo_http_requests_total{method="GET",route="/tasks/{task_id}",status="200"} 2' in body
+    assert 'todo_http_requests_total{method="GET",route="/tasks/{task_id}",status="404"} 1' in body
+    assert 'todo_http_requests_total{method="GET",route="unmatched",status="404"} 1' in body
+    assert 'todo_http_request_duration_seconds_count{method="GET",route="/tasks"} 1' in body
+    assert 'todo_http_requests_in_flight{method="GET"} 1' in body   # /prom/metrics isteğinin kendisi
+    db = [l for l in body.splitlines() if l.startswith('todo_http_request_db_seconds_sum{method="GET",route="/tasks"}')]
+    assert db and float(db[0].split()[-1]) > 0
+    size = [l for l in body.splitlines() if l.startswith('todo_http_response_size_bytes_sum{method="GET",route="/tasks"}')]
+    assert float(size[0].split()[-1]) > 1000
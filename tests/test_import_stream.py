@@ -0,0 +1,91 @@
+﻿import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import import_router
+
+@pytest.fixture
+def client(pool):
+    app = FastAPI(); app.include_router(import_router.router)
+    return TestClient(app)
+
+def _pieces(data: bytes, n: int = 7):
+    return iter([data[i:i + n] for i in range(0, len(data), n)])
+
+def _titles(pool):
+    with pool.reader() as conn:
+        return [r[0] for r in conn.execute("SELECT title FROM tasks ORDER BY id")]
+
+def test_json_array_is_parsed_incrementally_and_committed_in_batches(client, pool):
+    body = json.dumps([{"title": f"çay {i}", "tags": ["a"], "done": i % 2} for i in range(25)]).encode()
+    r = client.post("/import", params={"batch": 10}, content=_pieces(body),
+                    headers={"content-type": "application/json"})
+    assert r.json() == {"ok": True, "processed": 25, "inserted": 25, "updated": 0,
+                        "replaced": 0, "ignored": 0, "batches": 3}
+    assert _titles(pool)[-1] == "çay 24"
+    prog = client.get("/import/progress").json()["imports"][-1]
+    assert prog["batches"] == 3 and prog["processed"] == 25 and prog["finished"]
+
+@pytest.mark.parametrize("body", [
+    b'{"title":"a"}\n{"title":"b"}\n',   # NDJSON
+    b'  {"title":"a"}{"title":"b"}',     # bitişik nesneler
+])
+def test_ndjson_and_concatenated_objects(client, pool, body):
+    r = client.post("/import", content=_pieces(body, 3), headers={"content-type": "application/json"})
+    assert r.json()["inserted"] == 2 and _titles(pool) == ["a", "b"]
+
+def test_csv_with_quoted_newline(client, pool):
+    body = '﻿id,title,notes\r\n5,"çok ""iyi""","line1\nline2"\r\n6,second,\r\n'.encode()
+    r = client.post("/import", content=_pieces(body, 5), headers={"content-type": "text/csv"})
+    assert r.json()["inserted"] == 2
+    with pool.reader() as conn:
+        assert tuple(conn.execute("SELECT title, notes FROM tasks WHERE id=5").fetchone()) == ('çok "iyi"', "line1\nline2")
+
+def test_multipart_upload(client, pool):
+    pytest.importorskip("multipart")
+    files = {"file": ("tasks.csv", b"title\nx\ny\n", "text/csv")}
+    assert client.post("/import", files=files).json()["inserted"] == 2
+
+def test_error_reports_already_committed_batches(client, pool):
+    body = json.dumps([{"title": "ok1"}, {"title": "ok2"}, {"notes": "no title"}]).encode()
+    r = client.post("/import", params={"batch": 2}, content=body, headers={"content-type": "application/json"})
+    assert r.status_code == 400 and "first 2 rows" in r.json()["detail"]
+    assert _titles(pool) == ["ok1", "ok2"]
+    assert client.post("/import", content=b"[{", headers={"content-type": "application/json"}).status_code == 400
+
+def _post(client, rows, mode, batch=1000):
+    return client.post("/import", params={"mode": mode, "batch": batch}, content=json.dumps(rows).encode(),
+                       headers={"content-type": "application/json"}).json()
+
+def test_set_based_modes_report_exact_counts(client, pool):
+    _post(client, [{"id": 1, "title": "a", "tags": "x"}, {"id": 2, "title": "b"}], "insert")
+    r = _post(client, [{"id": 2, "title": "dup"}, {"id": 3, "title": "c"}], "insert")
+    assert (r["inserted"], r["ignored"]) == (1, 1)
+    r = _post(client, [{"id": 1, "notes": "n"}, {"id": 99, "title": "yok"}, {"title": "id'siz"}], "update")
+    assert (r["updated"], r["ignored"]) == (1, 2)
+    r = _post(client, [{"id": 3, "title": "c2"}], "replace")
+    assert r["replaced"] == 1
+    # upsert: mevcut, yeni açık id, id'siz (autoinc) ve aynı partide o autoinc id'ye tekrar yazma
+    r = _post(client, [{"id": 1, "done": True}, {"id": 10, "title": "on", "tags": ["y"]},
+                       {"title": "auto"}, {"id": 11, "notes": "x"}, {"id": 10, "title": "on2"}], "upsert", batch=2)
+    assert (r["inserted"], r["updated"], r["batches"]) == (2, 3, 3)
+    with pool.reader() as conn:
+        rows = {x["id"]: dict(x) for x in conn.execute("SELECT * FROM tasks")}
+        tags = conn.execute("SELECT task_id, tag FROM task_tags ORDER BY task_id").fetchall()
+    assert rows[1]["title"] == "a" and rows[1]["notes"] == "n" and rows[1]["done"] == 1
+    assert rows[10]["title"] == "on2" and rows[11]["title"] == "auto" and rows[11]["notes"] == "x"
+    assert [tuple(t) for t in tags] == [(1, "x"), (10, "y")]
+
+def test_upsert_new_id_without_title_is_rejected(client, pool):
+    r = client.post("/import", content=b'[{"id": 7, "notes": "x"}]', headers={"content-type": "application/json"})
+    assert r.status_code == 400 and "title" in r.json()["detail"]
+
+@pytest.mark.parametrize("mode", ["upsert", "insert"])
+@pytest.mark.parametrize("bad", ["abc", -4, 0, 1.5, True])
+def test_bad_ids_are_rejected_with_their_row(client, pool, mode, bad):
+    body = json.dumps([{"title": "a"}, {"title": "b"}, {"id": bad, "title": "c"}, {"title": "d"}]).encode()
+    r = client.post("/import", params={"mode": mode, "batch": 2}, content=body,
+                    headers={"content-type": "application/json"})
+    assert r.status_code == 400 and r.json()["detail"].startswith("Row 3: 'id'")
+    with pool.reader() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0] == 2
@@ -0,0 +1,32 @@
+﻿from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import admin_router, index_advisor
+
+def _by_name(res):
+    return {q["name"]: q for q in res["queries"]}
+
+def test_access_patterns_use_indexes(pool):
+    app = FastAPI(); app.include_router(admin_router.router)
+    res = TestClient(app).get("/admin/indexes/advice").json()
+    q = _by_name(res)
+    assert q["main.list done fields=id,title,done"]["covering"] and q["main.list fields=id,title,done"]["covering"]
+    assert q["main.list done"]["indexes"] == ["idx_tasks_done_id_title"]
+    assert q["metrics.overdue"]["covering"] and q["metrics.recent_done_24h"]["covering"]
+    assert q["main.list sort=title"]["indexes"] == ["idx_tasks_title"]
+    # LIMIT'li id sıralı tarama ilk sayfada durur; filtresiz export zaten tüm tabloyu okur
+    assert not q["main.list"]["flagged"] and not q["export"]["flagged"]
+    # zaman sıralamaları ve due aralıklı export da indeksli; hiçbir kanonik sorgu işaretlenmez
+    assert q["main.list sort=due due_before"]["indexes"] == ["idx_tasks_due_sort_desc"]
+    assert q["export due_after"]["indexes"] == ["idx_tasks_due_ts"]
+    assert res["ok"], res["flagged"]
+
+def test_missing_index_is_flagged(pool):
+    with pool.writer() as conn:
+        conn.execute("DROP INDEX idx_tasks_done_id_title")
+        conn.execute("DROP INDEX idx_tasks_done_due_ts")
+        conn.execute("DROP INDEX idx_tasks_done_updated_ts")
+        conn.execute("DROP INDEX idx_tasks_created_sort")
+    with pool.reader() as conn:
+        res = index_advisor.advise(conn)
+    assert {"metrics.recent_done_24h", "main.list sort=created_at"} <= set(res["flagged"])
+    assert not res["ok"]
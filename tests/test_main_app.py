@@ -0,0 +1,84 @@
+﻿import json
+import pytest
+from fastapi.testclient import TestClient
+import db_pool, task_tags
+
+@pytest.fixture
+def client(pool):
+    # main içe aktarılınca havuzdaki (geçici) DB'de migrate çalışır; fixture'dan sonra alınmalı
+    import main
+    return TestClient(main.app)
+
+def test_pool_timeout_is_503(client, pool, monkeypatch):
+    monkeypatch.setattr(db_pool, "ACQUIRE_TIMEOUT", 0.05)
+    p = db_pool.configure(pool.path, readers=1)
+    held = p.read.acquire()
+    try:
+        r = client.get("/tasks")
+    finally:
+        p.read.release(held)
+    assert r.status_code == 503 and r.headers["Retry-After"] == "1"
+    assert client.get("/tasks").status_code == 200
+
+def test_list_uses_the_shared_filter_compiler(client, pool):
+    with pool.writer() as conn:
+        conn.executemany("INSERT INTO tasks(title, tags, due) VALUES(?,?,?)",
+                         [("a", "iş ev", "2025-03-01"), ("b", "iş", "2025-03-02"), ("c", "ev", None)])
+        task_tags.sync(conn, [1, 2, 3])
+    titles = lambda r: [t["title"] for t in r.json()]
+    # export ile aynı anlam: çoklu tag kesişimi, kapsayıcı due sınırı
+    assert titles(client.get("/tasks", params={"tag": ["iş", "ev"]})) == ["a"]
+    assert titles(client.get("/tasks", params={"due_before": "2025-03-01"})) == ["a"]
+    r = client.get("/tasks", params={"sort": "due", "order": "asc", "limit": 2, "count": "true"})
+    assert titles(r) == ["a", "b"] and r.headers["X-Total-Count"] == "3"
+    r = client.get("/tasks", params={"sort": "due", "order": "asc", "cursor": r.headers["X-Next-Cursor"]})
+    assert titles(r) == ["c"] and r.json()[0]["tags"] == ["ev"]
+    assert client.get("/tasks", params={"due_after": "2025"}).status_code == 422
+    # scripts/smoke_e2e.ps1 sözleşmesi: limit en çok 200
+    assert client.get("/tasks", params={"limit": 200}).status_code == 200
+    assert client.get("/tasks", params={"limit": 500}).status_code == 422
+
+def test_slow_query_admin_is_opt_in(client, monkeypatch):
+    monkeypatch.delenv("TODO_API_ENABLE_ADMIN", raising=False)
+    assert client.get("/admin/sql/slow").status_code == 404
+    monkeypatch.setenv("TODO_API_ENABLE_ADMIN", "1")
+    assert "queries" in client.get("/admin/sql/slow").json()
+    assert client.post("/admin/sql/profile", params={"threshold_ms": 5}).json()["settings"]["threshold_ms"] == 5
+
+def test_bulk_routes_are_not_shadowed_by_task_id(client, pool):
+    with pool.writer() as conn:
+        conn.executemany("INSERT INTO tasks(title) VALUES(?)", [("a",), ("b",)])
+    assert client.patch("/tasks/bulk", json=[{"id": 1, "done": True}]).status_code == 200
+    assert client.patch("/bulk", json=[{"id": 2, "done": True}]).status_code == 200
+    assert client.patch("/tasks/1", json={"title": "a2"}).json() == {"ok": True}
+    assert client.get("/tasks/1").json()["title"] == "a2"
+    assert client.get("/metrics").json()["done"] == 2
+
+def test_export_streams_from_main_app(client, pool):
+    with pool.writer() as conn:
+        conn.executemany("INSERT INTO tasks(title, due) VALUES(?, ?)", [("a", "2025-01-01"), ("b", None)])
+    assert [t["title"] for t in client.get("/export").json()] == ["b", "a"]
+    r = client.get("/export", params={"format": "ndjson", "due_before": "2025-02-01"})
+    assert [json.loads(l)["title"] for l in r.text.splitlines()] == ["a"]
+
+def test_import_reaches_main_app(client, pool):
+    r = client.post("/import", content='{"id": 3, "title": "c", "due": "2025-01-01"}\n',
+                    headers={"content-type": "application/x-ndjson"})
+    assert r.json()["inserted"] == 1 and client.get("/import/progress").json()["imports"]
+    assert client.get("/tasks/3").json()["title"] == "c"
+
+def test_prometheus_output_does_not_replace_json_metrics(client, pool):
+    with pool.writer() as conn:
+        conn.executemany("INSERT INTO tasks(title, done) VALUES(?, ?)", [("a", 1), ("b", 0)])
+    assert client.get("/metrics").json()["done"] == 1
+    assert "todo_tasks_total_current 2" in client.get("/prom/metrics").text
+
+
+def test_route_labels_drop_path_convertors(client, pool):
+    # /tasks/{task_id:int} etiketi dönüştürücüsüz kalır; panolar eski seri adını görür
+    with pool.writer() as conn:
+        conn.execute("INSERT INTO tasks(title) VALUES('a')")
+    assert client.get("/tasks/1").status_code == 200
+    text = client.get("/prom/metrics").text
+    assert 'route="/tasks/{task_id}"' in text
+    assert "task_id:int" not in text
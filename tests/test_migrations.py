@@ -0,0 +1,35 @@
+﻿import sqlite3
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import db_pool, migrations, bulk_router, fields_router, import_router
+
+def test_legacy_maiq_shape_is_migrated_once(tmp_path):
+    conn = sqlite3.connect(tmp_path / "old.db")
+    conn.executescript("""
+        CREATE TABLE tasks(id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL,
+                           description TEXT DEFAULT '', done INTEGER DEFAULT 0, completed INTEGER,
+                           tags TEXT DEFAULT '[]', due TEXT, created_at TEXT DEFAULT (datetime('now')));
+        INSERT INTO tasks(title, tags, completed) VALUES ('eski', '["a"]', 1);
+    """)
+    assert migrations.migrate(conn) == migrations.VERSION == migrations.version(conn)
+    assert {"notes", "updated_at"} <= migrations.columns(conn)
+    row = conn.execute("SELECT done, updated_at, created_at FROM tasks").fetchone()
+    assert row[0] == 1 and row[1] == row[2]
+    assert conn.execute("SELECT tag FROM task_tags").fetchall() == [("a",)]
+    assert migrations.migrate(conn) == migrations.VERSION
+
+def test_write_paths_do_not_introspect_schema(pool):
+    app = FastAPI()
+    for m in (bulk_router, fields_router, import_router):
+        app.include_router(m.router)
+    client = TestClient(app)
+    seen = []
+    with pool.writer() as conn:
+        conn.set_trace_callback(seen.append)
+    client.post("/import", json=[{"id": 1, "title": "a"}])
+    client.patch("/tasks/bulk", json=[{"id": 1, "done": True}])
+    client.patch("/tasks/1/fields", json={"notes": "x"})
+    with pool.writer() as conn:
+        conn.set_trace_callback(None)
+    assert any("UPDATE tasks" in s for s in seen)
+    assert not [s for s in seen if "table_info" in s or "ALTER" in s or "CREATE" in s]
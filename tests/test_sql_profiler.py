@@ -0,0 +1,26 @@
+﻿import pytest
+import sql_profiler
+
+@pytest.fixture
+def client(pool, api, monkeypatch):
+    saved = dict(sql_profiler.settings)
+    sql_profiler.clear()
+    monkeypatch.setenv("TODO_API_ENABLE_ADMIN", "1")  # /admin/* main.app'te isteğe bağlı
+    with pool.writer() as conn:
+        conn.executemany("INSERT INTO tasks(title, due) VALUES(?, ?)", [(f"t{i}", f"2025-01-{i % 28 + 1:02d}") for i in range(300)])
+    yield api
+    sql_profiler.settings.update(saved)
+
+def test_off_by_default_adds_nothing(client):
+    sql_profiler.settings.update(enabled=False, debug_header=False)
+    r = client.get("/tasks")
+    assert "x-sql-profile" not in r.headers and client.get("/admin/sql/slow").json()["queries"] == []
+
+def test_slow_statements_are_recorded_with_plan(client):
+    client.post("/admin/sql/profile", params={"enabled": True, "threshold_ms": 0, "debug_header": True})
+    r = client.get("/tasks", params={"due_before": "2025-01-05", "limit": 200})
+    assert r.status_code == 200 and "statements=" in r.headers["x-sql-profile"]
+    q = [x for x in client.get("/admin/sql/slow").json()["queries"] if x["route"] == "/tasks"]
+    sel = next(x for x in q if "FROM tasks t" in x["sql"])
+    assert sel["rows"] == len(r.json()) and sel["plan"] and "1736035200" in sel["expanded"]  # due_before epoch olarak bağlanır
+    assert client.delete("/admin/sql/slow").json()["ok"]
@@ -0,0 +1,57 @@
+﻿import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import task_cache, write_queue, bulk_router, fields_router, import_router, metrics_router
+
+@pytest.fixture
+def client(pool):
+    with pool.writer() as conn:
+        conn.executemany("INSERT INTO tasks(title) VALUES(?)", [(f"t{i}",) for i in range(5)])
+    app = FastAPI()
+    for m in (bulk_router, fields_router, import_router, metrics_router):
+        app.include_router(m.router)
+    return TestClient(app)
+
+def test_hits_skip_db_and_writes_invalidate(client, api, pool):
+    before = task_cache.stats()
+    r1 = api.get("/tasks/1")
+    with pool.writer() as conn:  # kuyruk dışı yazma önbelleği düşürmez: isabet eski gövdeyi döner
+        conn.execute("UPDATE tasks SET title='direct' WHERE id=1")
+    r2 = api.get("/tasks/1")
+    assert r2.content == r1.content and r2.headers["etag"] == r1.headers["etag"]
+    client.patch("/tasks/bulk", json=[{"id": 1, "notes": "n"}])
+    assert api.get("/tasks/1").json()["title"] == "direct"
+    client.patch("/tasks/1/fields", json={"notes": "f"})
+    assert api.get("/tasks/1").json()["notes"] == "f"
+    client.post("/import?mode=update", content=json.dumps([{"id": 1, "title": "imp"}]),
+                headers={"content-type": "application/json"})
+    assert api.get("/tasks/1").json()["title"] == "imp"
+    after = task_cache.stats()
+    assert after["hits"] - before["hits"] == 1 and after["invalidations"] - before["invalidations"] == 3
+    m = client.get("/metrics").text
+    assert f"todo_task_cache_hits_total {after['hits']}" in m
+
+def test_rolled_back_write_keeps_entry_and_stale_read_is_rejected(client, api):
+    api.get("/tasks/2")
+    inv = task_cache.stats()["invalidations"]
+    def fail(conn):
+        task_cache.invalidate_on_commit([2])
+        raise ValueError("boom")
+    with pytest.raises(ValueError):
+        write_queue.run(fail)
+    assert task_cache.stats()["invalidations"] == inv
+    token = task_cache.begin()
+    task_cache.invalidate([3])  # okuma sürerken commit edilen yazma
+    assert task_cache.put("main", 3, '"x"', b"{}", token) is False
+
+def test_lru_eviction(monkeypatch):
+    monkeypatch.setattr(task_cache, "SIZE", 2)
+    task_cache.clear()
+    ev = task_cache.stats()["evictions"]
+    for i in (1, 2, 3):
+        task_cache.put("t", i, '"e"', b"{}", task_cache.begin())
+        if i == 2: task_cache.get("t", 1)  # 1 en son kullanılan olur, 2 atılır
+    assert task_cache.get("t", 2) is None and task_cache.get("t", 1) is not None
+    assert task_cache.stats()["evictions"] - ev == 1
+    task_cache.clear()
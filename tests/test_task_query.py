@@ -0,0 +1,109 @@
+﻿import base64, json
+import pytest
+import task_tags
+from task_query import TaskQuery
+
+ROWS = [
+    ("Kırmızı elma", "", '["a","b"]', 0, "2025-01-02"),
+    ("Şeftali", "çok güzel", '{"prio":"high"}', 0, None),
+    ("third", "", "a c", 1, "2025-03-01"),
+    ("fourth", "", "", 0, "2024-12-31"),
+]
+
+@pytest.fixture
+def client(pool, api):
+    with pool.writer() as conn:
+        conn.executemany("INSERT INTO tasks(title,notes,tags,done,due) VALUES(?,?,?,?,?)", ROWS)
+        task_tags.sync(conn, range(1, len(ROWS) + 1))
+    return api
+
+def _titles(r):
+    return [t["title"] for t in r.json()]
+
+def test_limit_is_applied_in_sql():
+    sql, params = TaskQuery(done=False, sort="title", order="asc").select(limit=10, offset=20)
+    assert "LIMIT ? OFFSET ?" in sql and "ORDER BY t.title ASC, t.id ASC" in sql
+    assert params == [0, 10, 20]
+
+def test_list_filters_sort_and_paginate(client):
+    assert _titles(client.get("/tasks", params={"q": "KIRMIZI"})) == ["Kırmızı elma"]
+    assert _titles(client.get("/tasks", params={"q": "cok"})) == ["Şeftali"]
+    assert _titles(client.get("/tasks", params=[("tag", "a"), ("tag", "b")])) == ["Kırmızı elma"]
+    assert _titles(client.get("/tasks", params={"tag": "a"})) == ["third", "Kırmızı elma"]
+    assert _titles(client.get("/tasks", params={"tag": "prio:high"})) == ["Şeftali"]
+    assert _titles(client.get("/tasks", params={"sort": "due", "order": "asc"})) == \
+        ["fourth", "Kırmızı elma", "third", "Şeftali"]
+    assert _titles(client.get("/tasks", params={"sort": "due", "order": "desc"})) == \
+        ["third", "Kırmızı elma", "fourth", "Şeftali"]
+    r = client.get("/tasks", params={"done": False, "limit": 1, "offset": 1, "count": True})
+    assert _titles(r) == ["Şeftali"] and r.headers["X-Total-Count"] == "3"
+
+def test_export_uses_same_filters(client):
+    params = {"tag": "a", "sort": "title", "order": "asc"}
+    listed = _titles(client.get("/tasks", params=params))
+    exported = [t["title"] for t in client.get("/export", params=params).json()]
+    assert listed == exported == ["Kırmızı elma", "third"]
+
+@pytest.mark.parametrize("sort", ["id", "title", "due", "created_at", "updated_at"])
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_cursor_walk_matches_offset_walk(client, sort, order):
+    full = _titles(client.get("/tasks", params={"sort": sort, "order": order}))
+    seen, cursor = [], None
+    while True:
+        params = {"sort": sort, "order": order, "limit": 1}
+        if cursor: params["cursor"] = cursor
+        r = client.get("/tasks", params=params)
+        seen += _titles(r)
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor: break
+    assert seen == full
+
+@pytest.mark.parametrize("sort", ["due", "created_at", "updated_at"])
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_time_sort_pages_seek_an_index(client, pool, sort, order):
+    # cursor sayfası tam tarama + geçici sıralama değil, sıralama indeksinde aralık araması
+    r = client.get("/tasks", params={"sort": sort, "order": order, "limit": 1, "fields": "title"})
+    sql, params = TaskQuery(sort=sort, order=order, cursor=r.headers["X-Next-Cursor"]).select(limit=50)
+    with pool.reader() as conn:
+        plan = [p[3] for p in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+    assert plan[0].startswith("SEARCH t USING INDEX idx_tasks_") and not any("TEMP B-TREE" in p for p in plan)
+
+def test_cursor_rejects_mismatched_sort(client):
+    cursor = client.get("/tasks", params={"limit": 1}).headers["X-Next-Cursor"]
+    assert client.get("/tasks", params={"cursor": cursor, "sort": "title"}).status_code == 400
+    assert client.get("/tasks", params={"cursor": "garbage"}).status_code == 400
+    r = client.get("/export", params={"cursor": cursor, "limit": 2})
+    assert [t["title"] for t in r.json()] == ["third", "Şeftali"]
+
+@pytest.mark.parametrize("values", [[{"a": 1}, 3], ["x", [1]], [None, {}]])
+def test_cursor_rejects_non_scalar_values(client, values):
+    raw = json.dumps(["title", "asc", *values]).encode("utf-8")
+    cursor = base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+    r = client.get("/tasks", params={"cursor": cursor, "sort": "title", "order": "asc"})
+    assert r.status_code == 400
+    assert client.get("/export", params={"cursor": cursor, "sort": "title", "order": "asc", "limit": 2}).status_code == 400
+
+def test_q_uses_fts_prefix_match(client, pool):
+    with pool.reader() as conn:
+        sql, params = TaskQuery(q="kırm").select(fts=True)
+        assert "tasks_fts MATCH" in sql and params == ['"kirm"*']
+        assert [r["title"] for r in conn.execute(sql, params)] == ["Kırmızı elma"]
+        sql, params = TaskQuery(q="kırm").select(fts=False)
+        assert [r["title"] for r in conn.execute(sql, params)] == ["Kırmızı elma"]
+    with pool.writer() as conn:
+        conn.execute("UPDATE tasks SET title='Işık' WHERE title='fourth'")
+    assert _titles(client.get("/tasks", params={"q": "isi"})) == ["Işık"]
+    assert _titles(client.get("/tasks", params={"q": "fourth"})) == []
+
+def test_legacy_fts_triggers_are_replaced(tmp_path):
+    import sqlite3, fts_util
+    conn = sqlite3.connect(tmp_path / "legacy.db")
+    conn.execute("CREATE TABLE tasks(id INTEGER PRIMARY KEY, title TEXT, notes TEXT, description TEXT)")
+    conn.execute("INSERT INTO tasks(title) VALUES('kırmızı')")
+    conn.execute("CREATE VIRTUAL TABLE tasks_fts USING fts5(title, notes, description, content='tasks', content_rowid='id', tokenize='unicode61 remove_diacritics 2')")
+    conn.execute("CREATE TRIGGER tasks_ai AFTER INSERT ON tasks BEGIN SELECT 1; END")
+    assert fts_util.ensure_fts(conn)
+    names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='trigger'")}
+    assert "tasks_ai" not in names and "tasks_fts_ai" in names
+    assert conn.execute("SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH '\"kirmizi\"'").fetchall() == [(1,)]
+    conn.close()
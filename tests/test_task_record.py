@@ -0,0 +1,29 @@
+﻿import sqlite3
+import task_record, fast_json
+
+def _rows(cols="id,title,notes,description,tags,done,due,created_at,updated_at"):
+    conn = sqlite3.connect(":memory:"); conn.row_factory = sqlite3.Row
+    conn.execute("CREATE TABLE tasks(id INTEGER PRIMARY KEY, title TEXT, notes TEXT, description TEXT, "
+                 "tags TEXT, done INTEGER, due TEXT, created_at TEXT, updated_at TEXT)")
+    conn.executemany("INSERT INTO tasks(id,title,notes,tags,done) VALUES(?,?,?,?,?)",
+                     [(1, "a", None, '{"p":"h","x":null}', 1), (2, "b", "n", "x y", 0), (3, "c", "", None, 0)])
+    return conn.execute(f"SELECT {cols} FROM tasks ORDER BY id").fetchall()
+
+def test_shapes():
+    r1, r2, r3 = _rows()
+    assert task_record.to_dict(r1, "main") == {
+        "id": 1, "title": "a", "notes": "", "tags": ['{"p":"h","x":null}'], "done": True,
+        "due": None, "created_at": "", "updated_at": ""}
+    assert task_record.to_dict(r2, "main")["tags"] == ["x", "y"]
+    assert "description" not in task_record.to_dict(r2, "main")
+    raw = task_record.to_dict(r1, "raw")
+    assert raw["tags"] == {"p": "h", "x": None} and raw["done"] is True and raw["notes"] is None
+    assert task_record.to_dict(r3, "raw")["tags"] == {}
+
+def test_records_follow_column_order_and_encode_directly():
+    rows = _rows("tags,id,title,done")  # farklı kolon sırası ayrı eşleyici derler
+    recs = task_record.records(rows, "main")
+    assert recs[0]["id"] == 1 and recs[1].tags == ["x", "y"]
+    assert recs[0].to_dict()["notes"] == ""  # eksik kolon None gibi davranır
+    assert fast_json.dumps(recs) == fast_json.dumps([r.to_dict() for r in recs])
+    assert task_record.records([], "main") == []
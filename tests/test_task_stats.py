@@ -0,0 +1,35 @@
+﻿import json
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import task_stats, bulk_router, import_router, metrics_router
+
+def _fresh(conn):
+    total, done = conn.execute("SELECT COUNT(*), COUNT(*) FILTER (WHERE done IS 1) FROM tasks").fetchone()
+    tags = conn.execute("""SELECT tt.tag, COUNT(*), SUM(t.done IS 0) FROM task_tags tt
+                           JOIN tasks t ON t.id=tt.task_id GROUP BY tt.tag ORDER BY tt.tag""").fetchall()
+    return (total, done), [tuple(r) for r in tags]
+
+def test_triggers_track_every_write_path(pool):
+    app = FastAPI()
+    for m in (bulk_router, import_router, metrics_router):
+        app.include_router(m.router)
+    client = TestClient(app)
+    def post(rows, mode):
+        client.post("/import", params={"mode": mode}, content=json.dumps(rows), headers={"content-type": "application/json"})
+    post([{"id": i, "title": f"t{i}", "tags": ["a", f"k{i % 3}"], "done": i % 4 == 0} for i in range(1, 41)], "insert")
+    post([{"id": 5, "title": "r", "tags": "b", "done": True}, {"id": 6, "title": "r2"}], "replace")
+    post([{"id": 7, "tags": {"prio": "high"}}, {"id": 99, "title": "new", "tags": ["a"]}], "upsert")
+    client.patch("/tasks/bulk", json=[{"id": i, "done": i % 2 == 0} for i in range(1, 30)]
+                                     + [{"id": 8, "tags": ["b", "c"], "done": False}])
+    with pool.writer() as conn:
+        conn.execute("DELETE FROM tasks WHERE id IN (1, 2, 3)")
+        conn.execute("UPDATE tasks SET done=NULL WHERE id=10")
+    with pool.reader() as conn:
+        expected = _fresh(conn)
+        assert (task_stats.counts(conn), [r for r in task_stats.tag_counts(conn) if r[1]]) == expected
+    with pool.writer() as conn:
+        task_stats.rebuild(conn)
+    with pool.reader() as conn:
+        assert (task_stats.counts(conn), task_stats.tag_counts(conn)) == expected
+    body = client.get("/metrics").text
+    assert 'todo_tasks_by_tag_current{tag="a"} ' in body and f"todo_tasks_total_current {expected[0][0]} " in body
@@ -0,0 +1,44 @@
+﻿import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import task_tags, bulk_router, bulk_alias_router, fields_router, import_router, metrics_router
+
+@pytest.fixture
+def client(pool):
+    app = FastAPI()
+    for m in (bulk_router, bulk_alias_router, import_router, fields_router, metrics_router):
+        app.include_router(m.router)
+    return TestClient(app)
+
+def _tags(pool, tid):
+    with pool.reader() as conn:
+        return sorted(r[0] for r in conn.execute("SELECT tag FROM task_tags WHERE task_id=?", (tid,)))
+
+def test_existing_tags_are_migrated(tmp_path):
+    import sqlite3
+    conn = sqlite3.connect(tmp_path / "old.db")
+    conn.execute("CREATE TABLE tasks(id INTEGER PRIMARY KEY, title TEXT, tags TEXT, done INTEGER)")
+    conn.executemany("INSERT INTO tasks(title,tags) VALUES(?,?)",
+                     [("a", "x y"), ("b", '["x","z"]'), ("c", '{"prio":"high"}'), ("d", "")])
+    assert task_tags.ensure(conn) is True
+    assert task_tags.ensure(conn) is False
+    rows = sorted(conn.execute("SELECT task_id, tag FROM task_tags"))
+    assert rows == [(1, "x"), (1, "y"), (2, "x"), (2, "z"), (3, "prio"), (3, "prio:high")]
+    conn.execute("DELETE FROM tasks WHERE id=1")
+    assert conn.execute("SELECT COUNT(*) FROM task_tags WHERE task_id=1").fetchone()[0] == 0
+
+def test_write_paths_keep_index_in_sync(client, api, pool):
+    body = [{"title": "one", "tags": ["a", "b"]}, {"id": 50, "title": "two", "tags": "a,c"}]
+    client.post("/import", content=json.dumps(body), headers={"content-type": "application/json"})
+    assert _tags(pool, 1) == ["a", "b"] and _tags(pool, 50) == ["a", "c"]
+    client.patch("/tasks/bulk", json=[{"id": 1, "tags": ["d"]}])
+    assert _tags(pool, 1) == ["d"]
+    client.patch("/bulk", json=[{"id": 50, "tags": ["e"]}])
+    assert _tags(pool, 50) == ["e"]
+    client.patch("/tasks/50/fields", json={"tags": {"k": "v"}})
+    assert _tags(pool, 50) == ["k", "k:v"]
+    assert [t["id"] for t in api.get("/tasks", params={"tag": "k:v"}).json()] == [50]
+    m = client.get("/metrics").text
+    assert 'todo_tasks_by_tag_current{tag="d"} 1' in m
+    assert 'todo_tasks_open_by_tag_current{tag="k"} 1' in m
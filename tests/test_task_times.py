@@ -0,0 +1,96 @@
+﻿import sqlite3
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import migrations, task_times, task_stats
+
+# aynı an, farklı yazım biçimleri; metin karşılaştırmasında "2025-03-01T09:00" > "2025-03-01 10:00"
+DUES = [("space", "2025-03-01 10:00:00"), ("iso", "2025-03-01T09:00:00"), ("slash", "2025/03/01 08:00"),
+        ("offset", "2025-03-01T12:00:00+03:00"), ("epoch", "1740819600"), ("late", "2025-03-02"),
+        ("empty", ""), ("bad", "yarın")]
+
+def test_due_range_across_formats(pool, api):
+    with pool.writer() as conn:
+        conn.executemany("INSERT INTO tasks(title, due) VALUES(?, ?)", DUES)
+    c = api
+    r = c.get("/tasks", params={"due_before": "2025-03-01 10:00", "sort": "id", "order": "asc"})
+    assert [t["title"] for t in r.json()] == ["space", "iso", "slash", "offset", "epoch"]
+    r = c.get("/tasks", params={"due_after": "2025-03-01T10:00:01"})
+    assert [t["title"] for t in r.json()] == ["late"]
+    # gölge kolonlar dışarı sızmaz
+    assert "due_ts" not in c.get("/export").json()[0]
+
+def test_triggers_follow_updates(pool):
+    with pool.writer() as conn:
+        conn.execute("INSERT INTO tasks(title, due) VALUES('a', '2025-01-01')")
+        conn.execute("UPDATE tasks SET due='2025-01-02T00:00:00Z', updated_at='2025-01-03 00:00:00' WHERE id=1")
+        row = conn.execute("SELECT due_ts, updated_ts, created_ts FROM tasks WHERE id=1").fetchone()
+    assert row[0] == 1735776000 and row[1] == 1735862400 and row[2] is not None
+
+def test_migration_backfills_existing_rows(tmp_path):
+    conn = sqlite3.connect(tmp_path / "v6.db")
+    for v, step in migrations.MIGRATIONS[:6]:
+        step(conn)
+    conn.execute("PRAGMA user_version=6")
+    conn.executemany("INSERT INTO tasks(title, due) VALUES(?, ?)", [(f"t{i}", f"2025-01-{i % 28 + 1:02d}") for i in range(25)])
+    conn.commit()
+    migrations.migrate(conn)
+    assert conn.execute("SELECT COUNT(*) FROM tasks WHERE due_ts IS NULL OR updated_ts IS NULL").fetchone()[0] == 0
+    assert conn.execute("SELECT due_ts FROM tasks WHERE id=1").fetchone()[0] == task_times.epoch("2025-01-01")
+    # parça sınırları sonucu değiştirmez
+    conn.execute("UPDATE tasks SET due_ts=NULL")
+    assert task_times.backfill(conn, chunk=7) == 25
+    assert conn.execute("SELECT COUNT(*) FROM tasks WHERE due_ts IS NULL").fetchone()[0] == 0
+    conn.close()
+
+def test_bad_due_bounds_are_rejected(pool, api):
+    with pool.writer() as conn:
+        conn.executemany("INSERT INTO tasks(title, due) VALUES(?, ?)", DUES)
+    c = api
+    # "2025" yıl da olabilir saniye de; epoch ancak @ ile
+    for bad in ("yarın", "2025", "1740819600", "2025-13-45"):
+        assert c.get("/tasks", params={"due_before": bad}).status_code == 422
+        assert c.get("/export", params={"due_after": bad}).status_code == 422
+    r = c.get("/tasks", params={"due_before": "@1740819600", "due_after": "@1740819600"})
+    assert sorted(t["title"] for t in r.json()) == ["epoch", "iso", "offset"]  # 09:00 UTC
+
+def test_interrupted_backfill_resumes(tmp_path):
+    conn = sqlite3.connect(tmp_path / "v6.db")
+    for v, step in migrations.MIGRATIONS[:6]:
+        step(conn)
+    conn.execute("PRAGMA user_version=6")
+    conn.executemany("INSERT INTO tasks(title, due) VALUES(?, ?)", [(f"t{i}", f"2025-01-{i % 28 + 1:02d}") for i in range(25)])
+    # v7 ALTER'lardan ve ilk parçadan sonra kesilmiş gibi
+    for ts, _ in task_times.COLUMNS:
+        conn.execute(f"ALTER TABLE tasks ADD COLUMN {ts} INTEGER")
+    conn.execute(f"UPDATE tasks SET {task_times._sets('')} WHERE id <= 10")
+    conn.commit()
+    missing = "SELECT COUNT(*) FROM tasks WHERE due_ts IS NULL OR created_ts IS NULL OR updated_ts IS NULL"
+    migrations.migrate(conn)
+    assert conn.execute(missing).fetchone()[0] == 0
+    # v7'yi geçmiş ama boşluklu DB'ler v10'da tamamlanır
+    conn.execute("UPDATE tasks SET due_ts=NULL WHERE id % 2")
+    conn.execute("PRAGMA user_version=9"); conn.commit()
+    migrations.migrate(conn)
+    assert conn.execute(missing).fetchone()[0] == 0
+    conn.close()
+
+def test_inserts_write_epochs_in_one_statement(pool, api):
+    import import_router
+    app = FastAPI(); app.include_router(import_router.router)
+    c = TestClient(app)
+    with pool.reader() as conn:
+        before = task_stats.version(conn)
+    api.post("/tasks", json={"title": "a", "due": "2025-03-01T12:00:00+03:00"})
+    c.post("/import", json=[{"title": "b", "due": "2025/03/01 09:00"}, {"title": "c", "due": "yarın"}])
+    c.post("/import", params={"mode": "upsert"}, json=[{"title": "d", "due": "2025-03-01 09:00"}])
+    with pool.reader() as conn:
+        # satır başına tek değişiklik: tetikleyici ikinci bir UPDATE yapmadı
+        assert task_stats.version(conn) - before == 4
+        rows = conn.execute("SELECT due_ts, created_ts, updated_ts FROM tasks ORDER BY id").fetchall()
+    assert [r[0] for r in rows] == [1740819600, 1740819600, None, 1740819600]
+    assert rows[0][1] is not None and rows[0][2] is not None
+
+def test_foreign_writes_are_still_corrected(pool):
+    with pool.writer() as conn:
+        conn.execute("INSERT INTO tasks(title, due, due_ts) VALUES('x', '2025-03-01 09:00', 0)")
+        assert conn.execute("SELECT due_ts FROM tasks").fetchone()[0] == 1740819600
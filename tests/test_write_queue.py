@@ -0,0 +1,56 @@
+﻿import threading
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import write_queue, admin_router, task_tags, fts_util
+
+def _insert(conn, title):
+    return conn.execute("INSERT INTO tasks(title) VALUES(?)", (title,)).lastrowid
+
+def _fail(conn):
+    conn.execute("INSERT INTO tasks(title) VALUES('rolled back')")
+    raise ValueError("boom")
+
+def test_concurrent_writers_are_group_committed(pool):
+    before = write_queue.stats()
+    barrier = threading.Barrier(16)
+    results, errors = {}, []
+    def worker(i):
+        barrier.wait()
+        for j in range(20):
+            if i == 0 and j == 5:
+                try: write_queue.run(_fail)
+                except ValueError as e: errors.append(str(e))
+                continue
+            results[(i, j)] = write_queue.run(_insert, f"w{i}-{j}")
+    ts = [threading.Thread(target=worker, args=(i,)) for i in range(16)]
+    for t in ts: t.start()
+    for t in ts: t.join()
+    after = write_queue.stats()
+    assert errors == ["boom"] and len(set(results.values())) == 16 * 20 - 1
+    with pool.reader() as conn:
+        titles = {r[0]: r[1] for r in conn.execute("SELECT id, title FROM tasks")}
+    assert "rolled back" not in titles.values()
+    assert all(titles[tid] == f"w{i}-{j}" for (i, j), tid in results.items())
+    # 320 iş, daha az transaction'da
+    assert after["jobs"] - before["jobs"] == 320
+    assert after["batches"] - before["batches"] < 320
+
+def test_nested_submit_is_rejected(pool):
+    with pytest.raises(RuntimeError):
+        write_queue.run(lambda conn: write_queue.run(_insert, "x"))
+
+def test_admin_rebuilds_are_queued_jobs(pool):
+    with pool.writer() as conn:
+        conn.executemany("INSERT INTO tasks(title, tags) VALUES(?, ?)", [("a", "x y"), ("b", "x"), ("c", "")])
+        task_tags.sync(conn, [1, 2, 3])
+        conn.execute("DELETE FROM task_tags")
+        fts = fts_util.ready(conn)
+    app = FastAPI(); app.include_router(admin_router.router)
+    c = TestClient(app)
+    before = write_queue.stats()["jobs"]
+    assert c.post("/admin/tags/rebuild").json() == {"ok": True, "tasks": 3}
+    assert c.post("/admin/stats/rebuild").json() == {"ok": True, "tasks": 3, "done": 0, "tags": 2}
+    assert c.post("/admin/fts/reindex").json() == ({"ok": True} if fts else {"ok": False, "reason": "fts5_unavailable"})
+    # yazma hattını kuyruğun dışından tutmazlar; her biri tek kuyruk işi
+    assert write_queue.stats()["jobs"] - before == 3
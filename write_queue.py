@@ -0,0 +1,141 @@
+﻿import os, time, queue, threading, contextvars, logging, asyncio
+from concurrent.futures import Future
+from starlette.concurrency import run_in_threadpool
+import db_pool
+
+logger = logging.getLogger(__name__)
+
+# Tek yazıcı kuyruğu. Tüm görev mutasyonları fn(conn, ...) biçiminde buraya gönderilir; ayrı bir
+# thread aynı anda bekleyen işleri tek transaction'da (group commit) uygular. Her iş kendi
+# SAVEPOINT'inde çalışır: hata veren iş yalnız kendini geri alır ve istisnası çağıranın
+# future'ına iletilir. Sonuçlar commit başarılı olduktan sonra teslim edilir.
+# İşler çağıranın contextvars bağlamında çalışır (http_metrics DB süresi, sql_profiler).
+
+QUEUE_MAX = int(os.getenv("TODO_API_WRITE_QUEUE", "1000"))
+MAX_BATCH = int(os.getenv("TODO_API_WRITE_BATCH", "256"))
+# 0: pencere yok, gruplar önceki commit sürerken biriken işlerden doğal olarak oluşur.
+# synchronous=FULL gibi commit'in pahalı olduğu kurulumlarda birkaç ms yararlı olabilir.
+WINDOW_MS = float(os.getenv("TODO_API_WRITE_WINDOW_MS", "0"))
+
+class _Job:
+    __slots__ = ("fn", "args", "kwargs", "ctx", "future")
+
+    def __init__(self, fn, args, kwargs):
+        self.fn, self.args, self.kwargs = fn, args, kwargs
+        self.ctx = contextvars.copy_context()
+        self.future = Future()
+
+_queue: queue.Queue = queue.Queue(maxsize=QUEUE_MAX)
+_thread: threading.Thread | None = None
+_start_lock = threading.Lock()
+_stats = {"batches": 0, "jobs": 0, "failed_jobs": 0, "failed_commits": 0, "max_batch": 0, "busy_seconds": 0.0}
+
+_hooks: list = []  # çalışan işin after_commit geri çağrıları (yalnız yazıcı thread'i dokunur)
+
+def after_commit(cb):
+    """İçinde bulunulan iş commit edildikten sonra (sonuç çağırana teslim edilmeden önce) cb() çalışır.
+    İş geri alınırsa çalışmaz. Yazma kuyruğu dışında çağrılırsa hemen çalışır."""
+    if threading.current_thread() is _thread: _hooks.append(cb)
+    else: cb()
+
+def _ensure_thread():
+    global _thread
+    if _thread is not None and _thread.is_alive(): return
+    with _start_lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_loop, name="todo-writer", daemon=True)
+            _thread.start()
+
+def submit(fn, *args, **kwargs) -> Future:
+    """fn(conn, *args, **kwargs) işini kuyruğa ekler; sonucu taşıyan Future döner."""
+    if threading.current_thread() is _thread:
+        raise RuntimeError("write_queue.submit called from the writer thread")
+    _ensure_thread()
+    job = _Job(fn, args, kwargs)
+    try:
+        _queue.put(job, timeout=db_pool.ACQUIRE_TIMEOUT)
+    except queue.Full:
+        raise db_pool.PoolTimeout(f"write queue full ({QUEUE_MAX}) after {db_pool.ACQUIRE_TIMEOUT}s")
+    return job.future
+
+def run(fn, *args, **kwargs):
+    """submit + sonucu bekle (threadpool'daki senkron handler'lar için)."""
+    return submit(fn, *args, **kwargs).result()
+
+async def run_async(fn, *args, **kwargs):
+    """async handler'lar için: event loop bloklanmaz (kuyruk doluysa ekleme threadpool'da bekler)."""
+    _ensure_thread()
+    job = _Job(fn, args, kwargs)
+    try:
+        _queue.put_nowait(job)
+        fut = job.future
+    except queue.Full:
+        fut = await run_in_threadpool(submit, fn, *args, **kwargs)
+    return await asyncio.wrap_future(fut)
+
+def _collect(first: _Job) -> list:
+    batch = [first]
+    deadline = None
+    while len(batch) < MAX_BATCH:
+        try:
+            batch.append(_queue.get_nowait()); continue
+        except queue.Empty:
+            pass
+        # eşzamanlı yazarlar varsa kısa bir pencere daha bekle; tek yazarda gecikme ekleme
+        if len(batch) == 1 or WINDOW_MS <= 0: break
+        if deadline is None: deadline = time.perf_counter() + WINDOW_MS / 1000
+        left = deadline - time.perf_counter()
+        if left <= 0: break
+        try: batch.append(_queue.get(timeout=left))
+        except queue.Empty: break
+    return batch
+
+def _apply(batch: list):
+    done = []
+    t0 = time.perf_counter()
+    try:
+        with db_pool.writer() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # tek işlik grupta savepoint gereksiz: hata olursa transaction'ın tamamı geri alınır
+            sp = len(batch) > 1
+            for job in batch:
+                if not job.future.set_running_or_notify_cancel(): continue
+                if sp: conn.execute("SAVEPOINT job")
+                _hooks.clear()
+                try:
+                    res = job.ctx.run(job.fn, conn, *job.args, **job.kwargs)
+                except BaseException as e:
+                    if sp: conn.execute("ROLLBACK TO job"); conn.execute("RELEASE job")
+                    else: conn.rollback()
+                    _stats["failed_jobs"] += 1
+                    job.future.set_exception(e)
+                    continue
+                if sp: conn.execute("RELEASE job")
+                done.append((job, res, _hooks[:]))
+    except BaseException as e:
+        _stats["failed_commits"] += 1
+        logger.exception("write batch of %d failed", len(batch))
+        for job, _, _ in done:
+            job.future.set_exception(e)
+        for job in batch:
+            if not job.future.done(): job.future.set_exception(e)
+        return
+    finally:
+        _stats["busy_seconds"] += time.perf_counter() - t0
+    _stats["batches"] += 1
+    _stats["jobs"] += len(batch)
+    _stats["max_batch"] = max(_stats["max_batch"], len(batch))
+    for job, res, hooks in done:
+        for cb in hooks:
+            try: cb()
+            except Exception: logger.exception("after_commit hook failed")
+        job.future.set_result(res)
+
+def _loop():
+    while True:
+        first = _queue.get()
+        _apply(_collect(first))
+
+def stats() -> dict:
+    return {**_stats, "busy_seconds": round(_stats["busy_seconds"], 6), "depth": _queue.qsize(),
+            "capacity": QUEUE_MAX}